@@ -1,24 +1,312 @@
 """Ingestion endpoints."""
 
-from datetime import datetime, timezone
+import asyncio
+import zlib
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
 
-from fastapi import APIRouter, status
+from celery import Task
+from celery.result import AsyncResult
 
-from app.schemas import LogIngestPayload, LogIngestResponse
-from app.tasks import process_log
+from fastapi import APIRouter, HTTPException, Request, status
+from pydantic import ValidationError
+
+from app.core.config import get_settings
+from app.core.log_stream import publish
+from app.core.metrics import INGESTED_LOGS, INGEST_REJECTED_REQUESTS, observe_stage
+from app.schemas import (
+    LogIngestBatchResponse,
+    LogIngestLineError,
+    LogIngestPayload,
+    LogIngestResponse,
+    LogIngestStreamResponse,
+)
+from app.services.admission import AdmissionController, IngestBackpressureError, get_admission_controller
+from app.tasks import process_log, process_log_batch
 
 
 router = APIRouter()
 
+# Upper bound on each piece of decompressed output, so a small compressed body
+# cannot inflate into one huge buffer.
+DECOMPRESS_CHUNK_BYTES = 256 * 1024
+_ENCODING_WBITS = {
+    "gzip": 16 + zlib.MAX_WBITS,
+    "x-gzip": 16 + zlib.MAX_WBITS,
+    "deflate": zlib.MAX_WBITS,
+}
+
+
+def _enqueue(task: Task, payload: Any, task_id: Optional[str] = None) -> AsyncResult:
+    """Queue an ingest task; in fire-and-forget mode nothing is tracked in the result backend."""
+
+    return task.apply_async(
+        args=[payload], task_id=task_id, ignore_result=get_settings().ingest_ignore_results)
+
+
+def _dispatch(payload_dicts: List[Dict[str, Any]], *, batch: bool) -> Optional[str]:
+    """Hand logs to the configured ingest transport; returns the Celery task id, if any.
+
+    With `INGEST_TRANSPORT=stream` every log becomes one Redis stream entry and
+    there is no task id.
+    """
+
+    controller = get_admission_controller()
+    if controller is not None:
+        controller.record_enqueued(len(payload_dicts))
+    if get_settings().ingest_transport == "stream":
+        publish(payload_dicts)
+        return None
+    if batch:
+        return _enqueue(process_log_batch, payload_dicts).id
+    return _enqueue(process_log, payload_dicts[0], task_id=payload_dicts[0]["id"]).id
+
+
+def _admission(endpoint: str) -> Tuple[Optional[AdmissionController], float]:
+    """Admission controller and current backlog pressure for one request.
+
+    Refuses the request with 429 while the ingest backlog is at its hard limit.
+    """
+
+    controller = get_admission_controller()
+    if controller is None:
+        return None, 0.0
+    try:
+        return controller, controller.check()
+    except IngestBackpressureError as exc:
+        INGEST_REJECTED_REQUESTS.labels(endpoint=endpoint).inc()
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(exc),
+            headers={"Retry-After": str(exc.retry_after)},
+        ) from exc
+
 
 @router.post("/ingest", response_model=LogIngestResponse, status_code=status.HTTP_202_ACCEPTED)
 async def ingest_log(payload: LogIngestPayload) -> LogIngestResponse:
     """Accept a log payload, enqueue processing, and return immediately."""
 
-    payload_dict = payload.model_dump()
-    payload_dict["attributes"] = payload.merged_attributes()
-    if payload_dict.get("log_timestamp") is None:
-        payload_dict["log_timestamp"] = datetime.now(timezone.utc).isoformat()
+    controller, pressure = _admission("single")
+    if controller is not None and not controller.admit(payload.level, pressure):
+        return LogIngestResponse(status="dropped")
+    payload_dict = payload.to_task_payload()
+    with observe_stage("ingest_enqueue"):
+        task_id = _dispatch([payload_dict], batch=False)
+    INGESTED_LOGS.labels(endpoint="single").inc()
+    return LogIngestResponse(status="accepted", task_id=task_id, log_id=payload_dict["id"])
+
+
+@router.post(
+    "/ingest/batch", response_model=LogIngestBatchResponse, status_code=status.HTTP_202_ACCEPTED
+)
+async def ingest_log_batch(payloads: List[LogIngestPayload]) -> LogIngestBatchResponse:
+    """Accept an array of log payloads and enqueue them as a single task."""
+
+    settings = get_settings()
+    if not payloads:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Batch must contain at least one log."
+        )
+    if len(payloads) > settings.ingest_max_batch_size:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Batch exceeds the maximum of {settings.ingest_max_batch_size} logs.",
+        )
+
+    controller, pressure = _admission("batch")
+    if controller is not None:
+        admitted = [payload for payload in payloads if controller.admit(payload.level, pressure)]
+    else:
+        admitted = payloads
+    dropped = len(payloads) - len(admitted)
+    if not admitted:
+        return LogIngestBatchResponse(status="dropped", dropped=dropped)
+
+    payload_dicts = [payload.to_task_payload() for payload in admitted]
+    with observe_stage("ingest_enqueue"):
+        task_id = _dispatch(payload_dicts, batch=True)
+    INGESTED_LOGS.labels(endpoint="batch").inc(len(admitted))
+    return LogIngestBatchResponse(
+        status="accepted",
+        task_id=task_id,
+        accepted=len(admitted),
+        dropped=dropped,
+        log_ids=[payload_dict["id"] for payload_dict in payload_dicts],
+    )
+
+
+class _StreamDecoder:
+    """Incremental zlib/gzip decoder that handles concatenated members.
+
+    `feed` yields pieces of at most `DECOMPRESS_CHUNK_BYTES`. When a member ends, its leftover input is in `unused_data` (and, with an output
+    limit, also still in `unconsumed_tail`), so decoding continues from
+    `unused_data` on a fresh decompressor. Zero bytes between or after members
+    are skipped as padding; any other trailing bytes raise `zlib.error`.
+    """
+
+    def __init__(self, wbits: int) -> None:
+        self.wbits = wbits
+        self._decompressor = zlib.decompressobj(wbits)
+        self._member_started = False
+
+    def feed(self, data: bytes) -> Iterator[bytes]:
+        while data:
+            if not self._member_started:
+                data = data.lstrip(b"\x00")
+                if not data:
+                    return
+                self._member_started = True
+            output = self._decompressor.decompress(data, DECOMPRESS_CHUNK_BYTES)
+            if output:
+                yield output
+            if self._decompressor.eof:
+                data = self._decompressor.unused_data
+                self._decompressor = zlib.decompressobj(self.wbits)
+                self._member_started = False
+            else:
+                data = self._decompressor.unconsumed_tail
+
+    def flush(self) -> bytes:
+        if not self._member_started:
+            return b""
+        return self._decompressor.flush()
+
+
+async def _decoded_body(request: Request) -> AsyncIterator[bytes]:
+    """Yield the request body, decompressed on the fly according to `Content-Encoding`."""
+
+    encoding = request.headers.get("content-encoding", "identity").strip().lower()
+    if encoding in ("", "identity"):
+        async for chunk in request.stream():
+            yield chunk
+        return
+    if encoding not in _ENCODING_WBITS:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=f"Unsupported Content-Encoding {encoding!r}.",
+        )
+
+    decoder = _StreamDecoder(_ENCODING_WBITS[encoding])
+    async for chunk in request.stream():
+        for output in decoder.feed(chunk):
+            yield output
+            # One request chunk can inflate to many pieces; let other requests run between them.
+            await asyncio.sleep(0)
+    tail = decoder.flush()
+    if tail:
+        yield tail
+
+
+async def _iter_lines(chunks: AsyncIterator[bytes], max_line_bytes: int) -> AsyncIterator[Optional[bytes]]:
+    """Split a byte stream into lines; a line longer than `max_line_bytes` yields `None`.
+
+    Oversized lines are skipped without being buffered.
+    """
+
+    buffer = bytearray()
+    oversized = False
+    async for chunk in chunks:
+        start = 0
+        while True:
+            newline = chunk.find(b"\n", start)
+            if newline < 0:
+                break
+            if oversized or len(buffer) + newline - start > max_line_bytes:
+                yield None
+            else:
+                buffer += chunk[start:newline]
+                yield bytes(buffer)
+            buffer.clear()
+            oversized = False
+            start = newline + 1
+        if not oversized:
+            buffer += chunk[start:]
+            if len(buffer) > max_line_bytes:
+                buffer.clear()
+                oversized = True
+    if oversized:
+        yield None
+    elif buffer:
+        yield bytes(buffer)
+
+
+def _describe_validation_error(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in error['loc']) or 'line'}: {error['msg']}"
+        for error in exc.errors()[:3]
+    )
+
+
+@router.post(
+    "/ingest/ndjson", response_model=LogIngestStreamResponse, status_code=status.HTTP_202_ACCEPTED
+)
+async def ingest_ndjson(request: Request) -> LogIngestStreamResponse:
+    """Accept newline-delimited JSON logs, optionally gzip- or deflate-encoded.
+
+    The body is decompressed and parsed as it arrives. Valid lines are queued in
+    batches of `INGEST_STREAM_BATCH_SIZE`, and invalid lines are reported by line
+    number instead of failing the whole request. Admission is checked before the
+    body is read. While the body streams, the backlog is re-sampled after every
+    batch, and low-severity lines are shed accordingly.
+    """
+
+    settings = get_settings()
+    controller, pressure = _admission("ndjson")
+    batch_size = max(1, min(settings.ingest_stream_batch_size, settings.ingest_max_batch_size))
+    response = LogIngestStreamResponse()
+    batch: List[Dict[str, Any]] = []
+
+    def reject(line_number: int, error: str) -> None:
+        response.rejected += 1
+        if len(response.errors) < settings.ingest_stream_max_errors:
+            response.errors.append(LogIngestLineError(line=line_number, error=error))
+
+    def enqueue() -> None:
+        nonlocal pressure
+        with observe_stage("ingest_enqueue"):
+            task_id = _dispatch(list(batch), batch=True)
+        if task_id is not None:
+            response.task_ids.append(task_id)
+        response.log_ids.extend(payload_dict["id"] for payload_dict in batch)
+        response.accepted += len(batch)
+        INGESTED_LOGS.labels(endpoint="ndjson").inc(len(batch))
+        batch.clear()
+        if controller is not None:
+            pressure = controller.pressure()
+
+    line_number = 0
+    try:
+        async for line in _iter_lines(_decoded_body(request), settings.ingest_stream_max_line_bytes):
+            line_number += 1
+            if line is None:
+                reject(line_number, f"Line exceeds {settings.ingest_stream_max_line_bytes} bytes.")
+                continue
+            if not line.strip():
+                continue
+            try:
+                payload = LogIngestPayload.model_validate_json(line)
+            except ValidationError as exc:
+                reject(line_number, _describe_validation_error(exc))
+                continue
+            if controller is not None and not controller.admit(payload.level, pressure):
+                response.dropped += 1
+                continue
+            batch.append(payload.to_task_payload())
+            if len(batch) >= batch_size:
+                enqueue()
+    except zlib.error as exc:
+        if line_number == 0 and not batch:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid compressed body: {exc}"
+            ) from exc
+        # Keep what was decoded before the corruption; the rest of the body is lost.
+        reject(line_number + 1, f"Invalid compressed body: {exc}")
+        response.status = "partial"
 
-    task = process_log.delay(payload_dict)
-    return LogIngestResponse(status="accepted", task_id=task.id)
+    if batch:
+        enqueue()
+    if not response.accepted and response.status == "accepted":
+        if response.rejected:
+            response.status = "rejected"
+        elif response.dropped:
+            response.status = "dropped"
+    return response
@@ -1,21 +1,83 @@
 """Query endpoints for natural-language search."""
 
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+import json
+import logging
+from typing import AsyncIterator
 
-from app.db.session import get_db_session
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.session import get_async_db_session
 from app.schemas import LogQueryRequest, LogQueryResponse
+from app.services.llm_pool import LLMQueueFullError
 from app.services.rag import RAGPipeline
 
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 pipeline = RAGPipeline()
 
 
+def _queue_full(exc: LLMQueueFullError) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=str(exc),
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
 @router.post("/query", response_model=LogQueryResponse)
 async def query_logs(
-    request: LogQueryRequest, session: Session = Depends(get_db_session)
+    request: LogQueryRequest, session: AsyncSession = Depends(get_async_db_session)
 ) -> LogQueryResponse:
     """Return an answer generated from relevant logs."""
 
-    return pipeline.answer(session, request)
+    try:
+        return await pipeline.aanswer(session, request)
+    except LLMQueueFullError as exc:
+        raise _queue_full(exc) from exc
+
+
+def _sse(event: str, data: str) -> str:
+    return f"event: {event}\ndata: {data}\n\n"
+
+
+@router.post("/query/stream", response_class=StreamingResponse)
+async def stream_query_logs(
+    request: LogQueryRequest, session: AsyncSession = Depends(get_async_db_session)
+) -> StreamingResponse:
+    """Stream an answer as Server-Sent Events.
+
+    Emits one `contexts` event as soon as retrieval finishes, a `token` event per
+    generated chunk, and a final `done` event carrying the full `LogQueryResponse`.
+    If generation fails, the stream ends with an `error` event instead of `done`.
+    """
+
+    retrieved = await pipeline.aretrieve(session, request)
+    contexts = [item.to_schema() for item in retrieved]
+
+    async def events() -> AsyncIterator[str]:
+        yield _sse("contexts", json.dumps([context.model_dump(mode="json") for context in contexts]))
+        chunks = []
+        try:
+            async for chunk in pipeline.astream_answer(request.query, retrieved):
+                chunks.append(chunk)
+                yield _sse("token", json.dumps({"text": chunk}))
+            response = pipeline.build_response(request, retrieved, "".join(chunks).strip())
+        except LLMQueueFullError as exc:
+            yield _sse("error", json.dumps({"detail": str(exc), "retry_after": exc.retry_after}))
+            return
+        except Exception:
+            # Headers are already sent, so the failure can only be reported in-band.
+            logger.exception("Streaming answer generation failed")
+            yield _sse("error", json.dumps({"detail": "Answer generation failed."}))
+            return
+        yield _sse("done", response.model_dump_json())
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
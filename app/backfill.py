@@ -0,0 +1,103 @@
+"""Command-line backfill that bulk-loads NDJSON log files into the `logs` table.
+
+Usage::
+
+    python -m app.backfill logs-2024-05-10.ndjson [more.ndjson ...]
+    zcat archive.ndjson.gz | python -m app.backfill -
+
+Each line must match the `/ingest` payload schema. Lines are embedded in batches
+and streamed into Postgres with binary COPY, bypassing Celery entirely.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import sys
+import time
+from typing import Iterator, List, Sequence, TextIO
+
+from pydantic import ValidationError
+
+from app.db.bulk import copy_log_records
+from app.db.partitions import ensure_partitions_for
+from app.db.models import LogRecord
+from app.schemas import LogIngestPayload
+from app.services.query_cache import bump_ingest_watermarks
+from app.tasks import build_log_record, drop_expired, embed_records, ensure_database_ready
+
+
+logger = logging.getLogger("app.backfill")
+
+
+def _iter_payloads(stream: TextIO, source: str) -> Iterator[dict]:
+    for line_number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            payload = LogIngestPayload.model_validate(json.loads(line))
+        except (ValueError, ValidationError) as exc:
+            logger.warning("Skipping %s:%d: %s", source, line_number, exc)
+            continue
+        payload_dict = payload.model_dump()
+        payload_dict["attributes"] = payload.merged_attributes()
+        # An `id` in archived lines is just an extra attribute; rows get fresh ids.
+        payload_dict.pop("id", None)
+        yield payload_dict
+
+
+def _flush(records: List[LogRecord]) -> int:
+    # Rows past retention would recreate partitions that retention already dropped.
+    records = drop_expired(records)
+    if not records:
+        return 0
+    embed_records(records)
+    ensure_partitions_for(record.log_timestamp for record in records)
+    written = copy_log_records(records)
+    bump_ingest_watermarks({(record.service, record.level) for record in records})
+    return written
+
+
+def backfill(paths: Sequence[str], batch_size: int) -> int:
+    """Load every file in `paths` and return the number of rows written."""
+
+    ensure_database_ready()
+    total = 0
+    started = time.perf_counter()
+    for path in paths:
+        stream = sys.stdin if path == "-" else open(path, encoding="utf-8")
+        try:
+            batch: List[LogRecord] = []
+            for payload in _iter_payloads(stream, path):
+                batch.append(build_log_record(payload))
+                if len(batch) >= batch_size:
+                    total += _flush(batch)
+                    batch = []
+            if batch:
+                total += _flush(batch)
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+        elapsed = time.perf_counter() - started
+        logger.info("Loaded %s; %d rows so far (%.0f rows/s)",
+                    path, total, total / elapsed if elapsed else 0.0)
+    return total
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("paths", nargs="+", help="NDJSON files to load, or '-' for stdin")
+    parser.add_argument("--batch-size", type=int, default=2000,
+                        help="Rows embedded and copied per round trip (default: 2000)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    total = backfill(args.paths, args.batch_size)
+    logger.info("Backfill complete: %d rows", total)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
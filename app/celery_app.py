@@ -1,12 +1,18 @@
 """Celery application instance shared by API and worker containers."""
 
 from celery import Celery
+from celery.signals import before_task_publish, worker_process_shutdown
 
 from app.core.config import get_settings
+from app.core.metrics import mark_process_dead
+from app.core.serializers import register_ingest_serializer
+from app.core.tracing import flush_tracing, inject_context
 
 
 settings = get_settings()
 
+INGEST_TASK_NAMES = ("process_log", "process_log_batch")
+
 celery = Celery(
     "logiq",
     broker=settings.celery_broker_url,
@@ -22,4 +28,65 @@ celery.conf.update(
     enable_utc=True,
     task_track_started=True,
     task_time_limit=60 * 5,
+    # Results that are kept (e.g. `generate_answer`) expire instead of piling up.
+    result_expires=settings.celery_result_expires_seconds,
+    task_routes={"generate_answer": {"queue": settings.llm_queue_name}},
+    beat_schedule={
+        "maintain-log-partitions": {
+            "task": "maintain_log_partitions",
+            "schedule": 15 * 60,
+        },
+        "apply-retention": {
+            "task": "apply_retention",
+            "schedule": 60 * 60,
+        },
+    },
 )
+
+task_annotations = {}
+
+# Accept the binary ingest format whenever msgpack is installed, so workers can be
+# upgraded before the API starts producing it.
+ingest_serializer = register_ingest_serializer(settings.ingest_compress_min_bytes)
+if ingest_serializer is not None:
+    celery.conf.accept_content = ["json", ingest_serializer]
+
+if settings.ingest_task_serializer == "msgpack":
+    # Only ingest messages switch format; everything else, results included, stays JSON.
+    if ingest_serializer is None:
+        raise RuntimeError("INGEST_TASK_SERIALIZER=msgpack requires the msgpack package.")
+    for task_name in INGEST_TASK_NAMES:
+        task_annotations.setdefault(task_name, {})["serializer"] = ingest_serializer
+
+if settings.ingest_ignore_results:
+    # Callers correlate ingested logs by the id returned from the API, so started
+    # and success records in the result backend would never be read.
+    for task_name in INGEST_TASK_NAMES:
+        task_annotations.setdefault(task_name, {}).update(ignore_result=True, track_started=False)
+
+if settings.worker_coalesce_enabled:
+    # Coalescing needs many `process_log` tasks in flight inside one worker, each
+    # blocked until its batch commits, and acknowledged only after that commit.
+    # They get their own queue, consumed by a thread-pool worker, so retention,
+    # partition upkeep and batch ingest keep running on the regular pool.
+    celery.conf.task_routes["process_log"] = {"queue": settings.worker_coalesce_queue}
+    task_annotations.setdefault("process_log", {})["acks_late"] = True
+
+celery.conf.task_annotations = task_annotations
+
+
+@before_task_publish.connect
+def _propagate_trace(headers=None, **_: object) -> None:
+    """Carry the publisher's trace context to the worker in the message headers."""
+
+    if headers is not None:
+        inject_context(headers)
+
+
+@worker_process_shutdown.connect
+def _release_process_telemetry(pid=None, **_: object) -> None:
+    """Flush spans and stop reporting live gauges for an exited pool process."""
+
+    flush_tracing()
+    if pid is not None:
+        mark_process_dead(pid)
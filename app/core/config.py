@@ -1,12 +1,25 @@
 """Application configuration helpers."""
 
 from functools import lru_cache
-from typing import Optional
+from importlib.util import find_spec
+from typing import List, Optional
 
-from pydantic import Field
+from pydantic import BaseModel, Field
 from pydantic_settings import BaseSettings
 
 
+class RetentionRule(BaseModel):
+    """How long logs matching a service and/or level are kept."""
+
+    service: Optional[str] = None
+    level: Optional[str] = None
+    days: float = Field(gt=0)
+
+    @property
+    def specificity(self) -> int:
+        return (2 if self.service else 0) + (1 if self.level else 0)
+
+
 class Settings(BaseSettings):
     """Central configuration loaded from environment variables."""
 
@@ -15,15 +28,46 @@ class Settings(BaseSettings):
     log_level: str = Field(default="INFO", alias="LOGIQ_LOG_LEVEL")
 
     database_url: str = Field(alias="DATABASE_URL")
+    async_database_url: Optional[str] = Field(
+        default=None, alias="ASYNC_DATABASE_URL")
     celery_broker_url: str = Field(
         default="redis://redis:6379/0", alias="CELERY_BROKER_URL")
     celery_result_backend: str = Field(
         default="redis://redis:6379/0", alias="CELERY_RESULT_BACKEND")
 
+    celery_result_expires_seconds: int = Field(
+        default=3600, alias="CELERY_RESULT_EXPIRES_SECONDS")
+    ingest_ignore_results: bool = Field(
+        default=False, alias="INGEST_IGNORE_RESULTS")
+    ingest_task_serializer: str = Field(
+        default="json", alias="INGEST_TASK_SERIALIZER")
+    ingest_compress_min_bytes: int = Field(
+        default=4096, alias="INGEST_COMPRESS_MIN_BYTES")
+
     redis_url: str = Field(default="redis://redis:6379/0", alias="REDIS_URL")
     embedding_model_name: str = Field(
         default="sentence-transformers/all-MiniLM-L6-v2", alias="EMBEDDING_MODEL_NAME"
     )
+    embedding_batch_size: int = Field(default=64, alias="EMBEDDING_BATCH_SIZE")
+    embedding_sort_by_length: bool = Field(
+        default=True, alias="EMBEDDING_SORT_BY_LENGTH")
+    embedding_executor_workers: int = Field(
+        default=4, alias="EMBEDDING_EXECUTOR_WORKERS")
+    embedding_cache_enabled: bool = Field(
+        default=True, alias="EMBEDDING_CACHE_ENABLED")
+    embedding_cache_local_size: int = Field(
+        default=10_000, alias="EMBEDDING_CACHE_LOCAL_SIZE")
+    embedding_cache_redis_enabled: bool = Field(
+        default=True, alias="EMBEDDING_CACHE_REDIS_ENABLED")
+    embedding_cache_redis_ttl_seconds: int = Field(
+        default=7 * 24 * 3600, alias="EMBEDDING_CACHE_REDIS_TTL_SECONDS")
+    log_templates_enabled: bool = Field(
+        default=False, alias="LOG_TEMPLATES_ENABLED")
+    log_template_depth: int = Field(default=4, alias="LOG_TEMPLATE_DEPTH")
+    log_template_similarity: float = Field(
+        default=0.5, alias="LOG_TEMPLATE_SIMILARITY")
+    log_template_candidates: int = Field(
+        default=50, alias="LOG_TEMPLATE_CANDIDATES")
     llm_model_path: Optional[str] = Field(default=None, alias="LLM_MODEL_PATH")
     llm_n_ctx: int = Field(default=4096, alias="LLM_N_CTX")
     llm_n_threads: int = Field(default=0, alias="LLM_N_THREADS")
@@ -31,10 +75,107 @@ class Settings(BaseSettings):
     llm_batch_size: int = Field(default=512, alias="LLM_BATCH_SIZE")
     llm_temperature: float = Field(default=0.1, alias="LLM_TEMPERATURE")
     llm_top_p: float = Field(default=0.9, alias="LLM_TOP_P")
+    llm_max_tokens: int = Field(default=512, alias="LLM_MAX_TOKENS")
+    llm_max_log_tokens: int = Field(default=256, alias="LLM_MAX_LOG_TOKENS")
+    llm_prefix_cache_dir: Optional[str] = Field(
+        default=None, alias="LLM_PREFIX_CACHE_DIR")
+    llm_backend: str = Field(default="local", alias="LLM_BACKEND")
+    llm_queue_name: str = Field(default="llm", alias="LLM_QUEUE_NAME")
+    llm_queue_max_depth: int = Field(default=64, alias="LLM_QUEUE_MAX_DEPTH")
+    llm_api_max_inflight: int = Field(default=16, alias="LLM_API_MAX_INFLIGHT")
+    llm_request_timeout_seconds: float = Field(
+        default=120.0, alias="LLM_REQUEST_TIMEOUT_SECONDS")
+
+    ingest_max_batch_size: int = Field(
+        default=5000, alias="INGEST_MAX_BATCH_SIZE")
+    ingest_transport: str = Field(default="celery", alias="INGEST_TRANSPORT")
+    log_stream_key: str = Field(default="logiq:ingest", alias="LOG_STREAM_KEY")
+    log_stream_group: str = Field(
+        default="logiq-ingest", alias="LOG_STREAM_GROUP")
+    log_stream_maxlen: int = Field(default=0, alias="LOG_STREAM_MAXLEN")
+    log_stream_read_count: int = Field(
+        default=1000, alias="LOG_STREAM_READ_COUNT")
+    log_stream_block_ms: int = Field(default=1000, alias="LOG_STREAM_BLOCK_MS")
+    log_stream_claim_idle_ms: int = Field(
+        default=60_000, alias="LOG_STREAM_CLAIM_IDLE_MS")
+    log_stream_max_deliveries: int = Field(
+        default=5, alias="LOG_STREAM_MAX_DELIVERIES")
+    ingest_stream_batch_size: int = Field(
+        default=500, alias="INGEST_STREAM_BATCH_SIZE")
+    ingest_stream_max_line_bytes: int = Field(
+        default=1024 * 1024, alias="INGEST_STREAM_MAX_LINE_BYTES")
+    ingest_stream_max_errors: int = Field(
+        default=100, alias="INGEST_STREAM_MAX_ERRORS")
+    ingest_admission_enabled: bool = Field(
+        default=False, alias="INGEST_ADMISSION_ENABLED")
+    ingest_backlog_soft_limit: int = Field(
+        default=50_000, alias="INGEST_BACKLOG_SOFT_LIMIT")
+    ingest_backlog_hard_limit: int = Field(
+        default=200_000, alias="INGEST_BACKLOG_HARD_LIMIT")
+    ingest_backlog_sample_seconds: float = Field(
+        default=1.0, alias="INGEST_BACKLOG_SAMPLE_SECONDS")
+    ingest_shed_levels: str = Field(
+        default="DEBUG,INFO", alias="INGEST_SHED_LEVELS")
+    ingest_retry_after_seconds: int = Field(
+        default=5, alias="INGEST_RETRY_AFTER_SECONDS")
+    db_copy_min_rows: int = Field(default=50, alias="DB_COPY_MIN_ROWS")
+    worker_coalesce_enabled: bool = Field(
+        default=False, alias="WORKER_COALESCE_ENABLED")
+    worker_coalesce_max_batch_size: int = Field(
+        default=256, alias="WORKER_COALESCE_MAX_BATCH_SIZE")
+    worker_coalesce_max_wait_ms: float = Field(
+        default=20.0, alias="WORKER_COALESCE_MAX_WAIT_MS")
+    worker_coalesce_queue: str = Field(
+        default="ingest", alias="WORKER_COALESCE_QUEUE")
+
+    logs_partition_interval: str = Field(
+        default="day", alias="LOGS_PARTITION_INTERVAL")
+    logs_partition_premake: int = Field(
+        default=3, alias="LOGS_PARTITION_PREMAKE")
+
+    retention_enabled: bool = Field(default=False, alias="RETENTION_ENABLED")
+    retention_rules: List[RetentionRule] = Field(
+        default_factory=list, alias="RETENTION_RULES")
+    retention_default_days: Optional[float] = Field(
+        default=None, alias="RETENTION_DEFAULT_DAYS")
+    retention_batch_size: int = Field(
+        default=10_000, alias="RETENTION_BATCH_SIZE")
+    retention_partition_action: str = Field(
+        default="drop", alias="RETENTION_PARTITION_ACTION")
+    retention_archive_dir: Optional[str] = Field(
+        default=None, alias="RETENTION_ARCHIVE_DIR")
+
+    vector_index_type: str = Field(default="hnsw", alias="VECTOR_INDEX_TYPE")
+    vector_index_m: int = Field(default=16, alias="VECTOR_INDEX_M")
+    vector_index_ef_construction: int = Field(
+        default=64, alias="VECTOR_INDEX_EF_CONSTRUCTION")
+    vector_index_lists: int = Field(default=100, alias="VECTOR_INDEX_LISTS")
+    vector_search_ef_search: int = Field(
+        default=40, alias="VECTOR_SEARCH_EF_SEARCH")
+    vector_search_probes: int = Field(default=10, alias="VECTOR_SEARCH_PROBES")
+
+    query_cache_enabled: bool = Field(default=True, alias="QUERY_CACHE_ENABLED")
+    query_embedding_cache_size: int = Field(
+        default=1000, alias="QUERY_EMBEDDING_CACHE_SIZE")
+    query_embedding_cache_ttl_seconds: float = Field(
+        default=3600.0, alias="QUERY_EMBEDDING_CACHE_TTL_SECONDS")
+    answer_cache_size: int = Field(default=500, alias="ANSWER_CACHE_SIZE")
+    answer_cache_ttl_seconds: float = Field(
+        default=300.0, alias="ANSWER_CACHE_TTL_SECONDS")
 
     retrieval_top_k: int = Field(default=5, alias="RETRIEVAL_TOP_K")
+    retrieval_mode: str = Field(default="vector", alias="RETRIEVAL_MODE")
+    hybrid_candidates: int = Field(default=50, alias="HYBRID_CANDIDATES")
+    hybrid_rrf_k: int = Field(default=60, alias="HYBRID_RRF_K")
     max_context_logs: int = Field(default=10, alias="MAX_CONTEXT_LOGS")
 
+    tracing_enabled: bool = Field(default=False, alias="TRACING_ENABLED")
+    tracing_exporter: str = Field(default="otlp", alias="TRACING_EXPORTER")
+    tracing_file_path: str = Field(
+        default="traces.jsonl", alias="TRACING_FILE_PATH")
+    tracing_service_name: str = Field(
+        default="logiq", alias="OTEL_SERVICE_NAME")
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
@@ -43,9 +184,23 @@ class Settings(BaseSettings):
     def model_post_init(self, __context: object) -> None:
         """Normalize any dependent settings after load."""
 
+        object.__setattr__(self, "vector_index_type",
+                           self.vector_index_type.lower())
+        object.__setattr__(self, "logs_partition_interval",
+                           self.logs_partition_interval.lower())
+        object.__setattr__(self, "tracing_exporter",
+                           self.tracing_exporter.lower())
+        object.__setattr__(self, "ingest_task_serializer",
+                           self.ingest_task_serializer.lower())
+        object.__setattr__(self, "ingest_transport",
+                           self.ingest_transport.lower())
         if not self.celery_result_backend:
             object.__setattr__(self, "celery_result_backend",
                                self.celery_broker_url)
+        if self.retention_enabled and self.retention_archive_dir and find_spec("pyarrow") is None:
+            raise ValueError(
+                "RETENTION_ARCHIVE_DIR is set but pyarrow is not installed; "
+                "run `pip install pyarrow` or unset RETENTION_ARCHIVE_DIR.")
 
 
 @lru_cache
@@ -0,0 +1,52 @@
+"""Redis Streams transport for ingested logs (`INGEST_TRANSPORT=stream`).
+
+The API appends one stream entry per log with `XADD`; `app.stream_worker`
+consumes them through a consumer group in large batches. Entries are acknowledged
+and deleted once their batch is committed, so the stream only holds logs that are
+still waiting or being written.
+"""
+
+from __future__ import annotations
+
+import json
+from functools import lru_cache
+from typing import Any, Dict, List, Sequence
+
+import redis
+
+from app.core.config import get_settings
+
+
+PAYLOAD_FIELD = "payload"
+
+
+def dead_letter_key(stream_key: str) -> str:
+    return f"{stream_key}:dead"
+
+
+@lru_cache
+def get_stream_client() -> redis.Redis:
+    """Redis client for the ingest stream."""
+
+    return redis.Redis.from_url(get_settings().redis_url)
+
+
+def publish(payloads: Sequence[Dict[str, Any]]) -> List[str]:
+    """Append serialized ingest payloads to the stream in one round trip; returns entry ids."""
+
+    settings = get_settings()
+    pipe = get_stream_client().pipeline(transaction=False)
+    for payload in payloads:
+        pipe.xadd(
+            settings.log_stream_key,
+            {PAYLOAD_FIELD: json.dumps(payload)},
+            maxlen=settings.log_stream_maxlen or None,
+            approximate=True,
+        )
+    return [entry_id.decode() for entry_id in pipe.execute()]
+
+
+def stream_backlog(client: redis.Redis, stream_key: str) -> int:
+    """Logs waiting or in flight; exact because consumers delete what they acknowledge."""
+
+    return int(client.xlen(stream_key))
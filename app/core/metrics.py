@@ -0,0 +1,195 @@
+"""Prometheus instrumentation shared by the API, Celery workers and the LLM tier.
+
+When `PROMETHEUS_MULTIPROC_DIR` is set, every process writes its samples to that
+directory and `/metrics` aggregates them, so one scrape covers all uvicorn and
+Celery processes mounted on the same volume. Process ids are prefixed with the
+hostname because containers sharing the directory have overlapping pid spaces.
+"""
+
+from __future__ import annotations
+
+import os
+import socket
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Iterator, Sequence, Tuple
+
+import redis
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+    values,
+)
+from prometheus_client.core import GaugeMetricFamily
+
+from app.core.config import get_settings
+from app.core.log_stream import get_stream_client, stream_backlog
+from app.core.tracing import start_span
+
+
+MULTIPROCESS_DIR = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+
+
+def _process_identifier() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+if MULTIPROCESS_DIR:
+    values.ValueClass = values.MultiProcessValue(_process_identifier)
+
+
+STAGE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+STAGE_SECONDS = Histogram(
+    "logiq_stage_seconds",
+    "Latency of each pipeline stage.",
+    ["stage"],
+    buckets=STAGE_BUCKETS,
+)
+INGESTED_LOGS = Counter(
+    "logiq_ingested_logs_total",
+    "Logs accepted by the ingest API.",
+    ["endpoint"],
+)
+INGEST_ADMISSION_STATE = Gauge(
+    "logiq_ingest_admission_state",
+    "Ingest admission state: 0 open, 1 shedding low-severity logs, 2 rejecting.",
+    multiprocess_mode="livemax",
+)
+INGEST_SHED_LOGS = Counter(
+    "logiq_ingest_shed_logs_total",
+    "Logs dropped by ingest admission sampling.",
+    ["level"],
+)
+INGEST_REJECTED_REQUESTS = Counter(
+    "logiq_ingest_rejected_requests_total",
+    "Ingest requests refused with 429 because the backlog was full.",
+    ["endpoint"],
+)
+RETENTION_ROWS = Counter(
+    "logiq_retention_rows_total",
+    "Expired rows removed by retention, by action (deleted, archived).",
+    ["action"],
+)
+RETENTION_PARTITIONS = Counter(
+    "logiq_retention_partitions_total",
+    "Expired partitions removed by retention, by action (dropped, detached).",
+    ["action"],
+)
+RETENTION_LAST_RUN_SECONDS = Gauge(
+    "logiq_retention_last_run_seconds",
+    "Duration of the most recent retention run.",
+    multiprocess_mode="mostrecent",
+)
+RETENTION_LAST_RUN_TIMESTAMP = Gauge(
+    "logiq_retention_last_run_timestamp_seconds",
+    "Unix time at which the most recent retention run finished.",
+    multiprocess_mode="mostrecent",
+)
+WORKER_BATCHES = Counter(
+    "logiq_worker_batches_total",
+    "Batches persisted by workers.",
+    ["kind"],
+)
+WORKER_BATCH_ROWS = Histogram(
+    "logiq_worker_batch_rows",
+    "Rows per persisted batch.",
+    buckets=(1, 5, 10, 50, 100, 250, 500, 1000, 2500, 5000, 10000),
+)
+EMBEDDED_TEXTS = Counter(
+    "logiq_embedded_texts_total",
+    "Texts encoded by the embedding model (cache misses only).",
+)
+CACHE_EVENTS = Counter(
+    "logiq_cache_events_total",
+    "Cache lookups by cache and outcome.",
+    ["cache", "result"],
+)
+LLM_TOKENS = Counter(
+    "logiq_llm_tokens_total",
+    "Tokens processed by the LLM.",
+    ["kind"],
+)
+LLM_REMOTE_REQUESTS = Counter(
+    "logiq_llm_remote_requests_total",
+    "Requests to the LLM inference tier by outcome (submitted, rejected, timeout).",
+    ["outcome"],
+)
+LLM_TOKENS_PER_SECOND = Histogram(
+    "logiq_llm_tokens_per_second",
+    "Generation throughput per completion.",
+    buckets=(1, 2, 5, 10, 20, 40, 80, 160),
+)
+MODEL_LOADED = Gauge(
+    "logiq_model_loaded",
+    "1 when the model is loaded in a live process.",
+    ["model"],
+    multiprocess_mode="livemax",
+)
+
+
+@contextmanager
+def observe_stage(stage: str) -> Iterator[None]:
+    """Record the duration of the enclosed block under `stage`, and trace it."""
+
+    with start_span(stage), STAGE_SECONDS.labels(stage=stage).time():
+        yield
+
+
+class QueueDepthCollector:
+    """Samples Celery queue lengths, and the ingest stream backlog, at scrape time."""
+
+    def __init__(self, queues: Sequence[str]) -> None:
+        self.queues = list(queues)
+        self._client = redis.Redis.from_url(get_settings().celery_broker_url)
+
+    def collect(self):
+        family = GaugeMetricFamily(
+            "logiq_celery_queue_depth", "Messages waiting in each Celery queue.", labels=["queue"])
+        for queue in self.queues:
+            try:
+                family.add_metric([queue], float(self._client.llen(queue)))
+            except redis.RedisError:
+                continue
+        yield family
+
+        settings = get_settings()
+        if settings.ingest_transport == "stream":
+            stream = GaugeMetricFamily(
+                "logiq_log_stream_backlog", "Logs waiting or in flight in the ingest stream.")
+            try:
+                stream.add_metric([], float(stream_backlog(get_stream_client(), settings.log_stream_key)))
+            except redis.RedisError:
+                return
+            yield stream
+
+
+@lru_cache
+def _scrape_registry() -> CollectorRegistry:
+    settings = get_settings()
+    if MULTIPROCESS_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    registry.register(QueueDepthCollector(["celery", settings.llm_queue_name]))
+    return registry
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Serialize all metrics, aggregated across processes when configured."""
+
+    return generate_latest(_scrape_registry()), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead(pid: int) -> None:
+    """Drop live-gauge samples of an exited process (multiprocess mode only)."""
+
+    if MULTIPROCESS_DIR:
+        multiprocess.mark_process_dead(f"{socket.gethostname()}-{pid}", MULTIPROCESS_DIR)
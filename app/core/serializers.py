@@ -0,0 +1,72 @@
+"""Compact binary serializer for ingest task messages.
+
+`logiq-msgpack` encodes task bodies with msgpack and compresses them with zlib
+once they reach `INGEST_COMPRESS_MIN_BYTES`. A one-byte header records which
+form follows, so small single-log messages skip compression entirely. It is
+registered with kombu and used only for the ingest tasks; every other task
+stays on JSON.
+"""
+
+from __future__ import annotations
+
+import zlib
+from datetime import date, datetime
+from typing import Any, Optional
+
+from kombu.serialization import register
+
+try:
+    import msgpack  # type: ignore
+except ImportError:  # pragma: no cover - optional dependency at runtime
+    msgpack = None  # type: ignore
+
+
+SERIALIZER_NAME = "logiq-msgpack"
+CONTENT_TYPE = "application/x-logiq-msgpack"
+
+_RAW = b"\x00"
+_ZLIB = b"\x01"
+# Level 1 gets most of the size win on repetitive log text at a fraction of the CPU.
+COMPRESSION_LEVEL = 1
+
+
+def _default(value: Any) -> Any:
+    # Mirrors kombu's JSON encoder, so a payload valid for one serializer is valid for both.
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__} with {SERIALIZER_NAME}")
+
+
+def encode(obj: Any, *, compress_min_bytes: int) -> bytes:
+    """Pack `obj`, compressing when the packed form is at least `compress_min_bytes`."""
+
+    packed = msgpack.packb(obj, use_bin_type=True, default=_default)
+    if compress_min_bytes and len(packed) >= compress_min_bytes:
+        return _ZLIB + zlib.compress(packed, COMPRESSION_LEVEL)
+    return _RAW + packed
+
+
+def decode(data: Any) -> Any:
+    """Inverse of `encode`."""
+
+    header, body = data[:1], memoryview(data)[1:]
+    if header == _ZLIB:
+        body = zlib.decompress(body)
+    elif header != _RAW:
+        raise ValueError(f"Unknown {SERIALIZER_NAME} header {header!r}")
+    return msgpack.unpackb(body, raw=False)
+
+
+def register_ingest_serializer(compress_min_bytes: int) -> Optional[str]:
+    """Register `logiq-msgpack` with kombu; returns its name, or `None` without msgpack."""
+
+    if msgpack is None:
+        return None
+    register(
+        SERIALIZER_NAME,
+        lambda obj: encode(obj, compress_min_bytes=compress_min_bytes),
+        decode,
+        content_type=CONTENT_TYPE,
+        content_encoding="binary",
+    )
+    return SERIALIZER_NAME
@@ -0,0 +1,139 @@
+"""Optional OpenTelemetry tracing across the API, the broker hop and the workers.
+
+Enabled with `TRACING_ENABLED=true` when the OpenTelemetry SDK is installed. Spans
+are exported over OTLP/HTTP (`TRACING_EXPORTER=otlp`, configured through the
+standard `OTEL_EXPORTER_OTLP_*` variables) or appended as JSON lines to
+`TRACING_FILE_PATH` (`TRACING_EXPORTER=file`). When tracing is off every helper is
+a no-op, so call sites need no guards.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+from contextlib import contextmanager
+from threading import Lock
+from typing import Any, Dict, Iterator, Mapping, MutableMapping, Optional
+
+from app.core.config import get_settings
+
+try:
+    from opentelemetry import trace  # type: ignore
+    from opentelemetry.propagate import extract, inject  # type: ignore
+    from opentelemetry.sdk.resources import Resource  # type: ignore
+    from opentelemetry.sdk.trace import TracerProvider  # type: ignore
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter  # type: ignore
+except ImportError:  # pragma: no cover - optional dependency at runtime
+    trace = None  # type: ignore
+
+try:
+    from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter  # type: ignore
+except ImportError:  # pragma: no cover - optional dependency at runtime
+    OTLPSpanExporter = None  # type: ignore
+
+
+logger = logging.getLogger(__name__)
+
+# W3C trace context and baggage, as written by the default propagator.
+TRACE_HEADERS = ("traceparent", "tracestate", "baggage")
+
+_provider: Optional["TracerProvider"] = None
+_provider_pid: Optional[int] = None
+_provider_lock = Lock()
+
+
+def _build_exporter(exporter: str, file_path: str):
+    if exporter == "file":
+        stream = open(file_path, "a", buffering=1, encoding="utf-8")
+        return ConsoleSpanExporter(out=stream, formatter=lambda span: span.to_json(indent=None) + "\n")
+    if exporter == "otlp":
+        if OTLPSpanExporter is None:
+            raise RuntimeError("TRACING_EXPORTER=otlp needs opentelemetry-exporter-otlp-proto-http.")
+        return OTLPSpanExporter()
+    raise ValueError(f"Unsupported TRACING_EXPORTER {exporter!r}; expected 'otlp' or 'file'.")
+
+
+def _build_provider() -> Optional["TracerProvider"]:
+    settings = get_settings()
+    if trace is None:
+        logger.warning("TRACING_ENABLED is set but the OpenTelemetry SDK is not installed.")
+        return None
+    try:
+        exporter = _build_exporter(settings.tracing_exporter, settings.tracing_file_path)
+    except Exception as exc:
+        logger.warning("Tracing disabled: %s", exc)
+        return None
+    provider = TracerProvider(
+        resource=Resource.create({"service.name": settings.tracing_service_name}))
+    provider.add_span_processor(BatchSpanProcessor(exporter))
+    return provider
+
+
+def get_tracer():
+    """Return this process's tracer, or `None` when tracing is off.
+
+    The provider is rebuilt after a fork because its export thread does not
+    survive into Celery's prefork children.
+    """
+
+    global _provider, _provider_pid
+    if not get_settings().tracing_enabled:
+        return None
+    pid = os.getpid()
+    if _provider_pid != pid:
+        with _provider_lock:
+            if _provider_pid != pid:
+                _provider = _build_provider()
+                _provider_pid = pid
+    return _provider.get_tracer("logiq") if _provider is not None else None
+
+
+@contextmanager
+def start_span(
+    name: str,
+    *,
+    kind: str = "internal",
+    carrier: Optional[Mapping[str, str]] = None,
+    attributes: Optional[Dict[str, Any]] = None,
+) -> Iterator[Optional[Any]]:
+    """Run the enclosed block in a span; yields the span, or `None` when disabled.
+
+    With `carrier`, the span continues the trace propagated in those headers
+    instead of the current context.
+    """
+
+    tracer = get_tracer()
+    if tracer is None:
+        yield None
+        return
+    parent = extract(carrier) if carrier is not None else None
+    with tracer.start_as_current_span(
+        name, context=parent, kind=trace.SpanKind[kind.upper()], attributes=attributes
+    ) as span:
+        yield span
+
+
+def inject_context(headers: MutableMapping[str, Any]) -> None:
+    """Write the current trace context into outgoing message headers."""
+
+    if get_tracer() is not None:
+        inject(headers)
+
+
+def task_carrier(request: Any) -> Dict[str, str]:
+    """Trace headers of a Celery task request, wherever the protocol put them."""
+
+    carrier: Dict[str, str] = {}
+    nested = getattr(request, "headers", None) or {}
+    for key in TRACE_HEADERS:
+        value = getattr(request, key, None) or nested.get(key)
+        if value:
+            carrier[key] = value
+    return carrier
+
+
+def flush_tracing() -> None:
+    """Export buffered spans, e.g. before a worker process exits."""
+
+    if _provider is not None and _provider_pid == os.getpid():
+        _provider.force_flush()
@@ -1,13 +1,25 @@
 """Database package shorthand."""
 
-from app.db.models import Base, LogRecord
-from app.db.session import SessionLocal, db_session_scope, get_db_session, init_db
+from app.db.bulk import copy_log_records
+from app.db.models import Base, LogRecord, LogTemplate
+from app.db.session import (
+    AsyncSessionLocal,
+    SessionLocal,
+    db_session_scope,
+    get_async_db_session,
+    get_db_session,
+    init_db,
+)
 
 __all__ = [
+    "AsyncSessionLocal",
     "Base",
     "LogRecord",
+    "LogTemplate",
     "SessionLocal",
+    "copy_log_records",
     "db_session_scope",
+    "get_async_db_session",
     "get_db_session",
     "init_db",
 ]
@@ -0,0 +1,172 @@
+"""Bulk loading of log rows through PostgreSQL `COPY ... FROM STDIN`."""
+
+from __future__ import annotations
+
+import io
+import json
+import struct
+import uuid
+from datetime import datetime, timezone
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.db.models import LogRecord
+from app.db.session import engine
+
+
+PG_COPY_SIGNATURE = b"PGCOPY\n\xff\r\n\x00"
+PG_EPOCH = datetime(2000, 1, 1, tzinfo=timezone.utc)
+
+_NULL = struct.pack(">i", -1)
+
+
+def _encode_text(value: str) -> bytes:
+    return value.encode("utf-8")
+
+
+def _encode_uuid(value: uuid.UUID) -> bytes:
+    return value.bytes
+
+
+def _encode_timestamptz(value: datetime) -> bytes:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    delta = value - PG_EPOCH
+    micros = (delta.days * 86_400 + delta.seconds) * 1_000_000 + delta.microseconds
+    return struct.pack(">q", micros)
+
+
+def _encode_json(value: dict) -> bytes:
+    return json.dumps(value or {}, separators=(",", ":"), default=str).encode("utf-8")
+
+
+def _encode_vector(value: Sequence[float]) -> bytes:
+    """pgvector binary layout: int16 dimensions, int16 unused, float4 values."""
+
+    array = np.asarray(value, dtype=">f4")
+    return struct.pack(">HH", array.shape[0], 0) + array.tobytes()
+
+
+# Column name, attribute getter and binary encoder, in COPY order.
+LOG_COPY_COLUMNS: List[Tuple[str, Callable[[LogRecord], object], Callable[[object], bytes]]] = [
+    ("id", lambda record: record.id, _encode_uuid),
+    ("created_at", lambda record: record.created_at, _encode_timestamptz),
+    ("log_timestamp", lambda record: record.log_timestamp, _encode_timestamptz),
+    ("service", lambda record: record.service, _encode_text),
+    ("level", lambda record: record.level, _encode_text),
+    ("message", lambda record: record.message, _encode_text),
+    ("attributes", lambda record: record.attributes, _encode_json),
+    ("embedding", lambda record: record.embedding, _encode_vector),
+    ("template_id", lambda record: record.template_id, _encode_uuid),
+]
+
+
+def _apply_defaults(record: LogRecord) -> None:
+    """Fill client-side defaults that the ORM would normally apply on flush."""
+
+    now = datetime.now(timezone.utc)
+    if record.id is None:
+        record.id = uuid.uuid4()
+    if record.created_at is None:
+        record.created_at = now
+    if record.log_timestamp is None:
+        record.log_timestamp = now
+    if record.attributes is None:
+        record.attributes = {}
+
+
+def encode_copy_row(record: LogRecord) -> bytes:
+    """Serialize one record as a binary COPY tuple."""
+
+    _apply_defaults(record)
+    parts = [struct.pack(">h", len(LOG_COPY_COLUMNS))]
+    for _, getter, encoder in LOG_COPY_COLUMNS:
+        value = getter(record)
+        if value is None:
+            parts.append(_NULL)
+            continue
+        encoded = encoder(value)
+        parts.append(struct.pack(">i", len(encoded)))
+        parts.append(encoded)
+    return b"".join(parts)
+
+
+def iter_copy_stream(records: Iterable[LogRecord], chunk_rows: int = 1000) -> Iterator[bytes]:
+    """Yield the binary COPY payload in chunks of `chunk_rows` tuples."""
+
+    yield PG_COPY_SIGNATURE + struct.pack(">ii", 0, 0)
+    chunk: List[bytes] = []
+    for record in records:
+        chunk.append(encode_copy_row(record))
+        if len(chunk) >= chunk_rows:
+            yield b"".join(chunk)
+            chunk = []
+    if chunk:
+        yield b"".join(chunk)
+    yield struct.pack(">h", -1)
+
+
+class _IteratorReader(io.RawIOBase):
+    """File-like adapter so `copy_expert` can pull from a generator lazily."""
+
+    def __init__(self, chunks: Iterator[bytes]) -> None:
+        self._chunks = chunks
+        self._buffer = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:  # type: ignore[override]
+        while not self._buffer:
+            try:
+                self._buffer = next(self._chunks)
+            except StopIteration:
+                return 0
+        size = min(len(buffer), len(self._buffer))
+        buffer[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+
+def copy_log_records(
+    records: Iterable[LogRecord],
+    *,
+    table: str = LogRecord.__tablename__,
+    chunk_rows: int = 1000,
+    dbapi_connection: Optional[object] = None,
+) -> int:
+    """Stream records into `table` with binary COPY and return the row count.
+
+    When `dbapi_connection` is omitted a pooled connection is checked out and the
+    load is committed as one transaction; otherwise the caller owns the commit.
+    """
+
+    written = 0
+
+    def counted() -> Iterator[LogRecord]:
+        nonlocal written
+        for record in records:
+            written += 1
+            yield record
+
+    column_list = ", ".join(name for name, _, _ in LOG_COPY_COLUMNS)
+    statement = f"COPY {table} ({column_list}) FROM STDIN WITH (FORMAT binary)"
+    reader = io.BufferedReader(_IteratorReader(iter_copy_stream(counted(), chunk_rows)))
+
+    if dbapi_connection is not None:
+        with dbapi_connection.cursor() as cursor:  # type: ignore[attr-defined]
+            cursor.copy_expert(statement, reader)
+        return written
+
+    raw = engine.raw_connection()
+    try:
+        with raw.cursor() as cursor:
+            cursor.copy_expert(statement, reader)
+        raw.commit()
+    except Exception:
+        raw.rollback()
+        raise
+    finally:
+        raw.close()
+    return written
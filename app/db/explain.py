@@ -0,0 +1,81 @@
+"""`EXPLAIN (ANALYZE, BUFFERS)` support for debugging retrieval statements."""
+
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.base import Executable
+from sqlalchemy.sql.elements import ClauseElement
+
+
+class Explain(Executable, ClauseElement):
+    """Wraps a statement so it compiles as `EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON)`.
+
+    Bind parameters (including pgvector query vectors) are processed exactly as
+    they would be for the wrapped statement.
+    """
+
+    inherit_cache = False
+
+    def __init__(self, statement: Executable) -> None:
+        self.statement = statement
+
+
+@compiles(Explain, "postgresql")
+def _compile_explain(element: Explain, compiler, **kw) -> str:
+    return "EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
+@dataclass
+class PlanSummary:
+    """Headline numbers from one analyzed plan, plus the plan itself."""
+
+    planning_ms: float
+    execution_ms: float
+    rows_scanned: int
+    plan: Dict[str, Any]
+
+
+def _walk(node: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    yield node
+    for child in node.get("Plans", ()):
+        yield from _walk(child)
+
+
+def summarize_plan(raw: Any) -> PlanSummary:
+    """Reduce Postgres' JSON plan output to planning/execution time and rows read.
+
+    Rows scanned counts every row a scan node produced or discarded by its filter,
+    across all loops.
+    """
+
+    document = json.loads(raw) if isinstance(raw, str) else raw
+    plan = document[0]
+    rows = 0
+    for node in _walk(plan["Plan"]):
+        if node.get("Node Type", "").endswith("Scan"):
+            loops = node.get("Actual Loops", 1)
+            rows += (node.get("Actual Rows", 0) + node.get("Rows Removed by Filter", 0)) * loops
+    return PlanSummary(
+        planning_ms=float(plan.get("Planning Time", 0.0)),
+        execution_ms=float(plan.get("Execution Time", 0.0)),
+        rows_scanned=int(rows),
+        plan=plan,
+    )
+
+
+def explain_analyze(session: Session, statement: Executable) -> PlanSummary:
+    """Execute `statement` under `EXPLAIN ANALYZE` and summarize the plan."""
+
+    return summarize_plan(session.execute(Explain(statement)).scalar_one())
+
+
+async def aexplain_analyze(session: AsyncSession, statement: Executable) -> PlanSummary:
+    """Async counterpart of `explain_analyze`."""
+
+    return summarize_plan((await session.execute(Explain(statement))).scalar_one())
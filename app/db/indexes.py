@@ -0,0 +1,226 @@
+"""Management of approximate-nearest-neighbour indexes on embedding columns.
+
+Usage::
+
+    python -m app.db.indexes ensure    # create missing indexes (blocking)
+    python -m app.db.indexes rebuild   # rebuild with current settings, concurrently
+
+`rebuild` builds a replacement index with `CREATE INDEX CONCURRENTLY`, then swaps
+it in, so reads and writes continue while it runs. The partitioned `logs` table is
+indexed (and rebuilt) one partition at a time. Use it after bulk loads (IVFFlat
+centroids are computed from existing rows) or after changing index parameters.
+
+HNSW indexes are created with each partition. IVFFlat trains its lists on the
+rows present at build time, so a partition only gets one once its range has
+ended; `maintain_log_partitions` builds those concurrently as partitions seal.
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import sys
+from datetime import datetime, timezone
+from typing import List, Optional, Sequence, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import Settings, get_settings
+from app.db.partitions import PARENT_TABLE, is_partitioned, list_partitions, partition_range
+from app.db.session import engine
+
+
+logger = logging.getLogger(__name__)
+
+INDEX_TYPES = ("hnsw", "ivfflat")
+
+# (table, column) pairs that are searched by cosine distance. Partitioned tables
+# are indexed per partition so each one can be rebuilt concurrently on its own.
+VECTOR_COLUMNS: List[Tuple[str, str]] = [
+    (PARENT_TABLE, "embedding"),
+    ("log_templates", "embedding"),
+]
+
+
+def index_name(table: str, column: str, index_type: str) -> str:
+    return f"ix_{table}_{column}_{index_type}"
+
+
+def _index_options(settings: Settings) -> str:
+    if settings.vector_index_type == "hnsw":
+        return f"WITH (m = {int(settings.vector_index_m)}, ef_construction = {int(settings.vector_index_ef_construction)})"
+    return f"WITH (lists = {int(settings.vector_index_lists)})"
+
+
+def create_index_sql(
+    table: str, column: str, settings: Settings, *, name: Optional[str] = None, concurrently: bool = False
+) -> str:
+    """DDL for the configured vector index on `table.column`."""
+
+    index_type = settings.vector_index_type
+    name = name or index_name(table, column, index_type)
+    return (
+        f"CREATE INDEX {'CONCURRENTLY ' if concurrently else ''}IF NOT EXISTS {name} "
+        f"ON {table} USING {index_type} ({column} vector_cosine_ops) {_index_options(settings)}"
+    )
+
+
+def needs_sealed_partitions(settings: Settings) -> bool:
+    """Whether partition indexes must wait for data (IVFFlat) instead of being built up front."""
+
+    return settings.vector_index_type == "ivfflat"
+
+
+def is_sealed(partition: str, now: Optional[datetime] = None) -> bool:
+    """True once no new timestamps fall into `partition`; the legacy partition always is."""
+
+    bounds = partition_range(partition)
+    return bounds is None or bounds[1] <= (now or datetime.now(timezone.utc))
+
+
+def _index_targets(connection: Connection, settings: Settings) -> List[Tuple[str, str]]:
+    """Concrete tables to index, expanding `logs` into its partitions.
+
+    With IVFFlat, partitions whose range has not ended yet are left out.
+    """
+
+    targets: List[Tuple[str, str]] = []
+    for table, column in VECTOR_COLUMNS:
+        if table == PARENT_TABLE and is_partitioned(connection):
+            partitions = list_partitions(connection)
+            if needs_sealed_partitions(settings):
+                partitions = [partition for partition in partitions if is_sealed(partition)]
+            targets.extend((partition, column) for partition in partitions)
+        else:
+            targets.append((table, column))
+    return targets
+
+
+def ensure_vector_indexes_for(
+    connection: Connection, table: str, column: str, settings: Settings | None = None
+) -> None:
+    """Create the configured vector index on a single table if missing."""
+
+    settings = settings or get_settings()
+    if settings.vector_index_type in INDEX_TYPES:
+        connection.execute(text(create_index_sql(table, column, settings)))
+
+
+def ensure_vector_indexes(connection: Connection, settings: Settings | None = None) -> None:
+    """Create the configured vector indexes if they do not exist yet."""
+
+    settings = settings or get_settings()
+    for table, column in _index_targets(connection, settings):
+        ensure_vector_indexes_for(connection, table, column, settings)
+
+
+def index_is_valid(connection: Connection, name: str) -> Optional[bool]:
+    """`pg_index.indisvalid` for `name`, or `None` if there is no such index."""
+
+    return connection.execute(text(
+        "SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+        "WHERE c.relname = :name AND pg_table_is_visible(c.oid)"
+    ), {"name": name}).scalar()
+
+
+def build_missing_vector_indexes(settings: Settings | None = None) -> List[str]:
+    """Concurrently create configured vector indexes that do not exist yet.
+
+    Leftovers of an interrupted concurrent build are invalid; they are dropped and
+    built again. Returns the names of the indexes built.
+    """
+
+    settings = settings or get_settings()
+    if settings.vector_index_type not in INDEX_TYPES:
+        return []
+    built: List[str] = []
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        for table, column in _index_targets(connection, settings):
+            name = index_name(table, column, settings.vector_index_type)
+            valid = index_is_valid(connection, name)
+            if valid:
+                continue
+            if valid is False:
+                connection.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+            logger.info("Building %s concurrently", name)
+            connection.execute(text(create_index_sql(table, column, settings, concurrently=True)))
+            built.append(name)
+    return built
+
+
+def rebuild_vector_indexes(settings: Settings | None = None) -> None:
+    """Rebuild vector indexes concurrently, dropping ones of other types."""
+
+    settings = settings or get_settings()
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        for table, column in _index_targets(connection, settings):
+            if settings.vector_index_type in INDEX_TYPES:
+                target = index_name(table, column, settings.vector_index_type)
+                staging = f"{target}_new"
+                logger.info("Building %s concurrently", staging)
+                connection.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {staging}"))
+                connection.execute(text(create_index_sql(
+                    table, column, settings, name=staging, concurrently=True)))
+                connection.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {target}"))
+                connection.execute(text(f"ALTER INDEX {staging} RENAME TO {target}"))
+
+            for other in INDEX_TYPES:
+                if other != settings.vector_index_type:
+                    connection.execute(text(
+                        f"DROP INDEX CONCURRENTLY IF EXISTS {index_name(table, column, other)}"))
+            logger.info("Vector index on %s.%s is up to date", table, column)
+
+
+def _search_settings(
+    ef_search: Optional[int], probes: Optional[int]
+) -> Optional[Tuple[str, int]]:
+    settings = get_settings()
+    if settings.vector_index_type == "hnsw":
+        return "hnsw.ef_search", int(ef_search or settings.vector_search_ef_search)
+    if settings.vector_index_type == "ivfflat":
+        return "ivfflat.probes", int(probes or settings.vector_search_probes)
+    return None
+
+
+_SET_CONFIG = text("SELECT set_config(:name, :value, true)")
+
+
+def apply_search_settings(
+    session: Session, *, ef_search: Optional[int] = None, probes: Optional[int] = None
+) -> None:
+    """Set per-transaction ANN search parameters, falling back to configured defaults."""
+
+    setting = _search_settings(ef_search, probes)
+    if setting is not None:
+        session.execute(_SET_CONFIG, {"name": setting[0], "value": str(setting[1])})
+
+
+async def aapply_search_settings(
+    session: AsyncSession, *, ef_search: Optional[int] = None, probes: Optional[int] = None
+) -> None:
+    """Async counterpart of `apply_search_settings`."""
+
+    setting = _search_settings(ef_search, probes)
+    if setting is not None:
+        await session.execute(_SET_CONFIG, {"name": setting[0], "value": str(setting[1])})
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Manage pgvector ANN indexes.")
+    parser.add_argument("command", choices=["ensure", "rebuild"])
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    if args.command == "ensure":
+        with engine.begin() as connection:
+            ensure_vector_indexes(connection)
+    else:
+        rebuild_vector_indexes()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,13 +4,17 @@ import uuid
 from datetime import datetime
 
 from pgvector.sqlalchemy import Vector
-from sqlalchemy import Column, DateTime, JSON, String, Text
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, Computed, DateTime, Index, JSON, String, Text
+from sqlalchemy.dialects.postgresql import TSVECTOR, UUID
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 
 
 EMBEDDING_DIM = 384
 
+# The `simple` configuration neither stems nor drops stop words, so identifiers
+# such as order ids, hostnames and error codes survive as exact lexemes.
+TEXT_SEARCH_CONFIG = "simple"
+
 
 class Base(DeclarativeBase):
     """Base declarative model with metadata shared across tables."""
@@ -20,6 +24,12 @@ class LogRecord(Base):
     """Primary log storage table containing raw text and embedding."""
 
     __tablename__ = "logs"
+    # Range-partitioned by time (see app/db/partitions.py), so the partition key
+    # has to be part of the primary key.
+    __table_args__ = (
+        Index("ix_logs_message_tsv", "message_tsv", postgresql_using="gin"),
+        {"postgresql_partition_by": "RANGE (log_timestamp)"},
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True), primary_key=True, default=uuid.uuid4
@@ -28,7 +38,7 @@ class LogRecord(Base):
         DateTime(timezone=True), default=datetime.utcnow, nullable=False
     )
     log_timestamp: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True), default=datetime.utcnow, nullable=False
+        DateTime(timezone=True), primary_key=True, default=datetime.utcnow, nullable=False
     )
     service: Mapped[str] = mapped_column(
         String(length=255), index=True, nullable=False)
@@ -38,6 +48,13 @@ class LogRecord(Base):
     attributes: Mapped[dict] = mapped_column(JSON, default=dict)
     embedding: Mapped[list[float] | None] = mapped_column(
         Vector(EMBEDDING_DIM))
+    template_id: Mapped[uuid.UUID | None] = mapped_column(
+        UUID(as_uuid=True), index=True, nullable=True)
+    message_tsv: Mapped[str | None] = mapped_column(
+        TSVECTOR,
+        Computed(f"to_tsvector('{TEXT_SEARCH_CONFIG}', message)", persisted=True),
+        deferred=True,
+    )
 
     def to_dict(self) -> dict:
         """Serialize the log record into primitive types."""
@@ -50,4 +67,20 @@ class LogRecord(Base):
             "level": self.level,
             "message": self.message,
             "attributes": self.attributes or {},
+            "template_id": str(self.template_id) if self.template_id else None,
         }
+
+
+class LogTemplate(Base):
+    """Mined message template whose embedding is shared by every matching log."""
+
+    __tablename__ = "log_templates"
+
+    id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), primary_key=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=datetime.utcnow, nullable=False
+    )
+    template: Mapped[str] = mapped_column(Text, nullable=False)
+    embedding: Mapped[list[float] | None] = mapped_column(
+        Vector(EMBEDDING_DIM))
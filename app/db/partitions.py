@@ -0,0 +1,267 @@
+"""Range partitioning of the `logs` table on `log_timestamp`.
+
+Partitions are daily or hourly (`LOGS_PARTITION_INTERVAL`) and named after the
+start of their range, e.g. `logs_p20240510` or `logs_p2024051012`. Future
+partitions are pre-created by a periodic Celery task and writers create any
+missing partition for the timestamps they are about to insert.
+
+Usage::
+
+    python -m app.db.partitions maintain   # pre-create upcoming partitions
+    python -m app.db.partitions migrate    # convert an unpartitioned `logs` table
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import re
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from threading import Lock
+from typing import Iterable, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from app.core.config import get_settings
+from app.db.session import engine
+
+
+logger = logging.getLogger(__name__)
+
+PARENT_TABLE = "logs"
+INTERVALS = {"day": timedelta(days=1), "hour": timedelta(hours=1)}
+LEGACY_PARTITION = "logs_legacy"
+PARTITION_PATTERN = re.compile(r"^logs_p(\d{8}|\d{10})$")
+_BOUND_PATTERN = re.compile(r"TO \('([^']+)'\)")
+
+# Partitions this process has seen, so inserts skip the catalog lookup. The set is
+# dropped every `KNOWN_PARTITIONS_TTL_SECONDS` (and by `forget_partitions`) so that
+# partitions removed elsewhere, e.g. by retention, are noticed.
+KNOWN_PARTITIONS_TTL_SECONDS = 300.0
+_known_partitions: Set[str] = set()
+_known_expires_at = 0.0
+# Until this time `logs` is assumed to still be a plain table and upkeep is skipped.
+_unpartitioned_until = 0.0
+_known_lock = Lock()
+
+
+def _interval() -> Tuple[str, timedelta]:
+    name = get_settings().logs_partition_interval
+    if name not in INTERVALS:
+        raise ValueError(
+            f"Unsupported LOGS_PARTITION_INTERVAL '{name}'; expected one of {sorted(INTERVALS)}")
+    return name, INTERVALS[name]
+
+
+def partition_start(value: datetime, interval: str) -> datetime:
+    """Truncate `value` to the start of its partition range (UTC)."""
+
+    value = value.astimezone(timezone.utc) if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    if interval == "hour":
+        return value.replace(minute=0, second=0, microsecond=0)
+    return value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def partition_name(start: datetime, interval: str) -> str:
+    return f"{PARENT_TABLE}_p{start.strftime('%Y%m%d%H' if interval == 'hour' else '%Y%m%d')}"
+
+
+def parse_partition_start(name: str) -> Optional[datetime]:
+    """Inverse of `partition_name`; `None` for tables that are not range partitions."""
+
+    match = PARTITION_PATTERN.match(name)
+    if not match:
+        return None
+    digits = match.group(1)
+    fmt = "%Y%m%d%H" if len(digits) == 10 else "%Y%m%d"
+    return datetime.strptime(digits, fmt).replace(tzinfo=timezone.utc)
+
+
+def partition_range(name: str) -> Optional[Tuple[datetime, datetime]]:
+    """`[start, end)` covered by a partition, inferred from its name."""
+
+    start = parse_partition_start(name)
+    if start is None:
+        return None
+    interval = "hour" if len(name) == len(f"{PARENT_TABLE}_p") + 10 else "day"
+    return start, start + INTERVALS[interval]
+
+
+def is_partitioned(connection: Connection) -> bool:
+    return bool(connection.execute(text(
+        "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+        "WHERE c.relname = :name AND pg_table_is_visible(c.oid)"
+    ), {"name": PARENT_TABLE}).scalar())
+
+
+def list_partitions(connection: Connection) -> List[str]:
+    """Names of all current partitions of `logs`, oldest first."""
+
+    rows = connection.execute(text(
+        "SELECT child.relname FROM pg_inherits i "
+        "JOIN pg_class parent ON parent.oid = i.inhparent "
+        "JOIN pg_class child ON child.oid = i.inhrelid "
+        "WHERE parent.relname = :name AND pg_table_is_visible(parent.oid) ORDER BY child.relname"
+    ), {"name": PARENT_TABLE}).scalars()
+    return list(rows)
+
+
+def _legacy_upper_bound(connection: Connection) -> Optional[datetime]:
+    """Upper bound of the migrated legacy partition, if one is attached."""
+
+    bound = connection.execute(text(
+        "SELECT pg_get_expr(c.relpartbound, c.oid) FROM pg_class c "
+        "WHERE c.relname = :name AND c.relispartition AND pg_table_is_visible(c.oid)"
+    ), {"name": LEGACY_PARTITION}).scalar()
+    match = _BOUND_PATTERN.search(bound or "")
+    if not match:
+        return None
+    return datetime.fromisoformat(match.group(1).replace(" ", "T")).astimezone(timezone.utc)
+
+
+def forget_partitions(names: Optional[Iterable[str]] = None) -> None:
+    """Drop partitions (all of them by default) from this process' known set."""
+
+    global _unpartitioned_until
+    with _known_lock:
+        if names is None:
+            _known_partitions.clear()
+            _unpartitioned_until = 0.0
+        else:
+            _known_partitions.difference_update(names)
+
+
+def _create_partition(connection: Connection, start: datetime, interval: str) -> str:
+    from app.db.indexes import ensure_vector_indexes_for, needs_sealed_partitions
+
+    name = partition_name(start, interval)
+    end = start + INTERVALS[interval]
+    connection.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {PARENT_TABLE} "
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    ))
+    # An IVFFlat index built now would be trained on an empty table; it is built
+    # by `maintain_log_partitions` once the partition's range has ended.
+    if not needs_sealed_partitions(get_settings()):
+        ensure_vector_indexes_for(connection, name, "embedding")
+    return name
+
+
+def ensure_partitions(connection: Connection, starts: Iterable[datetime]) -> List[str]:
+    """Create partitions beginning at each of `starts` that are not known yet.
+
+    Does nothing while `logs` is still an unpartitioned table.
+    """
+
+    global _unpartitioned_until
+    interval, _ = _interval()
+    wanted = {partition_name(start, interval): start for start in starts}
+    with _known_lock:
+        missing = {name: start for name, start in wanted.items() if name not in _known_partitions}
+    if not missing:
+        return []
+
+    if not is_partitioned(connection):
+        with _known_lock:
+            _unpartitioned_until = time.monotonic() + KNOWN_PARTITIONS_TTL_SECONDS
+        return []
+
+    # Serialize DDL across workers racing to create the same partition.
+    connection.execute(text("SELECT pg_advisory_xact_lock(hashtext('logiq_log_partitions'))"))
+    existing = set(list_partitions(connection))
+    floor = _legacy_upper_bound(connection)
+    created = [
+        _create_partition(connection, start, interval)
+        for name, start in sorted(missing.items())
+        if name not in existing and (floor is None or start >= floor)
+    ]
+    with _known_lock:
+        _known_partitions.update(missing)
+    if created:
+        logger.info("Created log partitions: %s", ", ".join(created))
+    return created
+
+
+def ensure_partitions_for(timestamps: Iterable[datetime]) -> None:
+    """Make sure every timestamp in an upcoming insert has a partition to land in."""
+
+    global _known_expires_at
+    interval, _ = _interval()
+    starts = {partition_start(value, interval) for value in timestamps}
+    now = time.monotonic()
+    with _known_lock:
+        if now < _unpartitioned_until:
+            return
+        if now >= _known_expires_at:
+            _known_partitions.clear()
+            _known_expires_at = now + KNOWN_PARTITIONS_TTL_SECONDS
+        if all(partition_name(start, interval) in _known_partitions for start in starts):
+            return
+    with engine.begin() as connection:
+        ensure_partitions(connection, starts)
+
+
+def premake_partitions(connection: Connection, ahead: Optional[int] = None) -> List[str]:
+    """Create the current partition plus `ahead` future ones."""
+
+    interval, step = _interval()
+    ahead = get_settings().logs_partition_premake if ahead is None else ahead
+    first = partition_start(datetime.now(timezone.utc), interval)
+    return ensure_partitions(connection, [first + step * offset for offset in range(ahead + 1)])
+
+
+def migrate_unpartitioned(connection: Connection) -> None:
+    """Convert a legacy heap `logs` table into a partitioned one.
+
+    The old table is renamed and attached as a single partition covering
+    everything up to the end of its newest row's interval, so no data is copied.
+    """
+
+    from app.db.indexes import INDEX_TYPES, index_name
+    from app.db.models import LogRecord
+
+    if is_partitioned(connection):
+        logger.info("logs is already partitioned; nothing to migrate")
+        return
+
+    interval, step = _interval()
+    newest = connection.execute(text("SELECT max(log_timestamp) FROM logs")).scalar()
+    boundary = partition_start(newest or datetime.now(timezone.utc), interval) + step
+
+    connection.execute(text(f"ALTER TABLE logs RENAME TO {LEGACY_PARTITION}"))
+    connection.execute(text(f"ALTER TABLE {LEGACY_PARTITION} DROP CONSTRAINT IF EXISTS logs_pkey"))
+    connection.execute(text(f"ALTER TABLE {LEGACY_PARTITION} ADD PRIMARY KEY (id, log_timestamp)"))
+    for index in LogRecord.__table__.indexes:
+        connection.execute(text(f"ALTER INDEX IF EXISTS {index.name} RENAME TO {index.name}_legacy"))
+    for index_type in INDEX_TYPES:
+        connection.execute(text(
+            f"ALTER INDEX IF EXISTS {index_name('logs', 'embedding', index_type)} "
+            f"RENAME TO {index_name(LEGACY_PARTITION, 'embedding', index_type)}"
+        ))
+    LogRecord.__table__.create(bind=connection)
+    connection.execute(text(
+        f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {LEGACY_PARTITION} "
+        f"FOR VALUES FROM (MINVALUE) TO ('{boundary.isoformat()}')"
+    ))
+    logger.info("Attached legacy rows as %s (< %s)", LEGACY_PARTITION, boundary.isoformat())
+    forget_partitions()
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Manage time partitions of the logs table.")
+    parser.add_argument("command", choices=["maintain", "migrate"])
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    with engine.begin() as connection:
+        if args.command == "migrate":
+            migrate_unpartitioned(connection)
+        premake_partitions(connection)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+"""Schema upgrades that are too expensive to run on every startup.
+
+Adding the generated `message_tsv` column rewrites the whole `logs` table under
+an exclusive lock, and index builds on a populated table take minutes. So
+`init_db` only applies them while `logs` is still empty, and existing deployments
+upgrade explicitly, during a quiet period::
+
+    python -m app.db.schema upgrade
+
+Indexes are built with `CREATE INDEX CONCURRENTLY`, so writes continue while they
+run. On the partitioned `logs` table each partition is indexed concurrently and
+then attached to an index created `ON ONLY` the parent.
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import sys
+from typing import List, Sequence, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from app.db.indexes import build_missing_vector_indexes, ensure_vector_indexes, index_is_valid
+from app.db.models import TEXT_SEARCH_CONFIG
+from app.db.partitions import PARENT_TABLE, is_partitioned, list_partitions
+from app.db.session import engine
+
+
+logger = logging.getLogger(__name__)
+
+TSV_COLUMN_DDL = (
+    f"ALTER TABLE {PARENT_TABLE} ADD COLUMN IF NOT EXISTS message_tsv tsvector "
+    f"GENERATED ALWAYS AS (to_tsvector('{TEXT_SEARCH_CONFIG}', message)) STORED"
+)
+
+# Index name and the part of `CREATE INDEX` after `ON <table>`.
+LOG_INDEXES: List[Tuple[str, str]] = [
+    ("ix_logs_template_id", "(template_id)"),
+    ("ix_logs_message_tsv", "USING gin (message_tsv)"),
+]
+
+
+def _has_column(connection: Connection, table: str, column: str) -> bool:
+    return bool(connection.execute(text(
+        "SELECT 1 FROM information_schema.columns "
+        "WHERE table_schema = current_schema() AND table_name = :table AND column_name = :column"
+    ), {"table": table, "column": column}).scalar())
+
+
+def pending_upgrades(connection: Connection) -> List[str]:
+    """Descriptions of the upgrades `logs` still needs; empty when it is current."""
+
+    pending = []
+    if not _has_column(connection, PARENT_TABLE, "message_tsv"):
+        pending.append("message_tsv column")
+    pending.extend(f"index {name}" for name, _ in LOG_INDEXES if not index_is_valid(connection, name))
+    return pending
+
+
+def is_empty(connection: Connection) -> bool:
+    return connection.execute(text(f"SELECT NOT EXISTS (SELECT 1 FROM {PARENT_TABLE})")).scalar()
+
+
+def apply_upgrades(connection: Connection) -> None:
+    """Apply every upgrade in the caller's transaction; only cheap on an empty table."""
+
+    connection.execute(text(TSV_COLUMN_DDL))
+    for name, definition in LOG_INDEXES:
+        connection.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {PARENT_TABLE} {definition}"))
+    ensure_vector_indexes(connection)
+
+
+def _attached_partitions(connection: Connection, name: str) -> List[str]:
+    """Partitions that already have an index attached to the parent index `name`."""
+
+    return list(connection.execute(text(
+        "SELECT t.relname FROM pg_inherits i "
+        "JOIN pg_index x ON x.indexrelid = i.inhrelid "
+        "JOIN pg_class t ON t.oid = x.indrelid "
+        "WHERE i.inhparent = to_regclass(:name)"
+    ), {"name": name}).scalars())
+
+
+def _build_index_concurrently(connection: Connection, name: str, definition: str) -> None:
+    if index_is_valid(connection, name):
+        return
+    if not is_partitioned(connection):
+        # A failed concurrent build leaves an invalid index behind; start over.
+        connection.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+        logger.info("Building %s concurrently", name)
+        connection.execute(text(
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {PARENT_TABLE} {definition}"))
+        return
+
+    # The parent index stays invalid until every partition has one attached.
+    connection.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON ONLY {PARENT_TABLE} {definition}"))
+    attached = set(_attached_partitions(connection, name))
+    for partition in list_partitions(connection):
+        if partition in attached:
+            continue
+        child = name.replace(f"ix_{PARENT_TABLE}_", f"ix_{partition}_", 1)
+        connection.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {child}"))
+        logger.info("Building %s concurrently", child)
+        connection.execute(text(
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {child} ON {partition} {definition}"))
+        connection.execute(text(f"ALTER INDEX {name} ATTACH PARTITION {child}"))
+
+
+def upgrade_schema() -> None:
+    """Bring an existing `logs` table up to date without blocking writes for index builds.
+
+    Adding `message_tsv` still rewrites the table once; every index is built
+    concurrently, followed by any missing vector index.
+    """
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        if not _has_column(connection, PARENT_TABLE, "message_tsv"):
+            logger.info("Adding logs.message_tsv; this rewrites the table")
+            connection.execute(text(TSV_COLUMN_DDL))
+        for name, definition in LOG_INDEXES:
+            _build_index_concurrently(connection, name, definition)
+    build_missing_vector_indexes()
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Apply expensive schema upgrades to the logs table.")
+    parser.add_argument("command", choices=["upgrade"])
+    parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    upgrade_schema()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,31 +1,91 @@
 """Database session and initialization utilities."""
 
+import logging
 from contextlib import contextmanager
-from typing import Iterator
+from typing import AsyncIterator, Iterator
 
+import psycopg2
 from sqlalchemy import create_engine, text
+from sqlalchemy import exc as sa_exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import Session, sessionmaker
 
 from app.core.config import get_settings
 
 
+logger = logging.getLogger(__name__)
+
 settings = get_settings()
 
+# Failures that mean Postgres could not be reached, as opposed to a problem with the data.
+DB_UNAVAILABLE_ERRORS = (
+    sa_exc.OperationalError,
+    sa_exc.InterfaceError,
+    sa_exc.DisconnectionError,
+    psycopg2.OperationalError,
+    psycopg2.InterfaceError,
+)
+
 engine = create_engine(settings.database_url, pool_pre_ping=True, future=True)
 
 SessionLocal = sessionmaker(
     bind=engine, expire_on_commit=False, class_=Session)
 
 
+def _async_database_url(url: str) -> str:
+    """Swap the sync driver for psycopg 3, which also speaks asyncio."""
+
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "postgresql":
+        parsed = parsed.set(drivername="postgresql+psycopg")
+    return parsed.render_as_string(hide_password=False)
+
+
+async_engine = create_async_engine(
+    settings.async_database_url or _async_database_url(settings.database_url),
+    pool_pre_ping=True,
+)
+
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, expire_on_commit=False, class_=AsyncSession)
+
+
 def init_db() -> None:
-    """Ensure pgvector extension exists and create tables."""
+    """Ensure pgvector extension exists and create tables.
+
+    Only cheap, idempotent DDL runs here, because every API and worker process
+    calls it at startup. Upgrades that rewrite or index a populated `logs` table
+    are applied only while it is empty; otherwise they are left to
+    `python -m app.db.schema upgrade` (see app/db/schema.py).
+    """
 
     from app.db import models  # noqa: F401
+    from app.db.partitions import is_partitioned, premake_partitions
+    from app.db.schema import apply_upgrades, is_empty, pending_upgrades
 
     with engine.begin() as connection:
         connection.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
     models.Base.metadata.create_all(bind=engine)
 
+    with engine.begin() as connection:
+        # Nullable without a default, so this only touches the catalog.
+        connection.execute(
+            text("ALTER TABLE logs ADD COLUMN IF NOT EXISTS template_id UUID"))
+        if is_partitioned(connection):
+            premake_partitions(connection)
+        else:
+            logger.warning(
+                "The logs table is not partitioned; run `python -m app.db.partitions migrate`.")
+        if is_empty(connection):
+            apply_upgrades(connection)
+        else:
+            pending = pending_upgrades(connection)
+            if pending:
+                logger.warning(
+                    "The logs table needs %s; run `python -m app.db.schema upgrade`.",
+                    ", ".join(pending))
+
 
 @contextmanager
 def db_session_scope() -> Iterator[Session]:
@@ -47,3 +107,15 @@ def get_db_session() -> Iterator[Session]:
 
     with db_session_scope() as session:
         yield session
+
+
+async def get_async_db_session() -> AsyncIterator[AsyncSession]:
+    """FastAPI dependency that yields an `AsyncSession` for non-blocking queries."""
+
+    async with AsyncSessionLocal() as session:
+        try:
+            yield session
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            raise
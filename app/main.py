@@ -2,11 +2,13 @@
 
 import logging
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.api import api_router
 from app.core.config import get_settings
+from app.core.metrics import render_metrics
+from app.core.tracing import start_span
 from app.db.session import init_db
 
 
@@ -26,6 +28,24 @@ app.add_middleware(
 )
 
 
+if settings.tracing_enabled:
+
+    @app.middleware("http")
+    async def trace_requests(request: Request, call_next):
+        """Open a server span per request, continuing any incoming trace context."""
+
+        with start_span(
+            f"{request.method} {request.url.path}",
+            kind="server",
+            carrier=dict(request.headers),
+            attributes={"http.method": request.method, "http.target": request.url.path},
+        ) as span:
+            response = await call_next(request)
+            if span is not None:
+                span.set_attribute("http.status_code", response.status_code)
+            return response
+
+
 @app.on_event("startup")
 def on_startup() -> None:
     """Ensure database schema is ready."""
@@ -40,4 +60,12 @@ async def health_check() -> dict:
     return {"status": "ok"}
 
 
+@app.get("/metrics", include_in_schema=False)
+def metrics() -> Response:
+    """Prometheus exposition for the API and, in multiprocess mode, all workers."""
+
+    payload, content_type = render_metrics()
+    return Response(content=payload, media_type=content_type)
+
+
 app.include_router(api_router)
@@ -1,14 +1,26 @@
 """Schema package exports."""
 
-from app.schemas.logs import LogIngestPayload, LogIngestResponse, LogQueryContext, LogRecordOut
-from app.schemas.query import LogQueryFilters, LogQueryRequest, LogQueryResponse
+from app.schemas.logs import (
+    LogIngestBatchResponse,
+    LogIngestLineError,
+    LogIngestPayload,
+    LogIngestResponse,
+    LogIngestStreamResponse,
+    LogQueryContext,
+    LogRecordOut,
+)
+from app.schemas.query import LogQueryFilters, LogQueryRequest, LogQueryResponse, LogQueryTimings
 
 __all__ = [
+    "LogIngestBatchResponse",
+    "LogIngestLineError",
     "LogIngestPayload",
     "LogIngestResponse",
+    "LogIngestStreamResponse",
     "LogQueryContext",
     "LogRecordOut",
     "LogQueryFilters",
     "LogQueryRequest",
     "LogQueryResponse",
+    "LogQueryTimings",
 ]
@@ -1,7 +1,8 @@
 """Pydantic schemas for log ingestion and representation."""
 
-from datetime import datetime
-from typing import Any, Dict, Optional
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
 
 from pydantic import BaseModel, ConfigDict, Field
 
@@ -30,12 +31,58 @@ class LogIngestPayload(BaseModel):
             merged.pop(reserved, None)
         return merged
 
+    def to_task_payload(self) -> Dict[str, Any]:
+        """JSON-safe dict consumed by the ingest workers, with a freshly assigned log id.
+
+        Timestamps are rendered as ISO strings so every transport (Celery JSON or
+        msgpack, Redis streams) can encode the payload, and the id lets callers find
+        the stored log before the worker runs.
+        """
+
+        payload = self.model_dump(mode="json")
+        payload["attributes"] = self.merged_attributes()
+        if payload.get("log_timestamp") is None:
+            payload["log_timestamp"] = datetime.now(timezone.utc).isoformat()
+        payload["id"] = str(uuid.uuid4())
+        return payload
+
 
 class LogIngestResponse(BaseModel):
     """Standard acknowledgement returned by `/ingest`."""
 
     status: str = Field(default="accepted")
     task_id: Optional[str] = None
+    log_id: Optional[str] = Field(default=None, description="Id the stored log will have")
+
+
+class LogIngestBatchResponse(BaseModel):
+    """Acknowledgement returned by `/ingest/batch`."""
+
+    status: str = Field(default="accepted")
+    task_id: Optional[str] = None
+    accepted: int = Field(default=0, description="Number of logs queued in the batch")
+    dropped: int = Field(default=0, description="Low-severity logs shed under backpressure")
+    log_ids: List[str] = Field(default_factory=list, description="Ids of the queued logs, in order")
+
+
+class LogIngestLineError(BaseModel):
+    """A rejected line of an NDJSON ingest body."""
+
+    line: int = Field(..., description="1-based line number in the decompressed body")
+    error: str
+
+
+class LogIngestStreamResponse(BaseModel):
+    """Acknowledgement returned by `/ingest/ndjson`."""
+
+    status: str = Field(default="accepted")
+    task_ids: List[str] = Field(default_factory=list)
+    log_ids: List[str] = Field(default_factory=list, description="Ids of the queued logs, in body order")
+    accepted: int = 0
+    rejected: int = 0
+    dropped: int = Field(default=0, description="Low-severity logs shed under backpressure")
+    errors: List[LogIngestLineError] = Field(
+        default_factory=list, description="First `INGEST_STREAM_MAX_ERRORS` rejected lines")
 
 
 class LogRecordOut(BaseModel):
@@ -48,6 +95,7 @@ class LogRecordOut(BaseModel):
     level: str
     message: str
     attributes: Dict[str, Any]
+    template_id: Optional[str] = None
 
 
 class LogQueryContext(BaseModel):
@@ -1,7 +1,7 @@
 """Schemas for natural-language log queries."""
 
 from datetime import datetime
-from typing import List, Optional
+from typing import Any, Dict, List, Literal, Optional
 
 from pydantic import BaseModel, Field
 
@@ -24,6 +24,39 @@ class LogQueryRequest(BaseModel):
                        description="Natural-language question about ingested logs")
     filters: LogQueryFilters = Field(default_factory=LogQueryFilters)
     limit: int = Field(default=5, ge=1, le=50)
+    retrieval_mode: Optional[Literal["vector", "lexical", "hybrid"]] = Field(
+        default=None,
+        description="Vector similarity, full-text match, or both fused with reciprocal-rank fusion",
+    )
+    ef_search: Optional[int] = Field(
+        default=None, ge=1, le=1000, description="HNSW candidate list size for this query")
+    probes: Optional[int] = Field(
+        default=None, ge=1, le=10000, description="IVFFlat lists probed for this query")
+    debug_timings: bool = Field(
+        default=False, description="Return a per-stage timing breakdown; bypasses the answer cache")
+    debug_explain: bool = Field(
+        default=False,
+        description="With `debug_timings`, re-run each retrieval statement under EXPLAIN "
+                    "(ANALYZE, BUFFERS) and return the plans and their figures")
+
+
+class LogQueryTimings(BaseModel):
+    """Latency breakdown of one query, in milliseconds unless noted."""
+
+    query_embedding_ms: Optional[float] = None
+    sql_ms: Optional[float] = Field(
+        default=None, description="Wall time of the retrieval statements as seen by the API")
+    # The plan figures come from a separate, warm-cache EXPLAIN ANALYZE run (`debug_explain`).
+    sql_plan_ms: Optional[float] = None
+    sql_exec_ms: Optional[float] = None
+    rows_scanned: Optional[int] = None
+    prompt_tokens: Optional[int] = None
+    prompt_eval_ms: Optional[float] = None
+    generation_ms: Optional[float] = None
+    completion_tokens: Optional[int] = None
+    tokens_per_second: Optional[float] = None
+    total_ms: float
+    explain: Optional[List[Dict[str, Any]]] = None
 
 
 class LogQueryResponse(BaseModel):
@@ -34,3 +67,4 @@ class LogQueryResponse(BaseModel):
     contexts: List[LogQueryContext]
     requested_k: int
     used_k: int
+    timings: Optional[LogQueryTimings] = None
@@ -1,13 +1,19 @@
 """Service layer exports."""
 
+from app.services.embedding_cache import EmbeddingCache
 from app.services.embeddings import EmbeddingService, get_embedding_service
 from app.services.llm import LLMService, get_llm_service
+from app.services.llm_pool import LLMQueueFullError, RemoteLLMService, get_inference_service
 from app.services.rag import RAGPipeline
 
 __all__ = [
+    "EmbeddingCache",
     "EmbeddingService",
     "get_embedding_service",
     "LLMService",
     "get_llm_service",
+    "get_inference_service",
+    "LLMQueueFullError",
+    "RemoteLLMService",
     "RAGPipeline",
 ]
@@ -0,0 +1,195 @@
+"""Admission control for the ingest endpoints.
+
+The ingest backlog is counted in logs. With `INGEST_TRANSPORT=stream` that is
+simply the stream length. With Celery, the length of the `celery` queue (plus the
+coalescing queue, when enabled) counts messages, and one `process_log_batch` message can carry thousands of logs. So it is scaled
+by the average number of logs per message this process has enqueued. Each API
+process samples the backlog at most once per `INGEST_BACKLOG_SAMPLE_SECONDS` and
+shares that value across requests, so admission costs no round trip per request. Above `INGEST_BACKLOG_SOFT_LIMIT`,
+logs at the levels listed in `INGEST_SHED_LEVELS` are sampled out
+progressively, starting with the first level listed. At
+`INGEST_BACKLOG_HARD_LIMIT`, every request is refused with 429 and `Retry-After`.
+"""
+
+from __future__ import annotations
+
+import logging
+import random
+import time
+from functools import lru_cache
+from threading import Lock
+from typing import Callable, Optional, Sequence
+
+import redis
+
+from app.core.config import get_settings
+from app.core.log_stream import get_stream_client, stream_backlog
+from app.core.metrics import INGEST_ADMISSION_STATE, INGEST_SHED_LOGS
+
+
+logger = logging.getLogger(__name__)
+
+OPEN = "open"
+SHEDDING = "shedding"
+REJECTING = "rejecting"
+_STATE_VALUES = {OPEN: 0, SHEDDING: 1, REJECTING: 2}
+# Weight of each enqueued message in the running logs-per-message average.
+LOGS_PER_MESSAGE_SMOOTHING = 0.05
+
+
+class IngestBackpressureError(RuntimeError):
+    """Raised when the ingest backlog is at the hard limit and requests are refused."""
+
+    def __init__(self, backlog: int, retry_after: int) -> None:
+        super().__init__(f"Ingest backlog is full ({backlog} pending); retry later.")
+        self.backlog = backlog
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Decides which ingested logs to accept, based on a periodically sampled backlog."""
+
+    def __init__(
+        self,
+        *,
+        probe: Callable[[], int],
+        soft_limit: int,
+        hard_limit: int,
+        shed_levels: Sequence[str],
+        sample_seconds: float,
+        retry_after_seconds: int,
+        counts_messages: bool = False,
+    ) -> None:
+        self.probe = probe
+        self.counts_messages = counts_messages
+        self.logs_per_message = 1.0
+        self.soft_limit = soft_limit
+        self.hard_limit = max(hard_limit, soft_limit + 1)
+        self.shed_levels = [level.strip().upper() for level in shed_levels if level.strip()]
+        self.sample_seconds = sample_seconds
+        self.retry_after_seconds = retry_after_seconds
+        self._lock = Lock()
+        self._backlog = 0
+        self._sampled_at = float("-inf")
+
+    def backlog(self) -> int:
+        """Most recent backlog sample, refreshed once it is older than the sample interval.
+
+        Only one request refreshes at a time; the others use the previous value. If
+        the broker cannot be reached, the previous value is kept.
+        """
+
+        now = time.monotonic()
+        if now - self._sampled_at < self.sample_seconds or not self._lock.acquire(blocking=False):
+            return self._backlog
+        try:
+            depth = self.probe()
+            self._backlog = int(depth * self.logs_per_message) if self.counts_messages else int(depth)
+        except redis.RedisError as exc:
+            logger.warning("Could not sample ingest backlog: %s", exc)
+        finally:
+            self._sampled_at = now
+            self._lock.release()
+        INGEST_ADMISSION_STATE.set(_STATE_VALUES[self.state(self._backlog)])
+        return self._backlog
+
+    def record_enqueued(self, logs: int) -> None:
+        """Track the size of one enqueued message, for transports whose probe counts messages."""
+
+        if self.counts_messages:
+            self.logs_per_message += LOGS_PER_MESSAGE_SMOOTHING * (logs - self.logs_per_message)
+
+    def state(self, backlog: int) -> str:
+        if backlog >= self.hard_limit:
+            return REJECTING
+        if backlog >= self.soft_limit:
+            return SHEDDING
+        return OPEN
+
+    def pressure(self) -> float:
+        """Position of the backlog between the soft limit (0.0) and the hard limit (1.0)."""
+
+        span = self.hard_limit - self.soft_limit
+        return min(1.0, max(0.0, (self.backlog() - self.soft_limit) / span))
+
+    def check(self) -> float:
+        """Refuse the request at the hard limit; otherwise return the current pressure."""
+
+        backlog = self.backlog()
+        if backlog >= self.hard_limit:
+            raise IngestBackpressureError(backlog, self.retry_after_seconds)
+        return self.pressure()
+
+    def keep_probability(self, level: str, pressure: float) -> float:
+        """Share of logs at `level` admitted under `pressure`.
+
+        The pressure range is split evenly across the shed levels. Each level is
+        thinned linearly over its share and dropped entirely after it, so the
+        first level listed goes before the next one is touched. Levels that are not
+        listed are always kept.
+        """
+
+        try:
+            rank = self.shed_levels.index(level.upper())
+        except ValueError:
+            return 1.0
+        share = pressure * len(self.shed_levels) - rank
+        return 1.0 - min(1.0, max(0.0, share))
+
+    def admit(self, level: str, pressure: float) -> bool:
+        """Sample one log under `pressure`; shed logs are counted by level."""
+
+        if pressure <= 0.0:
+            return True
+        probability = self.keep_probability(level, pressure)
+        if probability >= 1.0 or random.random() < probability:
+            return True
+        INGEST_SHED_LOGS.labels(level=level.upper()).inc()
+        return False
+
+
+@lru_cache
+def _broker() -> redis.Redis:
+    return redis.Redis.from_url(get_settings().celery_broker_url)
+
+
+def _ingest_backlog() -> int:
+    """Logs in the stream, or messages in the Celery ingest queues (scaled by the controller)."""
+
+    settings = get_settings()
+    if settings.ingest_transport == "stream":
+        return stream_backlog(get_stream_client(), settings.log_stream_key)
+    queues = ["celery"]
+    if settings.worker_coalesce_enabled:
+        queues.append(settings.worker_coalesce_queue)
+    pipeline = _broker().pipeline(transaction=False)
+    for queue in queues:
+        pipeline.llen(queue)
+    return sum(int(depth) for depth in pipeline.execute())
+
+
+_controller: Optional[AdmissionController] = None
+_controller_lock = Lock()
+
+
+def get_admission_controller() -> Optional[AdmissionController]:
+    """Process-wide controller, or `None` when `INGEST_ADMISSION_ENABLED` is off."""
+
+    global _controller
+    settings = get_settings()
+    if not settings.ingest_admission_enabled:
+        return None
+
+    if _controller is None:
+        with _controller_lock:
+            if _controller is None:
+                _controller = AdmissionController(
+                    probe=_ingest_backlog,
+                    soft_limit=settings.ingest_backlog_soft_limit,
+                    hard_limit=settings.ingest_backlog_hard_limit,
+                    shed_levels=settings.ingest_shed_levels.split(","),
+                    sample_seconds=settings.ingest_backlog_sample_seconds,
+                    retry_after_seconds=settings.ingest_retry_after_seconds,
+                    counts_messages=settings.ingest_transport != "stream",
+                )
+    return _controller
@@ -0,0 +1,118 @@
+"""In-process micro-batching used to coalesce per-log work into bulk operations."""
+
+from __future__ import annotations
+
+import logging
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from threading import Condition, Thread
+from typing import Callable, Generic, List, Optional, Sequence, Tuple, TypeVar
+
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class MicroBatcher(Generic[T, R]):
+    """Collects items from many threads and flushes them together.
+
+    A batch is flushed when `max_batch_size` items are pending or when the oldest
+    pending item has waited `max_wait_ms`. `submit` blocks until the batch holding
+    the item has been flushed, so callers only report success once it is durable.
+    A failed batch is split in halves and flushed again, as long as
+    `split_on_error` accepts the exception. That way an item that fails on its own
+    fails only its own caller.
+    """
+
+    def __init__(
+        self,
+        flush: Callable[[List[T]], Sequence[R]],
+        *,
+        max_batch_size: int = 256,
+        max_wait_ms: float = 20.0,
+        name: str = "micro-batcher",
+        split_on_error: Callable[[Exception], bool] = lambda exc: True,
+    ) -> None:
+        self._flush = flush
+        self._split_on_error = split_on_error
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.name = name
+        # Each pending item carries the time it was queued, so leftovers from a
+        # full batch keep their original deadline.
+        self._pending: List[Tuple[T, Future, float]] = []
+        self._condition = Condition()
+        self._thread: Optional[Thread] = None
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def submit(self, item: T, timeout: Optional[float] = None) -> R:
+        """Queue an item and wait for the result of its batch.
+
+        On timeout the item is withdrawn, unless its batch is already being flushed.
+        """
+
+        future: Future = Future()
+        with self._condition:
+            self._ensure_thread()
+            self._pending.append((item, future, time.monotonic()))
+            self._condition.notify_all()
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise
+
+    def _take_batch(self) -> List[Tuple[T, Future]]:
+        with self._condition:
+            while True:
+                if not self._pending:
+                    self._condition.wait()
+                    continue
+                if len(self._pending) >= self.max_batch_size:
+                    break
+                remaining = self._pending[0][2] + self.max_wait - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(timeout=remaining)
+
+            batch = self._pending[: self.max_batch_size]
+            self._pending = self._pending[self.max_batch_size:]
+            return [(item, future) for item, future, _ in batch]
+
+    def _deliver(self, batch: List[Tuple[T, Future]]) -> None:
+        items = [item for item, _ in batch]
+        try:
+            results = list(self._flush(items))
+            if len(results) != len(items):
+                raise RuntimeError(
+                    f"{self.name} flush returned {len(results)} results for {len(items)} items")
+        except Exception as exc:
+            if len(batch) > 1 and self._split_on_error(exc):
+                middle = len(batch) // 2
+                self._deliver(batch[:middle])
+                self._deliver(batch[middle:])
+                return
+            logger.warning("%s flush of %d items failed: %s",
+                           self.name, len(items), exc)
+            for _, future in batch:
+                future.set_exception(exc)
+            return
+
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+    def _run(self) -> None:
+        while True:
+            # Items whose callers gave up are dropped; the rest can no longer be cancelled.
+            batch = [
+                (item, future) for item, future in self._take_batch()
+                if future.set_running_or_notify_cancel()
+            ]
+            if batch:
+                self._deliver(batch)
@@ -0,0 +1,100 @@
+"""Token-budgeted packing of retrieved logs into the LLM prompt."""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from threading import Lock
+from typing import Callable, Iterable, List, Tuple
+
+
+TRUNCATION_MARKER = " …[truncated]"
+
+
+def approximate_token_count(text: str) -> int:
+    """Rough count used when no tokenizer is loaded (~4 characters per token)."""
+
+    return max(1, (len(text) + 3) // 4)
+
+
+@dataclass
+class _Group:
+    item: dict
+    count: int = 1
+
+
+class ContextPacker:
+    """Fits as many top-ranked log lines as possible into a token budget.
+
+    Identical lines (same service, level and message) collapse into one entry
+    with a `×N` suffix. Lines longer than `max_line_tokens` are truncated, and
+    token counts are cached per line because the same logs recur across queries.
+    """
+
+    def __init__(
+        self,
+        count_tokens: Callable[[str], int] = approximate_token_count,
+        *,
+        max_line_tokens: int = 256,
+        cache_size: int = 4096,
+    ) -> None:
+        self.count_tokens = count_tokens
+        self.max_line_tokens = max_line_tokens
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = Lock()
+
+    def count(self, text: str) -> int:
+        """Token count for `text`, memoized in a bounded LRU."""
+
+        with self._lock:
+            cached = self._cache.get(text)
+            if cached is not None:
+                self._cache.move_to_end(text)
+                return cached
+        tokens = self.count_tokens(text)
+        with self._lock:
+            self._cache[text] = tokens
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return tokens
+
+    @staticmethod
+    def _format(item: dict, message: str, count: int) -> str:
+        line = f"- [{item['log_timestamp']}] {item['service']} {item['level']}: {message}"
+        return f"{line} (×{count})" if count > 1 else line
+
+    def _fit_line(self, group: _Group) -> Tuple[str, int]:
+        message = group.item["message"]
+        line = self._format(group.item, message, group.count)
+        tokens = self.count(line)
+        while tokens > self.max_line_tokens and len(message) > 1:
+            keep = max(1, int(len(message) * self.max_line_tokens / tokens * 0.9))
+            message = message[:keep]
+            line = self._format(group.item, message + TRUNCATION_MARKER, group.count)
+            tokens = self.count(line)
+        return line, tokens
+
+    def pack(self, logs: Iterable[dict], budget: int) -> List[str]:
+        """Return formatted lines, in rank order, whose total tokens fit `budget`."""
+
+        groups: "OrderedDict[Tuple[str, str, str], _Group]" = OrderedDict()
+        for item in logs:
+            key = (item["service"], item["level"], item["message"])
+            if key in groups:
+                groups[key].count += 1
+            else:
+                groups[key] = _Group(item=item)
+
+        lines: List[str] = []
+        used = 0
+        if budget <= 0:
+            return lines
+        for group in groups.values():
+            line, tokens = self._fit_line(group)
+            # +1 for the newline joining this line to the previous one.
+            if used + tokens + 1 > budget:
+                continue
+            lines.append(line)
+            used += tokens + 1
+        return lines
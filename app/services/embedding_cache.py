@@ -0,0 +1,166 @@
+"""Content-addressed cache for embedding vectors.
+
+Vectors are keyed by a hash of the model name plus the exact text, so identical
+log lines are only ever encoded once per model. Lookups go through a bounded
+process-local LRU first and then a shared Redis tier.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Dict, Iterable, Mapping, Optional
+
+import numpy as np
+import redis
+
+from app.core.config import get_settings
+from app.core.metrics import CACHE_EVENTS
+
+
+logger = logging.getLogger(__name__)
+
+REDIS_KEY_PREFIX = "logiq:emb:"
+REDIS_RETRY_SECONDS = 30.0
+
+
+class EmbeddingCache:
+    """Two-tier (local LRU + Redis) store for float32 embedding vectors."""
+
+    def __init__(
+        self,
+        *,
+        max_local_entries: int = 10_000,
+        redis_url: Optional[str] = None,
+        redis_ttl_seconds: int = 7 * 24 * 3600,
+    ) -> None:
+        self.max_local_entries = max_local_entries
+        self.redis_ttl_seconds = redis_ttl_seconds
+        self._local: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = Lock()
+        self._redis = redis.Redis.from_url(redis_url) if redis_url else None
+        self._redis_down_until = 0.0
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key_for(model_name: str, text: str) -> str:
+        """Stable cache key for `text` embedded by `model_name`."""
+
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(model_name.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(text.encode("utf-8"))
+        return digest.hexdigest()
+
+    def _redis_available(self) -> bool:
+        return self._redis is not None and time.monotonic() >= self._redis_down_until
+
+    def _mark_redis_down(self, exc: Exception) -> None:
+        logger.warning(
+            "Embedding cache Redis tier unavailable (%s); retrying in %.0fs", exc, REDIS_RETRY_SECONDS
+        )
+        self._redis_down_until = time.monotonic() + REDIS_RETRY_SECONDS
+
+    def _store_local(self, key: str, vector: np.ndarray) -> None:
+        if self.max_local_entries <= 0:
+            return
+        self._local[key] = vector
+        self._local.move_to_end(key)
+        while len(self._local) > self.max_local_entries:
+            self._local.popitem(last=False)
+            self.evictions += 1
+
+    def get_many(self, keys: Iterable[str], dimension: int) -> Dict[str, np.ndarray]:
+        """Return cached vectors for whichever of `keys` are present."""
+
+        found: Dict[str, np.ndarray] = {}
+        remote: list[str] = []
+        local_hits = redis_hits = 0
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                vector = self._local.get(key)
+                if vector is None:
+                    remote.append(key)
+                    continue
+                self._local.move_to_end(key)
+                found[key] = vector
+                local_hits += 1
+
+        if remote and self._redis_available():
+            try:
+                blobs = self._redis.mget([REDIS_KEY_PREFIX + key for key in remote])
+            except redis.RedisError as exc:
+                self._mark_redis_down(exc)
+                blobs = [None] * len(remote)
+            with self._lock:
+                for key, blob in zip(remote, blobs):
+                    if blob is None or len(blob) != dimension * 4:
+                        continue
+                    vector = np.frombuffer(blob, dtype=np.float32)
+                    found[key] = vector
+                    self._store_local(key, vector)
+                    redis_hits += 1
+
+        misses = len(remote) - redis_hits
+        with self._lock:
+            self.local_hits += local_hits
+            self.redis_hits += redis_hits
+            self.misses += misses
+        CACHE_EVENTS.labels(cache="embedding_local", result="hit").inc(local_hits)
+        CACHE_EVENTS.labels(cache="embedding_redis", result="hit").inc(redis_hits)
+        CACHE_EVENTS.labels(cache="embedding", result="miss").inc(misses)
+        return found
+
+    def set_many(self, vectors: Mapping[str, np.ndarray]) -> None:
+        """Insert freshly computed vectors into both tiers."""
+
+        if not vectors:
+            return
+        with self._lock:
+            for key, vector in vectors.items():
+                self._store_local(key, np.ascontiguousarray(vector, dtype=np.float32))
+
+        if not self._redis_available():
+            return
+        try:
+            pipe = self._redis.pipeline(transaction=False)
+            for key, vector in vectors.items():
+                pipe.set(
+                    REDIS_KEY_PREFIX + key,
+                    np.ascontiguousarray(vector, dtype=np.float32).tobytes(),
+                    ex=self.redis_ttl_seconds,
+                )
+            pipe.execute()
+        except redis.RedisError as exc:
+            self._mark_redis_down(exc)
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counters and current local tier size."""
+
+        with self._lock:
+            return {
+                "local_hits": self.local_hits,
+                "redis_hits": self.redis_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "local_entries": len(self._local),
+            }
+
+
+def build_embedding_cache() -> Optional[EmbeddingCache]:
+    """Create the cache described by runtime settings, or `None` when disabled."""
+
+    settings = get_settings()
+    if not settings.embedding_cache_enabled:
+        return None
+    return EmbeddingCache(
+        max_local_entries=settings.embedding_cache_local_size,
+        redis_url=settings.redis_url if settings.embedding_cache_redis_enabled else None,
+        redis_ttl_seconds=settings.embedding_cache_redis_ttl_seconds,
+    )
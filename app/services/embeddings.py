@@ -2,18 +2,31 @@
 
 from functools import lru_cache
 from threading import Lock
-from typing import List
+from typing import Dict, List, Optional, Sequence
 
+import numpy as np
 from sentence_transformers import SentenceTransformer
 
 from app.core.config import get_settings
+from app.core.metrics import EMBEDDED_TEXTS, MODEL_LOADED, observe_stage
+from app.services.embedding_cache import EmbeddingCache, build_embedding_cache
 
 
 class EmbeddingService:
     """Wraps a Sentence-Transformer model for consistent embedding generation."""
 
-    def __init__(self, model_name: str) -> None:
+    def __init__(
+        self,
+        model_name: str,
+        *,
+        batch_size: int = 64,
+        sort_by_length: bool = True,
+        cache: Optional[EmbeddingCache] = None,
+    ) -> None:
         self.model_name = model_name
+        self.batch_size = batch_size
+        self.sort_by_length = sort_by_length
+        self.cache = cache
         self._model: SentenceTransformer | None = None
         self._lock = Lock()
 
@@ -22,15 +35,76 @@ class EmbeddingService:
             with self._lock:
                 if self._model is None:
                     self._model = SentenceTransformer(self.model_name)
+                    MODEL_LOADED.labels(model="embedding").set(1)
         return self._model
 
+    @property
+    def dimension(self) -> int:
+        """Size of the vectors produced by the underlying model."""
+
+        return int(self._ensure_model().get_sentence_embedding_dimension())
+
+    def embed_texts(self, texts: Sequence[str]) -> np.ndarray:
+        """Return a contiguous float32 matrix with one normalized row per input string.
+
+        Duplicates inside the batch are encoded once. When a cache is attached, only
+        texts it has not seen before reach the model.
+        """
+
+        if not texts:
+            return np.empty((0, self.dimension), dtype=np.float32)
+        if self.cache is None:
+            unique = list(dict.fromkeys(texts))
+            if len(unique) == len(texts):
+                return self._encode(texts)
+            rows = dict(zip(unique, self._encode(unique)))
+            return np.ascontiguousarray(np.stack([rows[text] for text in texts]), dtype=np.float32)
+
+        keys = [EmbeddingCache.key_for(self.model_name, text) for text in texts]
+        found = self.cache.get_many(keys, self.dimension)
+
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in found:
+                missing.setdefault(key, text)
+        if missing:
+            computed = dict(zip(missing, self._encode(list(missing.values()))))
+            self.cache.set_many(computed)
+            found.update(computed)
+
+        return np.ascontiguousarray(np.stack([found[key] for key in keys]), dtype=np.float32)
+
+    def _encode(self, texts: Sequence[str]) -> np.ndarray:
+        """Run the model, optionally sorting inputs by length to limit padding."""
+
+        model = self._ensure_model()
+        if self.sort_by_length and len(texts) > 1:
+            order = np.argsort([len(text) for text in texts], kind="stable")
+            ordered = [texts[index] for index in order]
+        else:
+            order = None
+            ordered = list(texts)
+
+        with observe_stage("embedding_model"):
+            vectors = model.encode(
+                ordered,
+                batch_size=self.batch_size,
+                convert_to_numpy=True,
+                normalize_embeddings=True,
+                show_progress_bar=False,
+            )
+        EMBEDDED_TEXTS.inc(len(ordered))
+
+        if order is not None:
+            restored = np.empty_like(vectors)
+            restored[order] = vectors
+            vectors = restored
+        return np.ascontiguousarray(vectors, dtype=np.float32)
+
     def embed_text(self, text: str) -> List[float]:
         """Return an embedding vector for a single string."""
 
-        model = self._ensure_model()
-        vector = model.encode(
-            [text], convert_to_numpy=True, normalize_embeddings=True)
-        return vector[0].tolist()
+        return self.embed_texts([text])[0].tolist()
 
 
 @lru_cache
@@ -38,4 +112,9 @@ def get_embedding_service() -> EmbeddingService:
     """Singleton accessor used by API and worker processes."""
 
     settings = get_settings()
-    return EmbeddingService(settings.embedding_model_name)
+    return EmbeddingService(
+        settings.embedding_model_name,
+        batch_size=settings.embedding_batch_size,
+        sort_by_length=settings.embedding_sort_by_length,
+        cache=build_embedding_cache(),
+    )
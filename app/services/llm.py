@@ -2,17 +2,26 @@
 
 from __future__ import annotations
 
+import hashlib
+import inspect
 import logging
+import time
 from pathlib import Path
 from threading import Lock
-from typing import Iterable, Optional
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+import numpy as np
 
 from app.core.config import get_settings
+from app.core.metrics import LLM_TOKENS, LLM_TOKENS_PER_SECOND, MODEL_LOADED, STAGE_SECONDS
+from app.core.tracing import start_span
+from app.services.context_packer import ContextPacker, approximate_token_count
 
 try:
-    from llama_cpp import Llama  # type: ignore
+    from llama_cpp import Llama, LlamaState  # type: ignore
 except ImportError:  # pragma: no cover - optional dependency at runtime
     Llama = None  # type: ignore
+    LlamaState = None  # type: ignore
 
 
 DEFAULT_SYSTEM_PROMPT = (
@@ -20,13 +29,57 @@ DEFAULT_SYSTEM_PROMPT = (
     "Use only the provided logs as evidence."
 )
 
+ANSWER_INSTRUCTION = "Respond with a concise answer that references the logs."
+
+# Every prompt starts with exactly this text, so its KV state is evaluated once and
+# restored before each completion; only the logs and question are evaluated per call.
+PROMPT_PREFIX = f"System: {DEFAULT_SYSTEM_PROMPT}\n\n{ANSWER_INSTRUCTION}\n\n"
+
 
 logger = logging.getLogger(__name__)
 
+# `LlamaState` attributes persisted by the prefix cache; `seed` only exists in newer releases.
+_STATE_FIELDS = ("input_ids", "scores", "n_tokens", "llama_state", "llama_state_size", "seed")
+_STATE_INTS = ("n_tokens", "llama_state_size", "seed")
+
+
+def _write_prefix_state(path: Path, state: Any) -> None:
+    """Persist a `LlamaState` as plain arrays in an `.npz` archive (no pickled objects)."""
+
+    arrays = {}
+    for name in _STATE_FIELDS:
+        if not hasattr(state, name):
+            continue
+        value = getattr(state, name)
+        if isinstance(value, (bytes, bytearray)):
+            value = np.frombuffer(value, dtype=np.uint8)
+        arrays[name] = np.asarray(value)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    partial = path.with_name(path.name + ".partial")
+    with partial.open("wb") as handle:
+        np.savez(handle, **arrays)
+    partial.replace(path)
+
+
+def _read_prefix_state(path: Path) -> Any:
+    """Inverse of `_write_prefix_state`; loading never executes code from the file."""
+
+    with np.load(path, allow_pickle=False) as archive:
+        fields: Dict[str, Any] = {name: archive[name] for name in archive.files}
+    fields["llama_state"] = fields["llama_state"].tobytes()
+    for name in _STATE_INTS:
+        if name in fields:
+            fields[name] = int(fields[name])
+    accepted = inspect.signature(LlamaState).parameters
+    return LlamaState(**{name: value for name, value in fields.items() if name in accepted})
+
 
 class LLMService:
     """Lazy wrapper around `llama_cpp` that falls back to deterministic summaries."""
 
+    # A llama.cpp context must not be used from two threads at once.
+    max_concurrency = 1
+
     def __init__(
         self,
         model_path: Optional[str],
@@ -37,6 +90,10 @@ class LLMService:
         batch_size: int = 512,
         temperature: float = 0.1,
         top_p: float = 0.9,
+        max_tokens: int = 512,
+        max_log_tokens: int = 256,
+        max_fallback_logs: int = 10,
+        prefix_cache_dir: Optional[str] = None,
     ) -> None:
         self.model_path = Path(model_path) if model_path else None
         self.n_ctx = n_ctx
@@ -45,6 +102,12 @@ class LLMService:
         self.batch_size = batch_size
         self.temperature = temperature
         self.top_p = top_p
+        self.max_tokens = max_tokens
+        self._packer = ContextPacker(
+            self._count_tokens, max_line_tokens=max_log_tokens)
+        self.max_fallback_logs = max_fallback_logs
+        self.prefix_cache_dir = Path(prefix_cache_dir) if prefix_cache_dir else None
+        self._prefix_state: Any = None
         self._lock = Lock()
         self._llm: Optional[Llama] = None
         self._load_failed = False
@@ -88,6 +151,7 @@ class LLMService:
                         embedding=False,
                     )
                     self._load_error = None
+                    MODEL_LOADED.labels(model="llm").set(1)
                 except Exception as exc:  # pragma: no cover - defensive runtime guard
                     logger.error(
                         "Failed to load LLM model from %s: %s", self.model_path, exc, exc_info=True
@@ -95,22 +159,84 @@ class LLMService:
                     self._load_failed = True
                     self._load_error = str(exc)
                     self._llm = None
+                    MODEL_LOADED.labels(model="llm").set(0)
         return self._llm
 
+    def _count_tokens(self, text: str) -> int:
+        if self._llm is None:
+            return approximate_token_count(text)
+        return len(self._llm.tokenize(text.encode("utf-8"), add_bos=False))
+
     def build_prompt(self, question: str, logs: Iterable[dict]) -> str:
-        """Assemble the prompt passed to the model."""
-
-        parts = [f"System: {DEFAULT_SYSTEM_PROMPT}",
-                 f"User question: {question}"]
-        formatted_logs = []
-        for item in logs:
-            formatted_logs.append(
-                f"- [{item['log_timestamp']}] {item['service']} {item['level']}: {item['message']}"
-            )
-        if formatted_logs:
-            parts.append("Relevant logs:\n" + "\n".join(formatted_logs))
-        parts.append("Respond with a concise answer that references the logs.")
-        return "\n\n".join(parts)
+        """Assemble the prompt passed to the model.
+
+        The static `PROMPT_PREFIX` comes first so its KV state can be reused; logs
+        are then packed in rank order into whatever remains of `n_ctx` after the
+        fixed text and the `max_tokens` reserved for the answer.
+        """
+
+        question_part = f"User question: {question}\n\nAnswer:"
+        fixed = f"{PROMPT_PREFIX}Relevant logs:\n\n{question_part}"
+        budget = self.n_ctx - self.max_tokens - self._packer.count(fixed) - 8
+        if budget <= 0:
+            logger.warning(
+                "Prompt text and LLM_MAX_TOKENS leave no room for logs within LLM_N_CTX=%d.", self.n_ctx)
+            budget = 0
+
+        formatted_logs = self._packer.pack(logs, budget)
+        logs_part = "Relevant logs:\n" + "\n".join(formatted_logs) + "\n\n" if formatted_logs else ""
+        return f"{PROMPT_PREFIX}{logs_part}{question_part}"
+
+    def _prefix_cache_path(self) -> Optional[Path]:
+        if self.prefix_cache_dir is None or self.model_path is None:
+            return None
+        digest = hashlib.sha256()
+        digest.update(str(self.model_path.resolve()).encode("utf-8"))
+        digest.update(str(self.model_path.stat().st_mtime_ns).encode("utf-8"))
+        digest.update(f"{self.n_ctx}:{self.batch_size}:{PROMPT_PREFIX}".encode("utf-8"))
+        return self.prefix_cache_dir / f"prefix-{digest.hexdigest()[:16]}.npz"
+
+    def _build_prefix_state(self, llm: Llama) -> Any:
+        path = self._prefix_cache_path()
+        if path is not None and path.exists():
+            try:
+                return _read_prefix_state(path)
+            except Exception as exc:  # stale or incompatible file; rebuild below
+                logger.warning("Ignoring prompt prefix cache %s: %s", path, exc)
+
+        llm.reset()
+        llm.eval(llm.tokenize(PROMPT_PREFIX.encode("utf-8"), add_bos=True))
+        state = llm.save_state()
+
+        if path is not None:
+            try:
+                _write_prefix_state(path, state)
+            except OSError as exc:
+                logger.warning("Unable to persist prompt prefix cache %s: %s", path, exc)
+        return state
+
+    def _restore_prefix(self, llm: Llama) -> None:
+        """Load the evaluated prefix so llama.cpp only evaluates the new suffix.
+
+        `create_completion` skips any leading tokens that match the context's
+        current tokens, so restoring this state makes the shared prefix free.
+        """
+
+        try:
+            if self._prefix_state is None:
+                self._prefix_state = self._build_prefix_state(llm)
+            llm.load_state(self._prefix_state)
+        except Exception as exc:  # pragma: no cover - defensive runtime guard
+            logger.warning("Prompt prefix reuse disabled: %s", exc)
+            self._prefix_state = None
+
+    def _completion_kwargs(self) -> Dict[str, Any]:
+        return {
+            "max_tokens": self.max_tokens,
+            "temperature": self.temperature,
+            "top_p": self.top_p,
+            "stop": ["System:", "User:", "Assistant:"],
+        }
 
     def generate(self, question: str, logs: Iterable[dict]) -> str:
         """Return an answer string derived from the provided context."""
@@ -122,22 +248,113 @@ class LLMService:
             return self._fallback_answer(question, logs_list)
 
         prompt = self.build_prompt(question, logs_list)
-        response = llm.create_completion(
-            prompt=prompt,
-            max_tokens=512,
-            temperature=self.temperature,
-            top_p=self.top_p,
-            stop=["System:", "User:", "Assistant:"],
-        )
+        self._restore_prefix(llm)
+        with start_span("llm_generate") as span:
+            started = time.perf_counter()
+            response = llm.create_completion(prompt=prompt, **self._completion_kwargs())
+            usage = response.get("usage") or {}
+            self._record_generation(
+                span,
+                time.perf_counter() - started,
+                usage.get("prompt_tokens", 0),
+                usage.get("completion_tokens", 0),
+            )
         text = response.get("choices", [{}])[0].get("text", "").strip()
         if not text:
             return self._fallback_answer(question, logs_list)
         return text
 
+    def generate_stream(self, question: str, logs: Iterable[dict]) -> Iterator[str]:
+        """Yield the answer incrementally as llama.cpp produces tokens.
+
+        Without a model (or when it produces nothing) the fallback answer is yielded
+        as a single chunk, so callers can treat both cases the same way.
+        """
+
+        llm = self._ensure_model()
+        logs_list = list(logs)
+
+        if llm is None:
+            yield self._fallback_answer(question, logs_list)
+            return
+
+        prompt = self.build_prompt(question, logs_list)
+        emitted = False
+        for text in self._stream_completion(llm, prompt):
+            if not emitted:
+                text = text.lstrip()
+            if text:
+                emitted = True
+                yield text
+        if not emitted:
+            yield self._fallback_answer(question, logs_list)
+
+    def generate_timed(self, question: str, logs: Iterable[dict]) -> Tuple[str, Dict[str, float]]:
+        """`generate` plus a latency breakdown, for `debug_timings` queries.
+
+        The completion is streamed so that the time to the first token (prompt
+        evaluation) can be told apart from decoding.
+        """
+
+        llm = self._ensure_model()
+        logs_list = list(logs)
+
+        if llm is None:
+            return self._fallback_answer(question, logs_list), {}
+
+        prompt = self.build_prompt(question, logs_list)
+        timings: Dict[str, float] = {"prompt_tokens": self._count_tokens(prompt)}
+        pieces = []
+        first_token_at: Optional[float] = None
+        started = time.perf_counter()
+        for text in self._stream_completion(llm, prompt):
+            if first_token_at is None:
+                first_token_at = time.perf_counter()
+            pieces.append(text)
+        finished = time.perf_counter()
+
+        if first_token_at is not None:
+            decode_seconds = finished - first_token_at
+            timings["prompt_eval_ms"] = (first_token_at - started) * 1000
+            timings["generation_ms"] = decode_seconds * 1000
+            timings["completion_tokens"] = len(pieces)
+            if len(pieces) > 1 and decode_seconds > 0:
+                timings["tokens_per_second"] = (len(pieces) - 1) / decode_seconds
+        text = "".join(pieces).strip()
+        return text or self._fallback_answer(question, logs_list), timings
+
+    def _stream_completion(self, llm: Llama, prompt: str) -> Iterator[str]:
+        """Raw token texts of a streamed completion, recorded in metrics and traces."""
+
+        self._restore_prefix(llm)
+        chunks = 0
+        with start_span("llm_generate", attributes={"llm.stream": True}) as span:
+            started = time.perf_counter()
+            try:
+                for chunk in llm.create_completion(prompt=prompt, stream=True, **self._completion_kwargs()):
+                    chunks += 1
+                    yield chunk.get("choices", [{}])[0].get("text", "")
+            finally:
+                # Streamed chunks carry one token each and no usage block.
+                self._record_generation(
+                    span, time.perf_counter() - started, self._count_tokens(prompt), chunks)
+
+    def _record_generation(
+        self, span: Optional[Any], elapsed: float, prompt_tokens: int, completion_tokens: int
+    ) -> None:
+        if span is not None:
+            span.set_attribute("llm.prompt_tokens", prompt_tokens)
+            span.set_attribute("llm.completion_tokens", completion_tokens)
+        STAGE_SECONDS.labels(stage="llm_generate").observe(elapsed)
+        LLM_TOKENS.labels(kind="prompt").inc(prompt_tokens)
+        LLM_TOKENS.labels(kind="completion").inc(completion_tokens)
+        if elapsed > 0 and completion_tokens:
+            LLM_TOKENS_PER_SECOND.observe(completion_tokens / elapsed)
+
     def _fallback_answer(self, question: str, logs: Iterable[dict]) -> str:
         """Simple extractive fallback when no model is available."""
 
-        logs_list = list(logs)
+        logs_list = list(logs)[: self.max_fallback_logs]
         if not logs_list:
             return "No relevant logs were found to answer the question."
 
@@ -171,5 +388,9 @@ def get_llm_service() -> LLMService:
             batch_size=settings.llm_batch_size,
             temperature=settings.llm_temperature,
             top_p=settings.llm_top_p,
+            max_tokens=settings.llm_max_tokens,
+            max_log_tokens=settings.llm_max_log_tokens,
+            max_fallback_logs=settings.max_context_logs,
+            prefix_cache_dir=settings.llm_prefix_cache_dir,
         )
     return _llm_service
@@ -0,0 +1,168 @@
+"""Client for the dedicated LLM inference tier.
+
+With `LLM_BACKEND=celery`, API processes never load the GGUF model. Generation
+requests go to a separate Celery queue (`LLM_QUEUE_NAME`) consumed by an
+`llm-worker` whose N processes each own one model instance.
+
+Admission is shared by every API process through a Redis sorted set of in-flight
+requests (`INFLIGHT_KEY`). A Lua script trims entries older than the request
+timeout, so slots held by a crashed process free themselves, then admits the
+request only while fewer than `LLM_QUEUE_MAX_DEPTH` are in flight. On top of that,
+each API process caps its own in-flight requests with `LLM_API_MAX_INFLIGHT`, so
+one busy process cannot take every slot.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+import uuid
+from threading import BoundedSemaphore, Lock
+from typing import Dict, Iterable, Iterator, Optional, Tuple, Union
+
+import redis
+from celery.exceptions import TimeoutError as CeleryTimeoutError
+
+from app.celery_app import celery
+from app.core.config import get_settings
+from app.core.metrics import LLM_REMOTE_REQUESTS
+from app.services.llm import LLMService, get_llm_service
+
+
+logger = logging.getLogger(__name__)
+
+GENERATE_TASK_NAME = "generate_answer"
+INFLIGHT_KEY = "logiq:llm:inflight"
+
+# KEYS[1]: in-flight set. ARGV: expiry cutoff, capacity, now, request token.
+# Returns {1, depth} when admitted, {0, depth} when full.
+_ADMIT_SCRIPT = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+local depth = redis.call('ZCARD', KEYS[1])
+if depth >= tonumber(ARGV[2]) then
+    return {0, depth}
+end
+redis.call('ZADD', KEYS[1], ARGV[3], ARGV[4])
+redis.call('EXPIRE', KEYS[1], math.ceil(tonumber(ARGV[3]) - tonumber(ARGV[1])) + 1)
+return {1, depth}
+"""
+
+
+class LLMQueueFullError(RuntimeError):
+    """Raised when the inference queue is at capacity and the request is refused."""
+
+    def __init__(self, depth: int, retry_after: int) -> None:
+        super().__init__(f"LLM inference queue is full ({depth} pending requests).")
+        self.depth = depth
+        self.retry_after = retry_after
+
+
+class RemoteLLMService:
+    """Drop-in replacement for `LLMService` that delegates to the inference queue."""
+
+    def __init__(
+        self,
+        *,
+        queue_name: str,
+        max_queue_depth: int,
+        max_inflight: int,
+        timeout_seconds: float,
+    ) -> None:
+        self.queue_name = queue_name
+        self.max_queue_depth = max_queue_depth
+        self.max_concurrency = max_inflight
+        self.timeout_seconds = timeout_seconds
+        self._inflight = BoundedSemaphore(max_inflight)
+        self._broker = redis.Redis.from_url(get_settings().celery_broker_url)
+        self._admit = self._broker.register_script(_ADMIT_SCRIPT)
+
+    def _reject(self, depth: int) -> LLMQueueFullError:
+        LLM_REMOTE_REQUESTS.labels(outcome="rejected").inc()
+        return LLMQueueFullError(depth, retry_after=max(1, int(self.timeout_seconds // 10)))
+
+    def _acquire_slot(self) -> Optional[str]:
+        """Claim a shared in-flight slot; returns its token, or `None` if Redis is unreachable."""
+
+        token = uuid.uuid4().hex
+        now = time.time()
+        try:
+            admitted, depth = self._admit(
+                keys=[INFLIGHT_KEY],
+                args=[now - self.timeout_seconds, self.max_queue_depth, now, token],
+            )
+        except redis.RedisError as exc:
+            logger.warning("Unable to check LLM in-flight requests: %s", exc)
+            return None
+        if not admitted:
+            raise self._reject(int(depth))
+        return token
+
+    def _release_slot(self, token: Optional[str]) -> None:
+        if token is None:
+            return
+        try:
+            self._broker.zrem(INFLIGHT_KEY, token)
+        except redis.RedisError as exc:
+            # The slot expires on its own after the request timeout.
+            logger.warning("Unable to release LLM in-flight slot: %s", exc)
+
+    def generate(self, question: str, logs: Iterable[dict]) -> str:
+        """Queue a generation request and wait for the inference tier's answer."""
+
+        if not self._inflight.acquire(blocking=False):
+            raise self._reject(self.max_concurrency)
+        try:
+            token = self._acquire_slot()
+        except LLMQueueFullError:
+            self._inflight.release()
+            raise
+
+        try:
+            result = celery.send_task(
+                GENERATE_TASK_NAME, args=[question, list(logs)], queue=self.queue_name)
+            LLM_REMOTE_REQUESTS.labels(outcome="submitted").inc()
+            try:
+                return result.get(timeout=self.timeout_seconds)
+            except CeleryTimeoutError:
+                LLM_REMOTE_REQUESTS.labels(outcome="timeout").inc()
+                result.revoke()
+                raise
+        finally:
+            self._release_slot(token)
+            self._inflight.release()
+
+    def generate_timed(self, question: str, logs: Iterable[dict]) -> Tuple[str, Dict[str, float]]:
+        """Round-trip time only; prompt and decode timings stay on the inference tier."""
+
+        started = time.perf_counter()
+        answer = self.generate(question, logs)
+        return answer, {"generation_ms": (time.perf_counter() - started) * 1000}
+
+    def generate_stream(self, question: str, logs: Iterable[dict]) -> Iterator[str]:
+        """The queue returns whole answers, so the stream is a single chunk."""
+
+        yield self.generate(question, logs)
+
+
+_remote_service: Optional[RemoteLLMService] = None
+_remote_lock = Lock()
+
+
+def get_inference_service() -> Union[LLMService, RemoteLLMService]:
+    """LLM used by the query path: in-process or the dedicated inference tier."""
+
+    global _remote_service
+    settings = get_settings()
+    if settings.llm_backend != "celery":
+        return get_llm_service()
+
+    if _remote_service is None:
+        with _remote_lock:
+            if _remote_service is None:
+                _remote_service = RemoteLLMService(
+                    queue_name=settings.llm_queue_name,
+                    max_queue_depth=settings.llm_queue_max_depth,
+                    max_inflight=settings.llm_api_max_inflight,
+                    timeout_seconds=settings.llm_request_timeout_seconds,
+                )
+    return _remote_service
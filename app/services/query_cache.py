@@ -0,0 +1,224 @@
+"""Caches for repeated `/query` traffic.
+
+Two levels sit in front of the RAG pipeline: normalized query text to its
+embedding, and a full `LogQueryResponse` keyed by the request plus the current
+ingest watermark of its filter scope. Workers bump the watermarks in Redis when
+new logs commit, so cached answers for an affected scope stop matching and age
+out instead of being served stale.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from threading import Lock
+from typing import Dict, Iterable, Optional, Tuple
+
+import redis
+
+from app.core.config import get_settings
+from app.core.metrics import CACHE_EVENTS
+from app.schemas import LogQueryFilters, LogQueryRequest
+
+
+logger = logging.getLogger(__name__)
+
+WATERMARK_PREFIX = "logiq:wm:"
+# Bumped when logs are removed; it is added to every scope's watermark.
+RETENTION_EPOCH_KEY = f"{WATERMARK_PREFIX}epoch"
+REDIS_RETRY_SECONDS = 30.0
+
+
+def normalize_query(query: str) -> str:
+    """Case- and whitespace-insensitive form of a question."""
+
+    return " ".join(query.lower().split())
+
+
+@lru_cache
+def get_redis_client() -> redis.Redis:
+    """Shared Redis client for cache and watermark traffic."""
+
+    return redis.Redis.from_url(get_settings().redis_url)
+
+
+class TieredCache:
+    """Bounded LRU with per-entry TTL, optionally backed by Redis."""
+
+    def __init__(
+        self,
+        namespace: str,
+        *,
+        max_entries: int,
+        ttl_seconds: float,
+        redis_client: Optional[redis.Redis] = None,
+    ) -> None:
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._redis = redis_client
+        self._redis_down_until = 0.0
+        self._local: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _redis_key(self, key: str) -> str:
+        return f"logiq:{self.namespace}:{key}"
+
+    def _redis_available(self) -> bool:
+        return self._redis is not None and time.monotonic() >= self._redis_down_until
+
+    def _mark_redis_down(self, exc: Exception) -> None:
+        logger.warning("%s cache Redis tier unavailable (%s)", self.namespace, exc)
+        self._redis_down_until = time.monotonic() + REDIS_RETRY_SECONDS
+
+    def _store_local(self, key: str, value: bytes, expires_at: float) -> None:
+        self._local[key] = (expires_at, value)
+        self._local.move_to_end(key)
+        while len(self._local) > self.max_entries:
+            self._local.popitem(last=False)
+
+    def get(self, key: str) -> Optional[bytes]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._local.move_to_end(key)
+                    self.hits += 1
+                    CACHE_EVENTS.labels(cache=self.namespace, result="hit").inc()
+                    return entry[1]
+                del self._local[key]
+
+        value: Optional[bytes] = None
+        if self._redis_available():
+            try:
+                value = self._redis.get(self._redis_key(key))
+            except redis.RedisError as exc:
+                self._mark_redis_down(exc)
+
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                CACHE_EVENTS.labels(cache=self.namespace, result="miss").inc()
+                return None
+            self.hits += 1
+            CACHE_EVENTS.labels(cache=self.namespace, result="hit").inc()
+            self._store_local(key, value, now + self.ttl_seconds)
+        return value
+
+    def set(self, key: str, value: bytes) -> None:
+        with self._lock:
+            self._store_local(key, value, time.monotonic() + self.ttl_seconds)
+        if self._redis_available():
+            try:
+                self._redis.set(self._redis_key(key), value, ex=max(1, int(self.ttl_seconds)))
+            except redis.RedisError as exc:
+                self._mark_redis_down(exc)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._local)}
+
+
+def _scope_key(service: Optional[str], level: Optional[str]) -> str:
+    if service and level:
+        return f"{WATERMARK_PREFIX}sl:{service}|{level.upper()}"
+    if service:
+        return f"{WATERMARK_PREFIX}s:{service}"
+    if level:
+        return f"{WATERMARK_PREFIX}l:{level.upper()}"
+    return f"{WATERMARK_PREFIX}all"
+
+
+def bump_ingest_watermarks(scopes: Iterable[Tuple[str, str]]) -> None:
+    """Advance the watermark of every scope touched by newly committed logs."""
+
+    keys = {_scope_key(None, None)}
+    for service, level in scopes:
+        keys.update({
+            _scope_key(service, None),
+            _scope_key(None, level),
+            _scope_key(service, level),
+        })
+    try:
+        pipe = get_redis_client().pipeline(transaction=False)
+        for key in keys:
+            pipe.incr(key)
+        pipe.execute()
+    except redis.RedisError as exc:
+        logger.warning("Unable to bump ingest watermarks: %s", exc)
+
+
+def bump_retention_epoch() -> None:
+    """Invalidate cached answers in every scope after logs have been deleted."""
+
+    try:
+        get_redis_client().incr(RETENTION_EPOCH_KEY)
+    except redis.RedisError as exc:
+        logger.warning("Unable to bump retention epoch: %s", exc)
+
+
+def ingest_watermark(filters: LogQueryFilters) -> Optional[int]:
+    """Current watermark for a filter scope, or `None` if it cannot be read.
+
+    Both counters only grow, so their sum changes whenever either one does.
+    """
+
+    try:
+        scope, epoch = get_redis_client().mget(
+            _scope_key(filters.service, filters.level), RETENTION_EPOCH_KEY)
+    except redis.RedisError as exc:
+        logger.warning("Unable to read ingest watermark: %s", exc)
+        return None
+    return int(scope or 0) + int(epoch or 0)
+
+
+class QueryCache:
+    """Query-embedding and answer caches used by `RAGPipeline`."""
+
+    def __init__(self) -> None:
+        settings = get_settings()
+        client = get_redis_client()
+        self.embeddings = TieredCache(
+            "qemb",
+            max_entries=settings.query_embedding_cache_size,
+            ttl_seconds=settings.query_embedding_cache_ttl_seconds,
+            redis_client=client,
+        )
+        self.answers = TieredCache(
+            "answer",
+            max_entries=settings.answer_cache_size,
+            ttl_seconds=settings.answer_cache_ttl_seconds,
+            redis_client=client,
+        )
+        self.model_name = settings.embedding_model_name
+
+    def embedding_key(self, query: str) -> str:
+        payload = f"{self.model_name}\0{normalize_query(query)}"
+        return hashlib.blake2b(payload.encode("utf-8"), digest_size=20).hexdigest()
+
+    def answer_key(self, request: LogQueryRequest, mode: str) -> Optional[str]:
+        """Cache key for a full answer, or `None` when freshness cannot be checked."""
+
+        watermark = ingest_watermark(request.filters)
+        if watermark is None:
+            return None
+        payload = json.dumps(
+            {
+                "query": normalize_query(request.query),
+                "filters": request.filters.model_dump(mode="json"),
+                "limit": request.limit,
+                "mode": mode,
+                "ef_search": request.ef_search,
+                "probes": request.probes,
+                "watermark": watermark,
+            },
+            sort_keys=True,
+        )
+        return hashlib.blake2b(payload.encode("utf-8"), digest_size=20).hexdigest()
@@ -2,18 +2,54 @@
 
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import List, Sequence
+import asyncio
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+from functools import partial, reduce
+from threading import Event
+from typing import Any, AsyncIterator, Callable, ContextManager, Dict, Iterator, List, Optional, Sequence, Tuple, TypeVar
 
-from sqlalchemy import Select, select
+import numpy as np
+from sqlalchemy import Select, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.core.config import get_settings
-from app.db.models import LogRecord
-from app.schemas import LogQueryFilters, LogQueryRequest, LogQueryResponse
+from app.core.metrics import observe_stage
+from app.db.explain import PlanSummary, aexplain_analyze, explain_analyze
+from app.db.indexes import aapply_search_settings, apply_search_settings
+from app.db.models import TEXT_SEARCH_CONFIG, LogRecord, LogTemplate
+from app.schemas import LogQueryFilters, LogQueryRequest, LogQueryResponse, LogQueryTimings
 from app.schemas.logs import LogQueryContext, LogRecordOut
 from app.services.embeddings import EmbeddingService, get_embedding_service
-from app.services.llm import LLMService, get_llm_service
+from app.services.llm import LLMService
+from app.services.llm_pool import RemoteLLMService, get_inference_service
+from app.services.query_cache import QueryCache
+
+
+T = TypeVar("T")
+
+# Question words that would otherwise match most of the corpus lexically.
+_LEXICAL_STOP_WORDS = frozenset(
+    "a an and any are at be did do does for from happened how i in is it me of on or show "
+    "the to was were what when where which who why with".split()
+)
+_TOKEN_STRIP = "\"'`?!,;:()[]{}<>"
+
+
+def lexical_terms(query: str) -> List[str]:
+    """Tokens worth matching exactly, in order of appearance."""
+
+    terms: List[str] = []
+    for raw in query.split():
+        token = raw.strip(_TOKEN_STRIP).rstrip(".").lower()
+        if len(token) < 2 or token in _LEXICAL_STOP_WORDS or token in terms:
+            continue
+        terms.append(token)
+    return terms
 
 
 @dataclass
@@ -27,24 +63,64 @@ class RetrievedLog:
         return LogQueryContext(match_score=self.score, log=LogRecordOut(**self.record.to_dict()))
 
 
+@dataclass
+class QueryDebug:
+    """Collects the timing breakdown of a `debug_timings` query.
+
+    With `explain`, each retrieval statement is run a second time under
+    `EXPLAIN ANALYZE`, after the timed run, and its plan figures are added.
+    """
+
+    explain: bool = False
+    timings: Dict[str, float] = field(default_factory=dict)
+    plans: List[Dict[str, Any]] = field(default_factory=list)
+
+    def add(self, key: str, value: float) -> None:
+        self.timings[key] = self.timings.get(key, 0) + value
+
+    @contextmanager
+    def timed(self, key: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(key, (time.perf_counter() - started) * 1000)
+
+    def add_plan(self, summary: PlanSummary) -> None:
+        self.add("sql_plan_ms", summary.planning_ms)
+        self.add("sql_exec_ms", summary.execution_ms)
+        self.add("rows_scanned", summary.rows_scanned)
+        self.plans.append(summary.plan)
+
+    def to_schema(self, total_ms: float) -> LogQueryTimings:
+        return LogQueryTimings(**self.timings, total_ms=total_ms, explain=self.plans or None)
+
+
+def _timed(debug: Optional[QueryDebug], key: str) -> ContextManager[None]:
+    return debug.timed(key) if debug is not None else nullcontext()
+
+
 class RAGPipeline:
     """Coordinates embeddings, vector search, and LLM synthesis."""
 
     def __init__(
         self,
         embedding_service: EmbeddingService | None = None,
-        llm_service: LLMService | None = None,
+        llm_service: LLMService | RemoteLLMService | None = None,
     ) -> None:
         self.settings = get_settings()
         self.embedding_service = embedding_service or get_embedding_service()
-        self.llm_service = llm_service or get_llm_service()
-
-    def _build_query(self, query_vector: Sequence[float], filters: LogQueryFilters, limit: int) -> Select:
-        distance = LogRecord.embedding.cosine_distance(
-            query_vector).label("score")
-
-        stmt = select(LogRecord, distance).order_by(distance).limit(limit)
+        self.llm_service = llm_service or get_inference_service()
+        self.query_cache = QueryCache() if self.settings.query_cache_enabled else None
+        # Keep CPU-bound work off the event loop. The LLM executor is sized by the
+        # service: one slot for an in-process model, more when waiting on the pool.
+        self._embedding_executor = ThreadPoolExecutor(
+            max_workers=self.settings.embedding_executor_workers, thread_name_prefix="logiq-embed")
+        self._llm_executor = ThreadPoolExecutor(
+            max_workers=self.llm_service.max_concurrency, thread_name_prefix="logiq-llm")
 
+    @staticmethod
+    def _apply_filters(stmt: Select, filters: LogQueryFilters) -> Select:
         if filters.service:
             stmt = stmt.where(LogRecord.service == filters.service)
         if filters.level:
@@ -55,23 +131,231 @@ class RAGPipeline:
             stmt = stmt.where(LogRecord.log_timestamp <= filters.end_time)
         return stmt
 
-    def retrieve(self, session: Session, request: LogQueryRequest) -> List[RetrievedLog]:
-        query_vector = self.embedding_service.embed_text(request.query)
-        stmt = self._build_query(query_vector, request.filters, request.limit)
-        results = session.execute(stmt).all()
+    def _build_query(self, query_vector: Sequence[float], filters: LogQueryFilters, limit: int) -> Select:
+        distance = LogRecord.embedding.cosine_distance(
+            query_vector).label("score")
+
+        stmt = (
+            select(LogRecord, distance)
+            .where(LogRecord.embedding.is_not(None))
+            .order_by(distance)
+            .limit(limit)
+        )
+        return self._apply_filters(stmt, filters)
 
-        retrieved: List[RetrievedLog] = []
-        for row in results:
-            log, score = row
-            retrieved.append(RetrievedLog(record=log, score=float(score)))
-        return retrieved
+    def _build_template_query(
+        self, query_vector: Sequence[float], filters: LogQueryFilters, limit: int
+    ) -> Select:
+        """Search the (much smaller) template set, then expand to matching logs."""
 
-    def answer(self, session: Session, request: LogQueryRequest) -> LogQueryResponse:
-        retrieved = self.retrieve(session, request)
-        logs_as_dict = [item.record.to_dict() for item in retrieved]
-        answer = self.llm_service.generate(
-            request.query, logs_as_dict[: self.settings.max_context_logs])
+        template_distance = LogTemplate.embedding.cosine_distance(
+            query_vector).label("template_score")
+        candidates = (
+            select(LogTemplate.id, template_distance)
+            .order_by(template_distance)
+            .limit(self.settings.log_template_candidates)
+            .subquery()
+        )
+        stmt = (
+            select(LogRecord, candidates.c.template_score.label("score"))
+            .join(candidates, LogRecord.template_id == candidates.c.id)
+            .order_by(candidates.c.template_score, LogRecord.log_timestamp.desc())
+            .limit(limit)
+        )
+        return self._apply_filters(stmt, filters)
+
+    def _build_lexical_query(self, terms: Sequence[str], filters: LogQueryFilters, limit: int) -> Select:
+        """Full-text match on any of `terms`, ranked by cover density."""
+
+        tsquery = reduce(
+            lambda left, right: left.op("||")(right),
+            [func.plainto_tsquery(TEXT_SEARCH_CONFIG, term) for term in terms],
+        )
+        rank = func.ts_rank_cd(LogRecord.message_tsv, tsquery).label("score")
+        stmt = (
+            select(LogRecord, rank)
+            .where(LogRecord.message_tsv.op("@@")(tsquery))
+            .order_by(rank.desc(), LogRecord.log_timestamp.desc())
+            .limit(limit)
+        )
+        return self._apply_filters(stmt, filters)
+
+    def _vector_statements(
+        self, query_vector: Sequence[float], request: LogQueryRequest, limit: int
+    ) -> List[Select]:
+        statements = [self._build_query(query_vector, request.filters, limit)]
+        if self.settings.log_templates_enabled:
+            statements.append(self._build_template_query(
+                query_vector, request.filters, limit))
+        return statements
+
+    @staticmethod
+    def _merge_vector_rows(row_sets: Sequence[Sequence], limit: int) -> List[RetrievedLog]:
+        rows = sorted((row for rows in row_sets for row in rows), key=lambda row: row[1])
+        return [RetrievedLog(record=log, score=float(score)) for log, score in rows[:limit]]
+
+    def _lexical_statement(self, request: LogQueryRequest, limit: int) -> Optional[Select]:
+        terms = lexical_terms(request.query)
+        if not terms:
+            return None
+        return self._build_lexical_query(terms, request.filters, limit)
+
+    @staticmethod
+    def _to_retrieved(rows: Sequence) -> List[RetrievedLog]:
+        return [RetrievedLog(record=log, score=float(score)) for log, score in rows]
+
+    def _embed_query(self, query: str) -> Sequence[float]:
+        if self.query_cache is None:
+            return self.embedding_service.embed_texts([query])[0]
 
+        key = self.query_cache.embedding_key(query)
+        blob = self.query_cache.embeddings.get(key)
+        if blob is not None and len(blob) == self.embedding_service.dimension * 4:
+            return np.frombuffer(blob, dtype=np.float32)
+
+        vector = self.embedding_service.embed_texts([query])[0]
+        self.query_cache.embeddings.set(key, vector.tobytes())
+        return vector
+
+    def _cached_answer(self, request: LogQueryRequest) -> Tuple[Optional[str], Optional[LogQueryResponse]]:
+        """Look up a cached response; also returns the key to store a fresh one under."""
+
+        if self.query_cache is None:
+            return None, None
+        key = self.query_cache.answer_key(request, self.retrieval_mode(request))
+        if key is None:
+            return None, None
+        blob = self.query_cache.answers.get(key)
+        return key, LogQueryResponse.model_validate_json(blob) if blob is not None else None
+
+    def _store_answer(self, key: Optional[str], response: LogQueryResponse) -> None:
+        if key is not None and self.query_cache is not None:
+            self.query_cache.answers.set(key, response.model_dump_json().encode("utf-8"))
+
+    def _vector_search(
+        self, session: Session, request: LogQueryRequest, limit: int, debug: Optional[QueryDebug] = None
+    ) -> List[RetrievedLog]:
+        with _timed(debug, "query_embedding_ms"):
+            query_vector = self._embed_query(request.query)
+        apply_search_settings(
+            session, ef_search=request.ef_search, probes=request.probes)
+        statements = self._vector_statements(query_vector, request, limit)
+        with _timed(debug, "sql_ms"):
+            row_sets = [session.execute(stmt).all() for stmt in statements]
+        if debug is not None and debug.explain:
+            for stmt in statements:
+                debug.add_plan(explain_analyze(session, stmt))
+        return self._merge_vector_rows(row_sets, limit)
+
+    def _lexical_search(
+        self, session: Session, request: LogQueryRequest, limit: int, debug: Optional[QueryDebug] = None
+    ) -> List[RetrievedLog]:
+        stmt = self._lexical_statement(request, limit)
+        if stmt is None:
+            return []
+        with _timed(debug, "sql_ms"):
+            rows = session.execute(stmt).all()
+        if debug is not None and debug.explain:
+            debug.add_plan(explain_analyze(session, stmt))
+        return self._to_retrieved(rows)
+
+    def _fuse(self, rankings: Sequence[List[RetrievedLog]], limit: int) -> List[RetrievedLog]:
+        """Reciprocal-rank fusion: each list contributes 1 / (k + rank) per log."""
+
+        k = self.settings.hybrid_rrf_k
+        fused: Dict[Tuple[object, object], RetrievedLog] = {}
+        for ranking in rankings:
+            for rank, item in enumerate(ranking, start=1):
+                key = (item.record.id, item.record.log_timestamp)
+                entry = fused.setdefault(key, RetrievedLog(record=item.record, score=0.0))
+                entry.score += 1.0 / (k + rank)
+        return sorted(fused.values(), key=lambda item: item.score, reverse=True)[:limit]
+
+    def retrieval_mode(self, request: LogQueryRequest) -> str:
+        return request.retrieval_mode or self.settings.retrieval_mode
+
+    def _candidate_limit(self, request: LogQueryRequest) -> int:
+        return max(request.limit, self.settings.hybrid_candidates)
+
+    def retrieve(
+        self, session: Session, request: LogQueryRequest, debug: Optional[QueryDebug] = None
+    ) -> List[RetrievedLog]:
+        """Return the top `request.limit` logs for the requested retrieval mode.
+
+        Scores are cosine distances (lower is closer) in vector mode, `ts_rank_cd`
+        ranks in lexical mode and fused reciprocal-rank scores in hybrid mode.
+        """
+
+        mode = self.retrieval_mode(request)
+        with observe_stage("retrieve"):
+            if mode == "lexical":
+                return self._lexical_search(session, request, request.limit, debug)
+            if mode == "hybrid":
+                candidates = self._candidate_limit(request)
+                return self._fuse(
+                    [
+                        self._vector_search(session, request, candidates, debug),
+                        self._lexical_search(session, request, candidates, debug),
+                    ],
+                    request.limit,
+                )
+            return self._vector_search(session, request, request.limit, debug)
+
+    async def _run_in(self, executor: ThreadPoolExecutor, func: Callable[..., T], *args: object) -> T:
+        loop = asyncio.get_running_loop()
+        # Copy the context so spans opened in the executor join the request's trace.
+        return await loop.run_in_executor(executor, partial(contextvars.copy_context().run, func, *args))
+
+    async def _avector_search(
+        self, session: AsyncSession, request: LogQueryRequest, limit: int, debug: Optional[QueryDebug] = None
+    ) -> List[RetrievedLog]:
+        with _timed(debug, "query_embedding_ms"):
+            query_vector = await self._run_in(self._embedding_executor, self._embed_query, request.query)
+        await aapply_search_settings(
+            session, ef_search=request.ef_search, probes=request.probes)
+        statements = self._vector_statements(query_vector, request, limit)
+        with _timed(debug, "sql_ms"):
+            row_sets = [(await session.execute(stmt)).all() for stmt in statements]
+        if debug is not None and debug.explain:
+            for stmt in statements:
+                debug.add_plan(await aexplain_analyze(session, stmt))
+        return self._merge_vector_rows(row_sets, limit)
+
+    async def _alexical_search(
+        self, session: AsyncSession, request: LogQueryRequest, limit: int, debug: Optional[QueryDebug] = None
+    ) -> List[RetrievedLog]:
+        stmt = self._lexical_statement(request, limit)
+        if stmt is None:
+            return []
+        with _timed(debug, "sql_ms"):
+            rows = (await session.execute(stmt)).all()
+        if debug is not None and debug.explain:
+            debug.add_plan(await aexplain_analyze(session, stmt))
+        return self._to_retrieved(rows)
+
+    async def aretrieve(
+        self, session: AsyncSession, request: LogQueryRequest, debug: Optional[QueryDebug] = None
+    ) -> List[RetrievedLog]:
+        """Async `retrieve`: SQL runs on the event loop, embedding in an executor."""
+
+        mode = self.retrieval_mode(request)
+        with observe_stage("retrieve"):
+            if mode == "lexical":
+                return await self._alexical_search(session, request, request.limit, debug)
+            if mode == "hybrid":
+                candidates = self._candidate_limit(request)
+                return self._fuse(
+                    [
+                        await self._avector_search(session, request, candidates, debug),
+                        await self._alexical_search(session, request, candidates, debug),
+                    ],
+                    request.limit,
+                )
+            return await self._avector_search(session, request, request.limit, debug)
+
+    def build_response(
+        self, request: LogQueryRequest, retrieved: List[RetrievedLog], answer: str
+    ) -> LogQueryResponse:
         contexts = [item.to_schema() for item in retrieved]
         return LogQueryResponse(
             answer=answer,
@@ -80,3 +364,105 @@ class RAGPipeline:
             requested_k=request.limit,
             used_k=len(retrieved),
         )
+
+    def _context_logs(self, retrieved: List[RetrievedLog]) -> List[dict]:
+        # Every retrieved log goes to the LLM; its prompt packer trims them to the token budget.
+        return [item.record.to_dict() for item in retrieved]
+
+    def _generate_timed(self, question: str, logs: List[dict], debug: QueryDebug) -> str:
+        answer, timings = self.llm_service.generate_timed(question, logs)
+        for key, value in timings.items():
+            debug.add(key, value)
+        return answer
+
+    def answer(self, session: Session, request: LogQueryRequest) -> LogQueryResponse:
+        if request.debug_timings:
+            return self._debug_answer(session, request)
+
+        cache_key, cached = self._cached_answer(request)
+        if cached is not None:
+            return cached
+
+        retrieved = self.retrieve(session, request)
+        answer = self.llm_service.generate(
+            request.query, self._context_logs(retrieved))
+        response = self.build_response(request, retrieved, answer)
+        self._store_answer(cache_key, response)
+        return response
+
+    def _debug_answer(self, session: Session, request: LogQueryRequest) -> LogQueryResponse:
+        """Uncached `answer` with a timing breakdown attached to the response."""
+
+        started = time.perf_counter()
+        debug = QueryDebug(explain=request.debug_explain)
+        retrieved = self.retrieve(session, request, debug)
+        answer = self._generate_timed(request.query, self._context_logs(retrieved), debug)
+        response = self.build_response(request, retrieved, answer)
+        response.timings = debug.to_schema((time.perf_counter() - started) * 1000)
+        return response
+
+    async def aanswer(self, session: AsyncSession, request: LogQueryRequest) -> LogQueryResponse:
+        """Async `answer`; LLM generation runs in the LLM executor."""
+
+        if request.debug_timings:
+            return await self._adebug_answer(session, request)
+
+        cache_key, cached = await self._run_in(self._embedding_executor, self._cached_answer, request)
+        if cached is not None:
+            return cached
+
+        retrieved = await self.aretrieve(session, request)
+        answer = await self._run_in(
+            self._llm_executor, self.llm_service.generate, request.query, self._context_logs(retrieved))
+        response = self.build_response(request, retrieved, answer)
+        await self._run_in(self._embedding_executor, self._store_answer, cache_key, response)
+        return response
+
+    async def _adebug_answer(self, session: AsyncSession, request: LogQueryRequest) -> LogQueryResponse:
+        """Async `_debug_answer`."""
+
+        started = time.perf_counter()
+        debug = QueryDebug(explain=request.debug_explain)
+        retrieved = await self.aretrieve(session, request, debug)
+        answer = await self._run_in(
+            self._llm_executor, self._generate_timed, request.query, self._context_logs(retrieved), debug)
+        response = self.build_response(request, retrieved, answer)
+        response.timings = debug.to_schema((time.perf_counter() - started) * 1000)
+        return response
+
+    async def astream_answer(self, question: str, retrieved: List[RetrievedLog]) -> AsyncIterator[str]:
+        """Yield answer chunks from the LLM executor as soon as they are generated.
+
+        If the consumer stops early (e.g. the client disconnects), generation is
+        abandoned at the next token instead of running to `max_tokens`.
+        """
+
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        finished = object()
+        cancelled = Event()
+        logs = self._context_logs(retrieved)
+
+        def produce() -> None:
+            try:
+                for chunk in self.llm_service.generate_stream(question, logs):
+                    if cancelled.is_set():
+                        break
+                    loop.call_soon_threadsafe(queue.put_nowait, chunk)
+            except Exception as exc:  # surfaced to the consumer below
+                loop.call_soon_threadsafe(queue.put_nowait, exc)
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, finished)
+
+        producer = loop.run_in_executor(self._llm_executor, contextvars.copy_context().run, produce)
+        try:
+            while True:
+                item = await queue.get()
+                if item is finished:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            cancelled.set()
+            await asyncio.shield(producer)
@@ -0,0 +1,239 @@
+"""Retention policy engine for the `logs` table.
+
+Rules pick a lifetime per service and/or level (the most specific rule wins, with
+`RETENTION_DEFAULT_DAYS` covering everything else). Whole partitions older than the
+longest lifetime are dropped or detached; within younger partitions, expired rows
+are deleted in bounded batches. Expired data can optionally be exported to local
+Parquet files first.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+from sqlalchemy import and_, delete, not_, or_, select, text, true, tuple_
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.core.config import RetentionRule, Settings, get_settings
+from app.core.metrics import (
+    RETENTION_LAST_RUN_SECONDS,
+    RETENTION_LAST_RUN_TIMESTAMP,
+    RETENTION_PARTITIONS,
+    RETENTION_ROWS,
+)
+from app.db.models import LogRecord
+from app.db.partitions import forget_partitions, list_partitions, partition_range
+from app.db.session import engine
+from app.services.query_cache import bump_retention_epoch
+
+try:
+    import pyarrow as pa  # type: ignore
+    import pyarrow.parquet as pq  # type: ignore
+except ImportError:  # pragma: no cover - optional dependency at runtime
+    pa = None  # type: ignore
+    pq = None  # type: ignore
+
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_COLUMNS = ["id", "created_at", "log_timestamp", "service", "level", "message", "attributes"]
+
+
+@dataclass
+class RetentionReport:
+    """Progress counters for one retention run."""
+
+    partitions_removed: int = 0
+    rows_deleted: int = 0
+    rows_archived: int = 0
+    batches: int = 0
+    duration_seconds: float = 0.0
+
+    def as_dict(self) -> Dict[str, float]:
+        return asdict(self)
+
+
+def _rule_clause(rule: RetentionRule) -> ColumnElement:
+    clauses = []
+    if rule.service:
+        clauses.append(LogRecord.service == rule.service)
+    if rule.level:
+        clauses.append(LogRecord.level == rule.level.upper())
+    return and_(*clauses) if clauses else true()
+
+
+class _ParquetArchive:
+    """Appends expired rows to one Parquet file per retention run."""
+
+    def __init__(self, directory: str, label: str) -> None:
+        if pq is None:
+            raise RuntimeError("RETENTION_ARCHIVE_DIR is set but pyarrow is not installed.")
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        self.path = Path(directory) / f"{label}-{stamp}.parquet"
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._writer = None
+
+    def write(self, rows: Sequence[Dict[str, object]]) -> int:
+        if not rows:
+            return 0
+        columns = {name: [row[name] for row in rows] for name in ARCHIVE_COLUMNS}
+        columns["id"] = [str(value) for value in columns["id"]]
+        columns["attributes"] = [json.dumps(value or {}, default=str) for value in columns["attributes"]]
+        table = pa.table(columns)
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(str(self.path), table.schema)
+        self._writer.write_table(table)
+        return len(rows)
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            logger.info("Archived expired logs to %s", self.path)
+
+
+class RetentionEngine:
+    """Applies configured retention rules to the `logs` table."""
+
+    def __init__(self, settings: Settings | None = None) -> None:
+        self.settings = settings or get_settings()
+        self.rules = sorted(self.settings.retention_rules,
+                            key=lambda rule: rule.specificity, reverse=True)
+        self.default_rule = (
+            RetentionRule(days=self.settings.retention_default_days)
+            if self.settings.retention_default_days
+            else None
+        )
+
+    @property
+    def _all_rules(self) -> List[RetentionRule]:
+        return [*self.rules, *([self.default_rule] if self.default_rule else [])]
+
+    def _open_archive(self, label: str) -> Optional[_ParquetArchive]:
+        if not self.settings.retention_archive_dir:
+            return None
+        return _ParquetArchive(self.settings.retention_archive_dir, label)
+
+    def partition_cutoff(self, now: datetime) -> Optional[datetime]:
+        """Instant before which every row is past every rule's lifetime, if any."""
+
+        if self.default_rule is None:
+            # Rows not covered by any rule are kept forever, so nothing is expired for all rules.
+            return None
+        return now - timedelta(days=max(rule.days for rule in self._all_rules))
+
+    def expire_partitions(self, now: datetime, report: RetentionReport) -> None:
+        """Remove partitions whose newest possible row is past every rule's lifetime."""
+
+        cutoff = self.partition_cutoff(now)
+        if cutoff is None:
+            return
+        detach = self.settings.retention_partition_action == "detach"
+
+        with engine.begin() as connection:
+            partitions = list_partitions(connection)
+
+        for name in partitions:
+            bounds = partition_range(name)
+            if bounds is None or bounds[1] > cutoff:
+                continue
+
+            archive = self._open_archive(name)
+            if archive is not None:
+                with engine.connect().execution_options(stream_results=True) as connection:
+                    result = connection.execute(text(
+                        f"SELECT {', '.join(ARCHIVE_COLUMNS)} FROM {name}"))
+                    for chunk in result.mappings().partitions(self.settings.retention_batch_size):
+                        archived = archive.write(chunk)
+                        report.rows_archived += archived
+                        RETENTION_ROWS.labels(action="archived").inc(archived)
+                archive.close()
+
+            with engine.begin() as connection:
+                if detach:
+                    connection.execute(text(f"ALTER TABLE logs DETACH PARTITION {name}"))
+                else:
+                    connection.execute(text(f"DROP TABLE IF EXISTS {name}"))
+            forget_partitions([name])
+            report.partitions_removed += 1
+            RETENTION_PARTITIONS.labels(action="detached" if detach else "dropped").inc()
+            logger.info("%s expired partition %s", "Detached" if detach else "Dropped", name)
+
+    def _rule_condition(self, rule: RetentionRule, now: datetime) -> ColumnElement:
+        # Rows also matched by a more specific rule are governed by that rule instead.
+        shadowing = [
+            _rule_clause(other)
+            for other in self._all_rules
+            if other.specificity > rule.specificity
+        ]
+        return and_(
+            _rule_clause(rule),
+            LogRecord.log_timestamp < now - timedelta(days=rule.days),
+            not_(or_(*shadowing)) if shadowing else true(),
+        )
+
+    def expire_rows(
+        self,
+        now: datetime,
+        report: RetentionReport,
+        progress: Optional[Callable[[RetentionReport], None]] = None,
+    ) -> None:
+        """Delete expired rows rule by rule in batches of `retention_batch_size`."""
+
+        batch_size = self.settings.retention_batch_size
+        for rule in self._all_rules:
+            condition = self._rule_condition(rule, now)
+            label = f"{rule.service or 'any'}-{(rule.level or 'any').lower()}"
+            archive = self._open_archive(label)
+            try:
+                while True:
+                    victims = (
+                        select(LogRecord.id, LogRecord.log_timestamp)
+                        .where(condition)
+                        .limit(batch_size)
+                    )
+                    stmt = delete(LogRecord).where(
+                        tuple_(LogRecord.id, LogRecord.log_timestamp).in_(victims)
+                    )
+                    if archive is not None:
+                        stmt = stmt.returning(*[getattr(LogRecord, name) for name in ARCHIVE_COLUMNS])
+                    with engine.begin() as connection:
+                        result = connection.execute(stmt)
+                        if archive is not None:
+                            deleted = archive.write(list(result.mappings()))
+                            report.rows_archived += deleted
+                            RETENTION_ROWS.labels(action="archived").inc(deleted)
+                        else:
+                            deleted = result.rowcount
+                    report.rows_deleted += deleted
+                    RETENTION_ROWS.labels(action="deleted").inc(deleted)
+                    report.batches += 1
+                    if progress is not None:
+                        progress(report)
+                    if deleted < batch_size:
+                        break
+            finally:
+                if archive is not None:
+                    archive.close()
+
+    def run(self, progress: Optional[Callable[[RetentionReport], None]] = None) -> RetentionReport:
+        """Apply every rule once and return counters for the run."""
+
+        started = time.perf_counter()
+        now = datetime.now(timezone.utc)
+        report = RetentionReport()
+        if self._all_rules:
+            self.expire_partitions(now, report)
+            self.expire_rows(now, report, progress)
+        if report.partitions_removed or report.rows_deleted:
+            bump_retention_epoch()
+        report.duration_seconds = time.perf_counter() - started
+        RETENTION_LAST_RUN_SECONDS.set(report.duration_seconds)
+        RETENTION_LAST_RUN_TIMESTAMP.set_to_current_time()
+        logger.info("Retention run finished: %s", report.as_dict())
+        return report
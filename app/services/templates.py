@@ -0,0 +1,238 @@
+"""Streaming Drain-style log template mining.
+
+Variable tokens (numbers, IPs, UUIDs, hex ids, durations) are masked, then each
+message is matched against a fixed-depth prefix tree of templates. Tokens that
+differ between messages of the same cluster collapse into `<*>`, so
+"User 501 failed login" and "User 77 failed login" share `User <*> failed login`.
+
+A cluster's id is a UUIDv5 of the masked message that created it. The id does
+not change as the cluster generalizes, and worker processes that see the same
+message shape first assign the same id without coordinating. Each template row
+in `log_templates` is re-embedded only when its text actually changes, which
+happens at most once per token position.
+"""
+
+from __future__ import annotations
+
+import re
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from threading import Lock
+from typing import Dict, List, Mapping, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+
+from app.core.config import get_settings
+from app.db.models import LogTemplate
+from app.db.session import db_session_scope
+from app.services.embeddings import get_embedding_service
+
+
+WILDCARD = "<*>"
+# Stands in for messages with no tokens, so they still get a real template.
+EMPTY_TEMPLATE = "<empty>"
+TEMPLATE_NAMESPACE = uuid.UUID("6f9d8c1e-3a1b-4f0e-9c55-1b0c8f4e2a77")
+
+_MASKS = [
+    re.compile(r"^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$"),
+    re.compile(r"^\d{1,3}(\.\d{1,3}){3}(:\d+)?$"),
+    re.compile(r"^([0-9a-fA-F]{2}:){5}[0-9a-fA-F]{2}$"),
+    re.compile(r"^(0x)?[0-9a-fA-F]*\d[0-9a-fA-F]*$"),
+    re.compile(r"^[-+]?\d+(\.\d+)?(ms|us|µs|ns|s|m|h|%|kb|mb|gb|b)?$", re.IGNORECASE),
+]
+_STRIP = "\"'()[]{}<>,;"
+
+
+def mask_token(token: str) -> str:
+    """Return `<*>` for tokens that look like variable values."""
+
+    core = token.strip(_STRIP)
+    if not core:
+        return token
+    for pattern in _MASKS:
+        if pattern.match(core):
+            return WILDCARD
+    if "=" in core:
+        key, _, value = core.partition("=")
+        if value and mask_token(value) == WILDCARD:
+            return f"{key}={WILDCARD}"
+    return token
+
+
+def template_id_for(template: str) -> uuid.UUID:
+    """Deterministic id for the masked message that seeds a cluster."""
+
+    return uuid.uuid5(TEMPLATE_NAMESPACE, template)
+
+
+@dataclass
+class _Cluster:
+    id: uuid.UUID
+    tokens: List[str]
+    size: int = 0
+
+    @property
+    def template(self) -> str:
+        return " ".join(self.tokens)
+
+
+@dataclass
+class _Node:
+    children: Dict[str, "_Node"] = field(default_factory=dict)
+    clusters: List[_Cluster] = field(default_factory=list)
+
+
+class TemplateMiner:
+    """Thread-safe Drain miner that maps messages to templates incrementally."""
+
+    def __init__(
+        self,
+        *,
+        depth: int = 4,
+        similarity_threshold: float = 0.5,
+        max_children: int = 100,
+        max_clusters_per_leaf: int = 64,
+    ) -> None:
+        self.depth = max(3, depth)
+        self.similarity_threshold = similarity_threshold
+        self.max_children = max_children
+        self.max_clusters_per_leaf = max_clusters_per_leaf
+        self._root = _Node()
+        self._lock = Lock()
+
+    def _leaf_for(self, tokens: List[str]) -> _Node:
+        node = self._root.children.setdefault(str(len(tokens)), _Node())
+        for token in tokens[: self.depth - 2]:
+            if any(char.isdigit() for char in token):
+                key = WILDCARD
+            elif token in node.children or len(node.children) < self.max_children:
+                key = token
+            else:
+                key = WILDCARD
+            node = node.children.setdefault(key, _Node())
+        return node
+
+    @staticmethod
+    def _similarity(template: List[str], tokens: List[str]) -> float:
+        same = sum(1 for left, right in zip(template, tokens) if left == right and left != WILDCARD)
+        return same / len(tokens) if tokens else 1.0
+
+    def add(self, message: str) -> Tuple[uuid.UUID, str]:
+        """Assign `message` to a cluster, creating or generalizing one as needed.
+
+        Returns the cluster's stable id and its current template text.
+        """
+
+        tokens = [mask_token(token) for token in message.split()]
+        if not tokens:
+            return template_id_for(EMPTY_TEMPLATE), EMPTY_TEMPLATE
+
+        with self._lock:
+            leaf = self._leaf_for(tokens)
+            best: Optional[_Cluster] = None
+            best_score = -1.0
+            for cluster in leaf.clusters:
+                score = self._similarity(cluster.tokens, tokens)
+                if score > best_score:
+                    best, best_score = cluster, score
+
+            if best is not None and best_score >= self.similarity_threshold:
+                best.tokens = [
+                    left if left == right else WILDCARD for left, right in zip(best.tokens, tokens)
+                ]
+                best.size += 1
+                leaf.clusters.remove(best)
+                leaf.clusters.insert(0, best)
+                return best.id, best.template
+
+            cluster = _Cluster(id=template_id_for(" ".join(tokens)), tokens=tokens, size=1)
+            leaf.clusters.insert(0, cluster)
+            del leaf.clusters[self.max_clusters_per_leaf:]
+            return cluster.id, cluster.template
+
+
+class TemplateStore:
+    """Persists template embeddings, computing each one only when its text changes."""
+
+    def __init__(self, max_known: int = 100_000) -> None:
+        self.max_known = max_known
+        self._known: "OrderedDict[uuid.UUID, str]" = OrderedDict()
+        self._lock = Lock()
+
+    def _remember(self, templates: Mapping[uuid.UUID, str]) -> None:
+        with self._lock:
+            for template_id, text in templates.items():
+                self._known[template_id] = text
+                self._known.move_to_end(template_id)
+            while len(self._known) > self.max_known:
+                self._known.popitem(last=False)
+
+    def ensure(self, templates: Mapping[uuid.UUID, str]) -> int:
+        """Store new templates and update generalized ones; return how many were embedded."""
+
+        with self._lock:
+            unknown = {tid: text for tid, text in templates.items() if self._known.get(tid) != text}
+        if not unknown:
+            return 0
+
+        with db_session_scope() as session:
+            stored = dict(
+                session.execute(
+                    select(LogTemplate.id, LogTemplate.template).where(LogTemplate.id.in_(list(unknown)))
+                ).tuples()
+            )
+            changed = {tid: text for tid, text in unknown.items() if stored.get(tid) != text}
+            if changed:
+                vectors = get_embedding_service().embed_texts(list(changed.values()))
+                statement = insert(LogTemplate).values(
+                    [
+                        {"id": tid, "template": text, "embedding": vector}
+                        for (tid, text), vector in zip(changed.items(), vectors)
+                    ]
+                )
+                # The row keeps its id, so logs already pointing at it follow the new text.
+                session.execute(
+                    statement.on_conflict_do_update(
+                        index_elements=[LogTemplate.id],
+                        set_={
+                            "template": statement.excluded.template,
+                            "embedding": statement.excluded.embedding,
+                        },
+                    )
+                )
+
+        self._remember(unknown)
+        return len(changed)
+
+
+_miner: Optional[TemplateMiner] = None
+_store: Optional[TemplateStore] = None
+_singleton_lock = Lock()
+
+
+def get_template_miner() -> TemplateMiner:
+    """Process-wide template miner."""
+
+    global _miner
+    if _miner is None:
+        with _singleton_lock:
+            if _miner is None:
+                settings = get_settings()
+                _miner = TemplateMiner(
+                    depth=settings.log_template_depth,
+                    similarity_threshold=settings.log_template_similarity,
+                )
+    return _miner
+
+
+def get_template_store() -> TemplateStore:
+    """Process-wide template persistence helper."""
+
+    global _store
+    if _store is None:
+        with _singleton_lock:
+            if _store is None:
+                _store = TemplateStore()
+    return _store
@@ -0,0 +1,220 @@
+"""Consumer-group worker for the Redis Streams ingest transport.
+
+Usage::
+
+    python -m app.stream_worker [--consumer NAME]
+
+Reads up to `LOG_STREAM_READ_COUNT` entries per `XREADGROUP`, then embeds and
+writes them as one batch through the same path as `process_log_batch`. Entries
+are acknowledged (and deleted) only after the batch commits. A batch that fails
+is split in halves until the failing entries are isolated, so one bad row does not
+hold back the rest. Entries left pending by a crashed consumer, or by a failure,
+for `LOG_STREAM_CLAIM_IDLE_MS` are taken over with `XAUTOCLAIM`. An entry is moved
+to `<LOG_STREAM_KEY>:dead` only once it has been delivered
+`LOG_STREAM_MAX_DELIVERIES` times and still fails on its own. Redis or database
+outages never dead-letter anything; the worker backs off and tries again.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+from threading import Event
+from typing import Dict, List, Sequence, Set, Tuple
+
+import redis
+
+from app.core.config import get_settings
+from app.core.log_stream import PAYLOAD_FIELD, dead_letter_key, get_stream_client
+from app.core.metrics import observe_stage
+from app.db.models import LogRecord
+from app.db.session import DB_UNAVAILABLE_ERRORS
+from app.tasks import build_log_record, ensure_database_ready, store_records
+
+
+logger = logging.getLogger("app.stream_worker")
+
+Entry = Tuple[bytes, Dict[bytes, bytes]]
+MAX_BACKOFF_SECONDS = 30.0
+
+
+class LogStreamConsumer:
+    """One member of the ingest consumer group."""
+
+    def __init__(self, consumer: str, client: redis.Redis | None = None) -> None:
+        settings = get_settings()
+        self.client = client or get_stream_client()
+        self.consumer = consumer
+        self.key = settings.log_stream_key
+        self.group = settings.log_stream_group
+        self.read_count = settings.log_stream_read_count
+        self.block_ms = settings.log_stream_block_ms
+        self.claim_idle_ms = settings.log_stream_claim_idle_ms
+        self.max_deliveries = settings.log_stream_max_deliveries
+        self._claim_cursor = "0-0"
+        self._next_claim_at = 0.0
+        self.stopping = Event()
+
+    def ensure_group(self) -> None:
+        try:
+            self.client.xgroup_create(self.key, self.group, id="0", mkstream=True)
+        except redis.ResponseError as exc:
+            if "BUSYGROUP" not in str(exc):
+                raise
+
+    def run(self) -> None:
+        """Consume until `stopping` is set, backing off while Redis or Postgres is down."""
+
+        group_ready = False
+        backoff = 0.0
+        logger.info("Consuming %s as %s/%s", self.key, self.group, self.consumer)
+        while not self.stopping.is_set():
+            try:
+                if not group_ready:
+                    self.ensure_group()
+                    group_ready = True
+                self._poll()
+                backoff = 0.0
+            except Exception as exc:
+                if isinstance(exc, redis.ResponseError) and "NOGROUP" in str(exc):
+                    group_ready = False
+                backoff = min(MAX_BACKOFF_SECONDS, max(1.0, backoff * 2))
+                log = logger.warning if isinstance(exc, (redis.RedisError, *DB_UNAVAILABLE_ERRORS)) else logger.exception
+                log("Stream consumer error; retrying in %.0fs: %s", backoff, exc)
+                self.stopping.wait(backoff)
+
+    def _poll(self) -> None:
+        reclaimed = self._reclaim()
+        if reclaimed:
+            self._handle(reclaimed, reclaimed=True)
+            return
+        response = self.client.xreadgroup(
+            self.group, self.consumer, {self.key: ">"}, count=self.read_count, block=self.block_ms)
+        for _, entries in response or []:
+            if entries:
+                self._handle(entries, reclaimed=False)
+
+    def _reclaim(self) -> List[Entry]:
+        """Take over entries left pending for too long, e.g. by a crashed consumer.
+
+        The pending list is scanned a page at a time, at most every quarter of the
+        idle threshold unless the previous page was full.
+        """
+
+        now = time.monotonic()
+        if now < self._next_claim_at:
+            return []
+        cursor, entries, *_ = self.client.xautoclaim(
+            self.key, self.group, self.consumer, self.claim_idle_ms,
+            start_id=self._claim_cursor, count=self.read_count,
+        )
+        self._claim_cursor = cursor.decode() if isinstance(cursor, bytes) else cursor
+        if self._claim_cursor == "0-0":
+            self._next_claim_at = now + self.claim_idle_ms / 4000
+        # Entries deleted while pending come back without fields; nothing to do for them.
+        return [(entry_id, fields) for entry_id, fields in entries if fields]
+
+    def _delivery_counts(self, entries: Sequence[Entry]) -> Dict[bytes, int]:
+        pipe = self.client.pipeline(transaction=False)
+        for entry_id, _ in entries:
+            pipe.xpending_range(self.key, self.group, min=entry_id, max=entry_id, count=1)
+        return {
+            item["message_id"]: item["times_delivered"]
+            for pending in pipe.execute()
+            for item in pending
+        }
+
+    def _handle(self, entries: Sequence[Entry], *, reclaimed: bool) -> None:
+        exhausted: Set[bytes] = set()
+        if reclaimed:
+            counts = self._delivery_counts(entries)
+            exhausted = {entry[0] for entry in entries if counts.get(entry[0], 0) > self.max_deliveries}
+
+        dead: List[Tuple[Entry, str]] = []
+        batch: List[Tuple[Entry, LogRecord]] = []
+        for entry_id, fields in entries:
+            try:
+                record = build_log_record(json.loads(fields[PAYLOAD_FIELD.encode()]))
+            except (KeyError, TypeError, ValueError) as exc:
+                dead.append(((entry_id, fields), f"invalid payload: {exc}"))
+                continue
+            batch.append(((entry_id, fields), record))
+
+        done: List[bytes] = []
+        failed: List[Tuple[Entry, str]] = []
+        try:
+            if batch:
+                done, failed = self._store(batch, exhausted)
+        finally:
+            # Unparseable entries are dead-lettered even when an outage interrupts the
+            # batch. Rows committed before the outage stay pending, and `store_records`
+            # skips them on redelivery.
+            self._finish(done, dead + failed)
+        if done:
+            logger.info("Stored batch of %d logs from %s", len(done), self.key)
+
+    def _store(
+        self, batch: List[Tuple[Entry, LogRecord]], exhausted: Set[bytes],
+    ) -> Tuple[List[bytes], List[Tuple[Entry, str]]]:
+        """Store `batch`, splitting it in halves to isolate entries that fail.
+
+        Returns the stored entry ids and the entries to dead-letter. A single entry
+        that fails stays pending for a later retry, unless it is in `exhausted`.
+        Outages propagate, so nothing is dead-lettered while Postgres is down.
+        """
+
+        try:
+            with observe_stage("process_stream_batch"):
+                store_records([record for _, record in batch])
+        except DB_UNAVAILABLE_ERRORS:
+            raise
+        except Exception as exc:
+            if len(batch) > 1:
+                middle = len(batch) // 2
+                done, dead = self._store(batch[:middle], exhausted)
+                more_done, more_dead = self._store(batch[middle:], exhausted)
+                return done + more_done, dead + more_dead
+            entry = batch[0][0]
+            if entry[0] in exhausted:
+                return [], [(entry, f"exceeded LOG_STREAM_MAX_DELIVERIES: {exc}")]
+            # Left pending; retried through XAUTOCLAIM once idle long enough.
+            logger.warning("Failed to store stream entry %s: %s", entry[0].decode(), exc)
+            return [], []
+        return [entry_id for (entry_id, _), _ in batch], []
+
+    def _finish(self, done: List[bytes], dead: List[Tuple[Entry, str]]) -> None:
+        ids = done + [entry_id for (entry_id, _), _ in dead]
+        if not ids:
+            return
+        pipe = self.client.pipeline(transaction=True)
+        for (entry_id, fields), reason in dead:
+            logger.warning("Dead-lettering stream entry %s: %s", entry_id.decode(), reason)
+            pipe.xadd(dead_letter_key(self.key), {**fields, b"error": reason.encode()})
+        pipe.xack(self.key, self.group, *ids)
+        pipe.xdel(self.key, *ids)
+        pipe.execute()
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Consume ingested logs from the Redis stream.")
+    parser.add_argument("--consumer", default=f"{socket.gethostname()}-{os.getpid()}",
+                        help="Consumer name within the group (default: hostname-pid)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=getattr(logging, get_settings().log_level.upper(), logging.INFO))
+    ensure_database_ready()
+    consumer = LogStreamConsumer(args.consumer)
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: consumer.stopping.set())
+    consumer.run()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,14 +3,28 @@
 from __future__ import annotations
 
 import logging
+import uuid
 from datetime import datetime, timezone
 from threading import Lock
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional, Set
+
+from sqlalchemy import select
 
 from app.celery_app import celery
+from app.core.config import get_settings
+from app.core.metrics import WORKER_BATCH_ROWS, WORKER_BATCHES, observe_stage
+from app.core.tracing import start_span, task_carrier
+from app.db.bulk import copy_log_records
 from app.db.models import LogRecord
-from app.db.session import db_session_scope, init_db
+from app.db.indexes import build_missing_vector_indexes, needs_sealed_partitions
+from app.db.partitions import ensure_partitions_for, forget_partitions, premake_partitions
+from app.db.session import DB_UNAVAILABLE_ERRORS, db_session_scope, engine, init_db
+from app.services.batching import MicroBatcher
 from app.services.embeddings import get_embedding_service
+from app.services.llm import get_llm_service
+from app.services.query_cache import bump_ingest_watermarks
+from app.services.retention import RetentionEngine
+from app.services.templates import get_template_miner, get_template_store
 
 
 logger = logging.getLogger(__name__)
@@ -18,6 +32,12 @@ logger = logging.getLogger(__name__)
 _db_initialized = False
 _db_lock = Lock()
 
+_coalescer: Optional[MicroBatcher[LogRecord, str]] = None
+_coalescer_lock = Lock()
+
+# Postgres' error for a row whose partition does not exist (e.g. dropped by retention).
+_NO_PARTITION_ERROR = "no partition of relation"
+
 
 def ensure_database_ready() -> None:
     """Idempotently create tables and required extensions."""
@@ -54,29 +74,231 @@ def _parse_timestamp(value: Any) -> datetime:
     return datetime.now(timezone.utc)
 
 
-@celery.task(name="process_log", bind=True, autoretry_for=(Exception,), retry_backoff=True, max_retries=5)
-def process_log(self, payload: Dict[str, Any]) -> str:
-    """Persist a log and generate its embedding."""
-
-    ensure_database_ready()
+def build_log_record(payload: Dict[str, Any]) -> LogRecord:
+    """Translate an ingest payload into an unsaved `LogRecord`.
 
-    embedding_service = get_embedding_service()
-    log_timestamp = _parse_timestamp(payload.get("log_timestamp"))
-    attributes = payload.get("attributes") or {}
+    The record keeps the id assigned by the API, if any, so callers can look it up.
+    """
 
-    record = LogRecord(
+    return LogRecord(
+        id=uuid.UUID(payload["id"]) if payload.get("id") else uuid.uuid4(),
         service=payload["service"],
         level=payload["level"].upper(),
         message=payload["message"],
-        log_timestamp=log_timestamp,
-        attributes=attributes,
+        log_timestamp=_parse_timestamp(payload.get("log_timestamp")),
+        attributes=payload.get("attributes") or {},
     )
 
-    record.embedding = embedding_service.embed_text(record.message)
 
+def _assign_templates(records: List[LogRecord]) -> None:
+    """Attach a mined template to each record and embed only unseen templates."""
+
+    miner = get_template_miner()
+    templates = {}
+    for record in records:
+        template_id, template = miner.add(record.message)
+        record.template_id = template_id
+        templates[template_id] = template
+    embedded = get_template_store().ensure(templates)
+    logger.debug("Mapped %d logs onto %d templates (%d newly embedded)",
+                 len(records), len(templates), embedded)
+
+
+def embed_records(records: List[LogRecord]) -> None:
+    """Populate embeddings for a batch with a single model call.
+
+    With template mining enabled, records reference a shared template embedding
+    instead of carrying their own.
+    """
+
+    if get_settings().log_templates_enabled:
+        _assign_templates(records)
+        return
+
+    vectors = get_embedding_service().embed_texts([record.message for record in records])
+    for record, vector in zip(records, vectors):
+        record.embedding = vector
+
+
+def drop_expired(records: List[LogRecord]) -> List[LogRecord]:
+    """Discard late logs that retention would already have removed.
+
+    Their partitions may have been dropped, and one such row would fail its whole batch.
+    """
+
+    if not get_settings().retention_enabled:
+        return records
+    cutoff = RetentionEngine().partition_cutoff(datetime.now(timezone.utc))
+    if cutoff is None:
+        return records
+    kept = [record for record in records if record.log_timestamp >= cutoff]
+    if len(kept) < len(records):
+        logger.warning("Discarding %d logs older than the retention cutoff %s",
+                       len(records) - len(kept), cutoff.isoformat())
+    return kept
+
+
+def _drop_stored(records: List[LogRecord]) -> List[LogRecord]:
+    """Skip records that are already committed, e.g. from a redelivered or retried message.
+
+    Ids are assigned by the API, so a second delivery carries the same primary keys.
+    """
+
+    timestamps = [record.log_timestamp for record in records]
     with db_session_scope() as session:
-        session.add(record)
+        stored: Set[uuid.UUID] = set(session.scalars(
+            select(LogRecord.id).where(
+                LogRecord.id.in_([record.id for record in records]),
+                LogRecord.log_timestamp.between(min(timestamps), max(timestamps)),
+            )))
+    if stored:
+        logger.info("Skipping %d logs that are already stored", len(stored))
+    return [record for record in records if record.id not in stored]
+
+
+def _write_records(records: List[LogRecord]) -> None:
+    records = _drop_stored(records)
+    if not records:
+        return
+    ensure_partitions_for(record.log_timestamp for record in records)
+    if len(records) >= get_settings().db_copy_min_rows:
+        copy_log_records(records)
+        WORKER_BATCHES.labels(kind="copy").inc()
+    else:
+        with db_session_scope() as session:
+            session.add_all(records)
+        WORKER_BATCHES.labels(kind="insert").inc()
+
+
+def store_records(records: List[LogRecord]) -> List[str]:
+    """Embed and persist records with one model call and one commit.
+
+    Batches of at least `db_copy_min_rows` are streamed with binary COPY; smaller
+    ones go through a regular ORM insert. Ids are returned for every record,
+    including late ones discarded because they are already past retention.
+    """
+
+    ids = [str(record.id) for record in records]
+    records = drop_expired(records)
+    if not records:
+        return ids
+
+    with observe_stage("embed"):
+        embed_records(records)
+
+    with observe_stage("db_write"):
+        try:
+            _write_records(records)
+        except Exception as exc:
+            if _NO_PARTITION_ERROR not in str(exc):
+                raise
+            # A partition this process knew about was removed elsewhere; recheck and retry once.
+            forget_partitions()
+            _write_records(records)
+    WORKER_BATCH_ROWS.observe(len(records))
+
+    if get_settings().query_cache_enabled:
+        bump_ingest_watermarks({(record.service, record.level) for record in records})
+    return ids
 
+
+def get_log_coalescer() -> MicroBatcher[LogRecord, str]:
+    """Return the process-wide batcher that coalesces `process_log` calls."""
+
+    global _coalescer
+    if _coalescer is None:
+        with _coalescer_lock:
+            if _coalescer is None:
+                settings = get_settings()
+                _coalescer = MicroBatcher(
+                    store_records,
+                    max_batch_size=settings.worker_coalesce_max_batch_size,
+                    max_wait_ms=settings.worker_coalesce_max_wait_ms,
+                    name="process-log-coalescer",
+                    # Bisecting only helps when a record is at fault, not during an outage.
+                    split_on_error=lambda exc: not isinstance(exc, DB_UNAVAILABLE_ERRORS),
+                )
+    return _coalescer
+
+
+@celery.task(name="process_log", bind=True, autoretry_for=(Exception,), retry_backoff=True, max_retries=5)
+def process_log(self, payload: Dict[str, Any]) -> str:
+    """Persist a log and generate its embedding."""
+
+    ensure_database_ready()
+
+    record = build_log_record(payload)
+
+    with start_span("process_log", kind="consumer", carrier=task_carrier(self.request)):
+        if get_settings().worker_coalesce_enabled:
+            with observe_stage("process_log"):
+                # The thread pool does not enforce time limits, so bound the wait here.
+                record_id = get_log_coalescer().submit(
+                    record, timeout=self.time_limit or self.app.conf.task_time_limit)
+            logger.debug("Stored coalesced log %s for service=%s level=%s",
+                         record_id, record.service, record.level)
+            return record_id
+
+        with observe_stage("process_log"):
+            record_id = store_records([record])[0]
     logger.info("Stored log %s for service=%s level=%s",
-                record.id, record.service, record.level)
-    return str(record.id)
+                record_id, record.service, record.level)
+    return record_id
+
+
+@celery.task(name="process_log_batch", bind=True, autoretry_for=(Exception,), retry_backoff=True, max_retries=5)
+def process_log_batch(self, payloads: List[Dict[str, Any]]) -> int:
+    """Persist a batch of logs in a single transaction."""
+
+    if not payloads:
+        return 0
+
+    ensure_database_ready()
+
+    records = [build_log_record(payload) for payload in payloads]
+    with start_span("process_log_batch", kind="consumer", carrier=task_carrier(self.request),
+                    attributes={"logiq.batch_size": len(records)}):
+        with observe_stage("process_log_batch"):
+            store_records(records)
+
+    logger.info("Stored batch of %d logs", len(records))
+    return len(records)
+
+
+@celery.task(name="maintain_log_partitions")
+def maintain_log_partitions() -> int:
+    """Pre-create upcoming `logs` partitions so inserts never wait on DDL.
+
+    With IVFFlat, partitions that have sealed since the last run get their vector
+    index here, built concurrently from the rows they now hold.
+    """
+
+    ensure_database_ready()
+    with engine.begin() as connection:
+        created = premake_partitions(connection)
+    if needs_sealed_partitions(get_settings()):
+        build_missing_vector_indexes()
+    return len(created)
+
+
+@celery.task(name="apply_retention", bind=True)
+def apply_retention(self) -> Dict[str, float]:
+    """Drop, detach or delete logs that have outlived their retention rule."""
+
+    if not get_settings().retention_enabled:
+        return {}
+
+    ensure_database_ready()
+
+    def report_progress(report) -> None:
+        self.update_state(state="PROGRESS", meta=report.as_dict())
+
+    return RetentionEngine().run(progress=report_progress).as_dict()
+
+
+@celery.task(name="generate_answer", bind=True, acks_late=True)
+def generate_answer(self, question: str, logs: List[Dict[str, Any]]) -> str:
+    """Run LLM generation on the dedicated inference tier (`LLM_BACKEND=celery`)."""
+
+    with start_span("generate_answer", kind="consumer", carrier=task_carrier(self.request)):
+        return get_llm_service().generate(question, logs)
@@ -0,0 +1 @@
+"""Benchmarks for Logiq's ingest and query hot paths (see `python -m benchmarks.run --help`)."""
@@ -0,0 +1,65 @@
+"""Compare two benchmark result files metric by metric.
+
+Usage::
+
+    python -m benchmarks.compare baseline.json candidate.json [--threshold 10]
+
+Exits non-zero when any latency regresses (or throughput drops) by more than
+`--threshold` percent.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Dict, Iterator, Sequence, Tuple
+
+
+def _flatten(node: object, prefix: str = "") -> Iterator[Tuple[str, float]]:
+    if isinstance(node, dict):
+        for key, value in node.items():
+            yield from _flatten(value, f"{prefix}.{key}" if prefix else str(key))
+    elif isinstance(node, (int, float)) and not isinstance(node, bool):
+        yield prefix, float(node)
+
+
+def _higher_is_better(metric: str) -> bool:
+    return metric.endswith("_per_s")
+
+
+def _is_tracked(metric: str) -> bool:
+    return metric.endswith("_ms") or metric.endswith("_per_s")
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Compare two benchmark JSON files.")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10.0,
+                        help="Allowed regression in percent (default: 10)")
+    args = parser.parse_args(argv)
+
+    baseline: Dict[str, float] = dict(_flatten(json.loads(Path(args.baseline).read_text())["results"]))
+    candidate: Dict[str, float] = dict(_flatten(json.loads(Path(args.candidate).read_text())["results"]))
+
+    regressions = 0
+    print(f"{'metric':<45} {'baseline':>12} {'candidate':>12} {'change':>9}")
+    for metric in sorted(set(baseline) & set(candidate)):
+        if not _is_tracked(metric):
+            continue
+        before, after = baseline[metric], candidate[metric]
+        change = (after - before) / before * 100 if before else 0.0
+        worse = -change if _higher_is_better(metric) else change
+        flag = ""
+        if worse > args.threshold:
+            regressions += 1
+            flag = "  REGRESSION"
+        print(f"{metric:<45} {before:>12.3f} {after:>12.3f} {change:>+8.1f}%{flag}")
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
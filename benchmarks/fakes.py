@@ -0,0 +1,110 @@
+"""In-process stand-ins for the embedding model and the LLM.
+
+They keep the benchmark independent of model downloads and hardware while still
+exercising every line of Logiq's own code around them.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import re
+import time
+from typing import Any, Dict, Iterator, List, Sequence
+
+import numpy as np
+
+from app.db.models import EMBEDDING_DIM
+
+
+_TOKEN = re.compile(r"\w+")
+
+
+class FakeSentenceTransformer:
+    """Hashed bag-of-words vectors: cheap, deterministic and loosely semantic."""
+
+    def __init__(self, dimension: int = EMBEDDING_DIM) -> None:
+        self.dimension = dimension
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dimension
+
+    def _vector(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for token in _TOKEN.findall(text.lower()):
+            digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+            index = int.from_bytes(digest[:4], "little") % self.dimension
+            vector[index] += 1.0 if digest[4] & 1 else -1.0
+        return vector
+
+    def encode(self, sentences: Sequence[str], normalize_embeddings: bool = False, **_: Any) -> np.ndarray:
+        matrix = np.stack([self._vector(text) for text in sentences]) if sentences else np.empty(
+            (0, self.dimension), dtype=np.float32)
+        if normalize_embeddings and len(matrix):
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            matrix = matrix / np.where(norms == 0, 1.0, norms)
+        return matrix.astype(np.float32)
+
+
+class FakeLlama:
+    """Mimics the subset of `llama_cpp.Llama` that `LLMService` uses.
+
+    `prompt_ms_per_token` and `gen_ms_per_token` add simulated compute so prompt
+    size and answer length show up in end-to-end numbers.
+    """
+
+    def __init__(self, *, prompt_ms_per_token: float = 0.0, gen_ms_per_token: float = 0.0,
+                 answer_tokens: int = 48) -> None:
+        self.prompt_ms_per_token = prompt_ms_per_token
+        self.gen_ms_per_token = gen_ms_per_token
+        self.answer_tokens = answer_tokens
+        self._tokens: List[int] = []
+
+    def tokenize(self, text: bytes, add_bos: bool = True) -> List[int]:
+        tokens = [hash(piece) & 0xFFFF for piece in text.split()]
+        return ([1] if add_bos else []) + tokens
+
+    def reset(self) -> None:
+        self._tokens = []
+
+    def eval(self, tokens: Sequence[int]) -> None:
+        self._tokens.extend(tokens)
+        time.sleep(len(tokens) * self.prompt_ms_per_token / 1000.0)
+
+    def save_state(self) -> List[int]:
+        return list(self._tokens)
+
+    def load_state(self, state: List[int]) -> None:
+        self._tokens = list(state)
+
+    def _prompt_cost(self, prompt: str) -> None:
+        tokens = self.tokenize(prompt.encode("utf-8"))
+        shared = 0
+        for left, right in zip(self._tokens, tokens):
+            if left != right:
+                break
+            shared += 1
+        self.eval(tokens[shared:])
+
+    def _pieces(self) -> Iterator[str]:
+        for index in range(self.answer_tokens):
+            time.sleep(self.gen_ms_per_token / 1000.0)
+            yield f" token{index}"
+
+    def create_completion(self, prompt: str, stream: bool = False, **_: Any) -> Any:
+        self._prompt_cost(prompt)
+        if stream:
+            return ({"choices": [{"text": piece}]} for piece in self._pieces())
+        return {"choices": [{"text": "".join(self._pieces())}]}
+
+
+def install_fakes(**llama_options: Any) -> Dict[str, Any]:
+    """Swap the real models inside Logiq's singletons for the stand-ins."""
+
+    from app.services.embeddings import get_embedding_service
+    from app.services.llm import get_llm_service
+
+    embedding_service = get_embedding_service()
+    embedding_service._model = FakeSentenceTransformer()
+    llm_service = get_llm_service()
+    llm_service._llm = FakeLlama(**llama_options)
+    return {"embedding": embedding_service, "llm": llm_service}
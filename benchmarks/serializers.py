@@ -0,0 +1,88 @@
+"""Compare JSON with the `logiq-msgpack` ingest serializer.
+
+Usage::
+
+    python -m benchmarks.serializers
+    python -m benchmarks.serializers --batch-sizes 1,100,5000 --output bench/serializers.json
+
+Each case encodes and decodes a Celery protocol-2 task body (`(args, kwargs, embed)`)
+carrying a `process_log_batch` payload, through kombu exactly as a producer and
+worker would. Payloads go through the same schema validation and serialization as
+the ingest API. Sizes are before the broker transport's own encoding.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict, Sequence
+
+from kombu.serialization import dumps, loads
+
+from app.core.serializers import CONTENT_TYPE, register_ingest_serializer
+from app.schemas import LogIngestPayload
+from benchmarks.run import summarize, timed
+from benchmarks.synthetic import generate_payloads
+
+
+def _task_body(batch_size: int) -> Any:
+    payloads = [
+        LogIngestPayload.model_validate(payload).to_task_payload()
+        for payload in generate_payloads(batch_size, seed=31)
+    ]
+    return ([payloads], {}, {"callbacks": None, "errbacks": None, "chain": None, "chord": None})
+
+
+def bench_case(body: Any, serializer: str, iterations: int) -> Dict[str, Any]:
+    content_type, content_encoding, encoded = dumps(body, serializer=serializer)
+    accept = {content_type}
+    encode_samples = [timed(lambda: dumps(body, serializer=serializer)) for _ in range(iterations)]
+    decode_samples = [
+        timed(lambda: loads(encoded, content_type, content_encoding, accept=accept))
+        for _ in range(iterations)
+    ]
+    return {
+        "bytes": len(encoded),
+        "encode": summarize(encode_samples),
+        "decode": summarize(decode_samples),
+    }
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark ingest task serializers.")
+    parser.add_argument("--batch-sizes", default="1,100,1000,5000")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--compress-min-bytes", type=int, default=4096,
+                        help="Compression threshold for the msgpack+zlib case")
+    parser.add_argument("--output", help="Write JSON results to this path")
+    args = parser.parse_args(argv)
+
+    # Registering again replaces the codec, so the two msgpack cases differ only
+    # in their compression threshold.
+    results: Dict[str, Any] = {}
+    for size in (int(value) for value in args.batch_sizes.split(",")):
+        print(f"Running batch size {size} ...", file=sys.stderr)
+        body = _task_body(size)
+        case = {"json": bench_case(body, "json", args.iterations)}
+        name = register_ingest_serializer(compress_min_bytes=0)
+        if name is None:
+            parser.error("msgpack is not installed.")
+        case["msgpack"] = bench_case(body, name, args.iterations)
+        register_ingest_serializer(compress_min_bytes=args.compress_min_bytes)
+        case["msgpack_zlib"] = bench_case(body, name, args.iterations)
+        for key in ("msgpack", "msgpack_zlib"):
+            case[key]["size_vs_json"] = round(case[key]["bytes"] / case["json"]["bytes"], 3)
+        results[str(size)] = case
+
+    rendered = json.dumps({"content_type": CONTENT_TYPE, "results": results}, indent=2)
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.output).write_text(rendered + "\n", encoding="utf-8")
+    print(rendered)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+"""Synthetic log generator with realistic repetition and variable tokens."""
+
+from __future__ import annotations
+
+import random
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Tuple
+
+
+SERVICES = ["auth-api", "billing", "checkout", "search", "gateway", "inventory"]
+LEVELS: List[Tuple[str, int]] = [("DEBUG", 40), ("INFO", 40), ("WARNING", 12), ("ERROR", 8)]
+
+TEMPLATES = [
+    "User {user} failed login from {ip}",
+    "User {user} logged in from {ip}",
+    "connection reset by peer {ip}:{port}",
+    "Request {request} completed in {ms}ms status={status}",
+    "Order {order} payment declined: insufficient funds",
+    "Order {order} shipped to warehouse {warehouse}",
+    "Cache miss for key session:{request}",
+    "Retrying upstream call to {host} (attempt {attempt}/5)",
+    "Disk usage at {percent}% on volume /data",
+    "Timeout after {ms}ms waiting for lock on table {table}",
+    "Traceback (most recent call last): File \"/app/{table}.py\", line {port}, in handle "
+    "ValueError: invalid literal for int() with base 10: '{order}'",
+]
+
+QUERIES = [
+    "show me login failures for auth-api",
+    "why are payments being declined?",
+    "what happened with order 8f3a2c?",
+    "are there any connection resets?",
+    "which requests were slow?",
+    "is the disk filling up?",
+    "what errors happened in checkout?",
+    "lock timeouts on the orders table",
+]
+
+
+def _fill(template: str, rng: random.Random) -> str:
+    return template.format(
+        user=rng.randint(1, 5000),
+        ip=f"10.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}",
+        port=rng.randint(1024, 65535),
+        request=uuid.UUID(int=rng.getrandbits(128)),
+        ms=rng.randint(1, 5000),
+        status=rng.choice([200, 200, 200, 404, 500, 503]),
+        order=f"{rng.getrandbits(24):06x}",
+        warehouse=rng.randint(1, 40),
+        host=rng.choice(["payments.internal", "users.internal", "search.internal"]),
+        attempt=rng.randint(1, 5),
+        percent=rng.randint(50, 99),
+        table=rng.choice(["orders", "users", "invoices"]),
+    )
+
+
+def generate_payloads(count: int, *, seed: int = 7, days: int = 3) -> Iterator[Dict[str, Any]]:
+    """Yield `/ingest`-shaped payloads spread across the last `days` days."""
+
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    levels, weights = zip(*LEVELS)
+    for _ in range(count):
+        yield {
+            "service": rng.choice(SERVICES),
+            "level": rng.choices(levels, weights=weights)[0],
+            "message": _fill(rng.choice(TEMPLATES), rng),
+            "log_timestamp": (now - timedelta(seconds=rng.uniform(0, days * 86_400))).isoformat(),
+            "attributes": {"host": f"node-{rng.randint(1, 12)}"},
+        }
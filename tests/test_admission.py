@@ -0,0 +1,106 @@
+"""Backlog-based admission control for ingest."""
+
+import pytest
+import redis
+
+from app.services.admission import (
+    OPEN,
+    REJECTING,
+    SHEDDING,
+    AdmissionController,
+    IngestBackpressureError,
+)
+
+
+def _controller(depths, **overrides) -> AdmissionController:
+    samples = iter(depths)
+
+    def probe() -> int:
+        value = next(samples)
+        if isinstance(value, Exception):
+            raise value
+        return value
+
+    options = {
+        "probe": probe,
+        "soft_limit": 100,
+        "hard_limit": 300,
+        "shed_levels": ["DEBUG", "INFO"],
+        "sample_seconds": 0.0,
+        "retry_after_seconds": 7,
+    }
+    options.update(overrides)
+    return AdmissionController(**options)
+
+
+def test_states_follow_the_limits():
+    controller = _controller([])
+
+    assert controller.state(99) == OPEN
+    assert controller.state(100) == SHEDDING
+    assert controller.state(300) == REJECTING
+
+
+def test_pressure_is_linear_between_soft_and_hard_limit():
+    controller = _controller([50, 200, 1000])
+
+    assert controller.pressure() == 0.0
+    assert controller.pressure() == 0.5
+    assert controller.pressure() == 1.0
+
+
+def test_levels_are_shed_in_order():
+    controller = _controller([])
+
+    # The first half of the pressure range thins DEBUG, the second half INFO.
+    assert controller.keep_probability("debug", 0.25) == 0.5
+    assert controller.keep_probability("INFO", 0.25) == 1.0
+    assert controller.keep_probability("DEBUG", 0.75) == 0.0
+    assert controller.keep_probability("INFO", 0.75) == 0.5
+    assert controller.keep_probability("ERROR", 1.0) == 1.0
+
+
+def test_unlisted_levels_are_always_admitted():
+    controller = _controller([])
+
+    assert all(controller.admit("ERROR", 1.0) for _ in range(100))
+    assert not any(controller.admit("DEBUG", 1.0) for _ in range(100))
+
+
+def test_hard_limit_refuses_with_retry_after():
+    controller = _controller([300])
+
+    with pytest.raises(IngestBackpressureError) as excinfo:
+        controller.check()
+    assert excinfo.value.retry_after == 7
+    assert excinfo.value.backlog == 300
+
+
+def test_backlog_is_sampled_at_most_once_per_interval():
+    controller = _controller([10, 20], sample_seconds=60.0)
+
+    assert controller.backlog() == 10
+    assert controller.backlog() == 10
+
+
+def test_broker_errors_keep_the_previous_sample():
+    controller = _controller([10, redis.ConnectionError("down")])
+
+    assert controller.backlog() == 10
+    assert controller.backlog() == 10
+
+
+def test_message_counts_are_scaled_to_logs():
+    controller = _controller([10, 10], counts_messages=True)
+
+    assert controller.backlog() == 10
+    for _ in range(200):
+        controller.record_enqueued(100)
+    assert controller.backlog() == pytest.approx(1000, rel=0.01)
+
+
+def test_log_counts_are_not_scaled():
+    controller = _controller([10])
+    controller.record_enqueued(100)
+
+    assert controller.backlog() == 10
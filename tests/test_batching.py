@@ -0,0 +1,130 @@
+"""MicroBatcher flushing, bisection and timeouts."""
+
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from threading import Event, Lock
+
+import pytest
+
+from app.services.batching import MicroBatcher
+
+
+class _Recorder:
+    """Flush function that records each batch and can fail on chosen items."""
+
+    def __init__(self, bad=(), delay: float = 0.0) -> None:
+        self.bad = set(bad)
+        self.delay = delay
+        self.batches = []
+        self._lock = Lock()
+
+    def __call__(self, items):
+        with self._lock:
+            self.batches.append(list(items))
+        if self.delay:
+            time.sleep(self.delay)
+        if self.bad.intersection(items):
+            raise ValueError(f"bad items in {items}")
+        return [item * 10 for item in items]
+
+
+def _submit_all(batcher, items, timeout=5.0):
+    with ThreadPoolExecutor(max_workers=len(items)) as pool:
+        futures = [pool.submit(batcher.submit, item, timeout) for item in items]
+        outcomes = []
+        for future in futures:
+            try:
+                outcomes.append(future.result())
+            except Exception as exc:  # noqa: BLE001 - the outcome is what is under test
+                outcomes.append(exc)
+        return outcomes
+
+
+def test_concurrent_items_share_a_batch():
+    flush = _Recorder()
+    batcher = MicroBatcher(flush, max_batch_size=100, max_wait_ms=200)
+
+    assert _submit_all(batcher, list(range(8))) == [item * 10 for item in range(8)]
+    assert len(flush.batches) == 1
+
+
+def test_full_batch_flushes_without_waiting():
+    flush = _Recorder()
+    batcher = MicroBatcher(flush, max_batch_size=4, max_wait_ms=60_000)
+
+    started = time.monotonic()
+    assert _submit_all(batcher, [1, 2, 3, 4]) == [10, 20, 30, 40]
+    assert time.monotonic() - started < 5
+
+
+def test_leftover_items_keep_their_deadline():
+    release = Event()
+
+    def flush(items):
+        if items == ["first"]:
+            release.wait(5)
+        return items
+
+    batcher = MicroBatcher(flush, max_batch_size=4, max_wait_ms=300)
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        blocker = pool.submit(batcher.submit, "first", 5)
+        time.sleep(0.4)
+        # Queued while the flush thread is busy: four fill a batch, one is left over.
+        waiting = [pool.submit(batcher.submit, index, 5) for index in range(5)]
+        time.sleep(0.4)
+        release.set()
+        started = time.monotonic()
+        assert blocker.result() == "first"
+        assert [future.result() for future in waiting] == list(range(5))
+    # The leftover's deadline passed while it waited, so it is flushed right
+    # after the full batch instead of waiting another interval.
+    assert time.monotonic() - started < 0.2
+
+
+def test_failing_item_fails_only_its_caller():
+    flush = _Recorder(bad={3})
+    batcher = MicroBatcher(flush, max_batch_size=100, max_wait_ms=200)
+
+    outcomes = _submit_all(batcher, list(range(8)))
+
+    assert isinstance(outcomes[3], ValueError)
+    assert [outcome for index, outcome in enumerate(outcomes) if index != 3] == [
+        item * 10 for item in range(8) if item != 3]
+
+
+def test_split_on_error_can_fail_the_whole_batch():
+    flush = _Recorder(bad={3})
+    batcher = MicroBatcher(flush, max_batch_size=100, max_wait_ms=200, split_on_error=lambda exc: False)
+
+    outcomes = _submit_all(batcher, list(range(8)))
+
+    assert all(isinstance(outcome, ValueError) for outcome in outcomes)
+    assert len(flush.batches) == 1
+
+
+def test_short_results_fail_the_batch():
+    batcher = MicroBatcher(lambda items: [], max_batch_size=1, max_wait_ms=0)
+
+    with pytest.raises(RuntimeError):
+        batcher.submit(1, timeout=5)
+
+
+def test_timed_out_item_is_withdrawn():
+    release = Event()
+    flushed = []
+
+    def flush(items):
+        flushed.extend(items)
+        release.wait(5)
+        return items
+
+    batcher = MicroBatcher(flush, max_batch_size=1, max_wait_ms=0)
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        blocker = pool.submit(batcher.submit, "first", 5)
+        time.sleep(0.1)
+        with pytest.raises(FutureTimeoutError):
+            batcher.submit("second", timeout=0.1)
+        release.set()
+        assert blocker.result() == "first"
+    time.sleep(0.1)
+    assert flushed == ["first"]
@@ -0,0 +1,104 @@
+"""Binary COPY encoding for log rows."""
+
+import io
+import struct
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from app.db.bulk import (
+    LOG_COPY_COLUMNS,
+    PG_COPY_SIGNATURE,
+    _encode_timestamptz,
+    _encode_vector,
+    _IteratorReader,
+    encode_copy_row,
+    iter_copy_stream,
+)
+from app.db.models import LogRecord
+
+
+def _record(**overrides) -> LogRecord:
+    fields = {
+        "id": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+        "created_at": datetime(2024, 5, 10, tzinfo=timezone.utc),
+        "log_timestamp": datetime(2024, 5, 10, tzinfo=timezone.utc),
+        "service": "auth-api",
+        "level": "ERROR",
+        "message": "User 501 failed login",
+        "attributes": {"host": "node-1"},
+        "embedding": [0.5, -1.0, 2.0],
+    }
+    fields.update(overrides)
+    return LogRecord(**fields)
+
+
+def _fields(row: bytes) -> list:
+    (count,) = struct.unpack_from(">h", row)
+    offset, values = 2, []
+    for _ in range(count):
+        (length,) = struct.unpack_from(">i", row, offset)
+        offset += 4
+        if length < 0:
+            values.append(None)
+            continue
+        values.append(row[offset:offset + length])
+        offset += length
+    assert offset == len(row)
+    return values
+
+
+def test_timestamps_count_microseconds_from_the_postgres_epoch():
+    moment = datetime(2000, 1, 2, 0, 0, 0, 5, tzinfo=timezone.utc)
+
+    assert struct.unpack(">q", _encode_timestamptz(moment))[0] == 86_400_000_000 + 5
+
+
+def test_naive_timestamps_are_treated_as_utc():
+    naive = datetime(2024, 5, 10, 12, 30)
+
+    assert _encode_timestamptz(naive) == _encode_timestamptz(naive.replace(tzinfo=timezone.utc))
+    assert _encode_timestamptz(datetime(2024, 5, 10, 14, 30, tzinfo=timezone(timedelta(hours=2)))) == (
+        _encode_timestamptz(naive))
+
+
+def test_vector_layout():
+    encoded = _encode_vector([0.5, -1.0, 2.0])
+
+    assert struct.unpack(">HH", encoded[:4]) == (3, 0)
+    assert struct.unpack(">3f", encoded[4:]) == (0.5, -1.0, 2.0)
+
+
+def test_row_has_one_field_per_column_and_nulls_for_missing_values():
+    values = _fields(encode_copy_row(_record()))
+    columns = [name for name, _, _ in LOG_COPY_COLUMNS]
+
+    assert len(values) == len(columns)
+    assert values[columns.index("id")] == uuid.UUID("12345678-1234-5678-1234-567812345678").bytes
+    assert values[columns.index("message")] == b"User 501 failed login"
+    assert values[columns.index("attributes")] == b'{"host":"node-1"}'
+    assert values[columns.index("template_id")] is None
+
+
+def test_missing_defaults_are_filled():
+    record = _record(id=None, created_at=None, log_timestamp=None, attributes=None)
+    values = _fields(encode_copy_row(record))
+    columns = [name for name, _, _ in LOG_COPY_COLUMNS]
+
+    assert isinstance(record.id, uuid.UUID)
+    assert record.log_timestamp is not None
+    assert values[columns.index("attributes")] == b"{}"
+
+
+def test_stream_framing_and_chunking():
+    chunks = list(iter_copy_stream([_record(id=uuid.uuid4()) for _ in range(5)], chunk_rows=2))
+
+    assert chunks[0] == PG_COPY_SIGNATURE + struct.pack(">ii", 0, 0)
+    assert chunks[-1] == struct.pack(">h", -1)
+    # Five rows in chunks of two: 2 + 2 + 1.
+    assert len(chunks) == 2 + 3
+
+
+def test_reader_concatenates_chunks():
+    reader = io.BufferedReader(_IteratorReader(iter([b"abc", b"", b"defg", b"h"])), buffer_size=2)
+
+    assert reader.read() == b"abcdefgh"
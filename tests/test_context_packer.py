@@ -0,0 +1,70 @@
+"""Token-budgeted packing of retrieved logs."""
+
+from app.services.context_packer import TRUNCATION_MARKER, ContextPacker, approximate_token_count
+
+
+def _log(message: str, service: str = "auth-api", level: str = "ERROR") -> dict:
+    return {"log_timestamp": "2024-05-10T12:00:00", "service": service, "level": level, "message": message}
+
+
+def _words(text: str) -> int:
+    return len(text.split())
+
+
+def test_identical_lines_collapse_with_a_count():
+    lines = ContextPacker(_words).pack([_log("db down"), _log("db down"), _log("db up")], budget=1000)
+
+    assert lines == [
+        "- [2024-05-10T12:00:00] auth-api ERROR: db down (×2)",
+        "- [2024-05-10T12:00:00] auth-api ERROR: db up",
+    ]
+
+
+def test_same_message_from_another_service_is_kept_apart():
+    lines = ContextPacker(_words).pack([_log("db down"), _log("db down", service="billing")], budget=1000)
+
+    assert len(lines) == 2
+
+
+def test_lines_that_do_not_fit_are_skipped_in_rank_order():
+    packer = ContextPacker(_words)
+    # Each formatted line is 5 words plus one for the newline.
+    logs = [_log("first"), _log("second message that is much longer than the others"), _log("third")]
+
+    assert packer.pack(logs, budget=12) == [
+        "- [2024-05-10T12:00:00] auth-api ERROR: first",
+        "- [2024-05-10T12:00:00] auth-api ERROR: third",
+    ]
+
+
+def test_empty_or_negative_budget_packs_nothing():
+    packer = ContextPacker(_words)
+
+    assert packer.pack([_log("db down")], budget=0) == []
+    assert packer.pack([_log("db down")], budget=-50) == []
+
+
+def test_long_lines_are_truncated_to_the_line_limit():
+    packer = ContextPacker(max_line_tokens=32)
+    [line] = packer.pack([_log("x" * 2000)], budget=1000)
+
+    assert line.endswith(TRUNCATION_MARKER)
+    assert approximate_token_count(line) <= 32
+
+
+def test_token_counts_are_cached():
+    calls = []
+
+    def count(text: str) -> int:
+        calls.append(text)
+        return _words(text)
+
+    packer = ContextPacker(count, cache_size=2)
+    packer.count("a b")
+    packer.count("a b")
+    assert calls == ["a b"]
+
+    packer.count("c")
+    packer.count("d")
+    packer.count("a b")
+    assert calls == ["a b", "c", "d", "a b"]
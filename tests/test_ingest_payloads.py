@@ -0,0 +1,30 @@
+"""Ingest payloads must survive every transport encoding."""
+
+import json
+import uuid
+from datetime import datetime, timezone
+
+from app.schemas import LogIngestPayload
+
+
+def _payload(**overrides) -> LogIngestPayload:
+    fields = {"service": "auth-api", "level": "ERROR", "message": "User 501 failed login"}
+    fields.update(overrides)
+    return LogIngestPayload.model_validate(fields)
+
+
+def test_client_timestamp_is_json_encodable():
+    timestamp = datetime(2024, 5, 10, 12, 30, tzinfo=timezone.utc)
+    task_payload = _payload(log_timestamp=timestamp).to_task_payload()
+
+    decoded = json.loads(json.dumps(task_payload))
+
+    assert datetime.fromisoformat(decoded["log_timestamp"].replace("Z", "+00:00")) == timestamp
+
+
+def test_missing_timestamp_and_id_are_assigned():
+    task_payload = _payload(host="node-1").to_task_payload()
+
+    assert datetime.fromisoformat(task_payload["log_timestamp"]).tzinfo is not None
+    assert uuid.UUID(task_payload["id"])
+    assert task_payload["attributes"] == {"host": "node-1"}
@@ -0,0 +1,81 @@
+"""Decompression and line splitting for the NDJSON ingest endpoint."""
+
+import asyncio
+import gzip
+import zlib
+from typing import Dict, List
+
+import pytest
+
+from app.api.routes_ingest import DECOMPRESS_CHUNK_BYTES, _decoded_body, _iter_lines
+
+
+class _FakeRequest:
+    def __init__(self, chunks: List[bytes], headers: Dict[str, str]) -> None:
+        self.headers = headers
+        self._chunks = chunks
+
+    async def stream(self):
+        for chunk in self._chunks:
+            yield chunk
+
+
+def _decode(chunks: List[bytes], encoding: str = "gzip") -> bytes:
+    async def collect() -> bytes:
+        request = _FakeRequest(chunks, {"content-encoding": encoding})
+        return b"".join([piece async for piece in _decoded_body(request)])
+
+    return asyncio.run(asyncio.wait_for(collect(), timeout=10))
+
+
+def _lines(chunks: List[bytes], max_line_bytes: int) -> list:
+    async def source():
+        for chunk in chunks:
+            yield chunk
+
+    async def collect() -> list:
+        return [line async for line in _iter_lines(source(), max_line_bytes)]
+
+    return asyncio.run(collect())
+
+
+def test_multi_member_gzip_in_one_chunk():
+    first = b'{"message": "a"}\n' * 30_000
+    second = b'{"message": "b"}\n' * 30_000
+    assert len(first) > DECOMPRESS_CHUNK_BYTES
+
+    assert _decode([gzip.compress(first) + gzip.compress(second)]) == first + second
+
+
+def test_multi_member_gzip_split_across_chunks():
+    body = gzip.compress(b"one\n" * 100_000) + gzip.compress(b"two\n" * 100_000)
+    chunks = [body[start:start + 4096] for start in range(0, len(body), 4096)]
+
+    assert _decode(chunks) == b"one\n" * 100_000 + b"two\n" * 100_000
+
+
+def test_trailing_zero_padding_is_ignored():
+    body = b"line\n" * 100_000
+
+    assert _decode([gzip.compress(body) + b"\x00" * 512]) == body
+
+
+def test_trailing_garbage_raises():
+    with pytest.raises(zlib.error):
+        _decode([gzip.compress(b"line\n" * 100_000) + b"garbage"])
+
+
+def test_deflate_body():
+    body = b"line\n" * 1000
+
+    assert _decode([zlib.compress(body)], encoding="deflate") == body
+
+
+def test_lines_span_chunks():
+    assert _lines([b"ab", b"c\nde", b"f\n", b"g"], max_line_bytes=10) == [b"abc", b"def", b"g"]
+
+
+def test_oversized_lines_yield_none():
+    lines = _lines([b"short\n", b"x" * 8, b"x" * 8, b"\nok\n", b"y" * 20], max_line_bytes=10)
+
+    assert lines == [b"short", None, b"ok", None]
@@ -0,0 +1,58 @@
+"""Partition naming and ranges for the time-partitioned logs table."""
+
+from datetime import datetime, timedelta, timezone
+
+from app.db.indexes import is_sealed
+from app.db.partitions import (
+    LEGACY_PARTITION,
+    parse_partition_start,
+    partition_name,
+    partition_range,
+    partition_start,
+)
+
+
+def test_daily_partition_start_and_name():
+    moment = datetime(2024, 5, 10, 23, 59, 59, tzinfo=timezone.utc)
+    start = partition_start(moment, "day")
+
+    assert start == datetime(2024, 5, 10, tzinfo=timezone.utc)
+    assert partition_name(start, "day") == "logs_p20240510"
+
+
+def test_hourly_partition_start_and_name():
+    start = partition_start(datetime(2024, 5, 10, 12, 30, tzinfo=timezone.utc), "hour")
+
+    assert start == datetime(2024, 5, 10, 12, tzinfo=timezone.utc)
+    assert partition_name(start, "hour") == "logs_p2024051012"
+
+
+def test_offsets_are_converted_to_utc_and_naive_values_taken_as_utc():
+    east = datetime(2024, 5, 11, 1, 0, tzinfo=timezone(timedelta(hours=2)))
+
+    assert partition_start(east, "day") == datetime(2024, 5, 10, tzinfo=timezone.utc)
+    assert partition_start(datetime(2024, 5, 10, 12, 30), "hour") == datetime(
+        2024, 5, 10, 12, tzinfo=timezone.utc)
+
+
+def test_names_round_trip_to_ranges():
+    assert parse_partition_start("logs_p20240510") == datetime(2024, 5, 10, tzinfo=timezone.utc)
+    assert partition_range("logs_p20240510") == (
+        datetime(2024, 5, 10, tzinfo=timezone.utc), datetime(2024, 5, 11, tzinfo=timezone.utc))
+    assert partition_range("logs_p2024051012") == (
+        datetime(2024, 5, 10, 12, tzinfo=timezone.utc), datetime(2024, 5, 10, 13, tzinfo=timezone.utc))
+
+
+def test_other_tables_are_not_partitions():
+    assert parse_partition_start(LEGACY_PARTITION) is None
+    assert partition_range("logs_p2024") is None
+    assert partition_range("log_templates") is None
+
+
+def test_partition_is_sealed_once_its_range_ends():
+    now = datetime(2024, 5, 11, 0, 30, tzinfo=timezone.utc)
+
+    assert is_sealed("logs_p20240510", now)
+    assert not is_sealed("logs_p20240511", now)
+    assert is_sealed("logs_p2024051023", now)
+    assert is_sealed(LEGACY_PARTITION, now)
@@ -0,0 +1,70 @@
+"""Token masking and template clustering."""
+
+import pytest
+
+from app.services.templates import EMPTY_TEMPLATE, WILDCARD, TemplateMiner, mask_token, template_id_for
+
+
+@pytest.mark.parametrize(
+    "token",
+    [
+        "501",
+        "3.5ms",
+        "12%",
+        "0x1f3a",
+        "deadbeef42",
+        "10.0.0.12:8080",
+        "aa:bb:cc:dd:ee:ff",
+        "6f9d8c1e-3a1b-4f0e-9c55-1b0c8f4e2a77",
+        "(42)",
+    ],
+)
+def test_variable_tokens_are_masked(token):
+    assert mask_token(token) == WILDCARD
+
+
+@pytest.mark.parametrize("token", ["User", "failed", "login:", "GET", "/api/v1/users", "added"])
+def test_words_are_kept(token):
+    assert mask_token(token) == token
+
+
+def test_key_value_tokens_keep_the_key():
+    assert mask_token("user_id=501") == f"user_id={WILDCARD}"
+    assert mask_token("mode=fast") == "mode=fast"
+
+
+def test_messages_differing_in_a_value_share_a_template():
+    miner = TemplateMiner()
+
+    first_id, first = miner.add("User 501 failed login from 10.0.0.1")
+    second_id, second = miner.add("User 77 failed login from 10.0.0.2")
+
+    assert first_id == second_id
+    assert first == second == f"User {WILDCARD} failed login from {WILDCARD}"
+
+
+def test_template_id_is_stable_as_the_cluster_generalizes():
+    miner = TemplateMiner()
+
+    seed_id, seed = miner.add("cache miss for key alpha")
+    later_id, later = miner.add("cache miss for key beta")
+
+    assert seed == "cache miss for key alpha"
+    assert later == f"cache miss for key {WILDCARD}"
+    assert later_id == seed_id == template_id_for(seed)
+
+
+def test_separate_miners_agree_on_ids_for_the_same_first_message():
+    message = "Connection reset by peer 10.1.2.3"
+
+    assert TemplateMiner().add(message)[0] == TemplateMiner().add(message)[0]
+
+
+def test_dissimilar_messages_get_different_templates():
+    miner = TemplateMiner()
+
+    assert miner.add("disk full on volume data")[0] != miner.add("payment accepted for order now")[0]
+
+
+def test_empty_message_maps_to_placeholder():
+    assert TemplateMiner().add("   ") == (template_id_for(EMPTY_TEMPLATE), EMPTY_TEMPLATE)